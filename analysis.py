@@ -0,0 +1,355 @@
+"""
+Static complexity reports for built rigs.  A SceneSnapshot copies the nodes,
+types, parents and connections of a rig out of the scene, and analyze works
+on the snapshot alone, so reports can be made, saved and checked without
+Maya:
+
+import beings.analysis as analysis
+snapshot = analysis.SceneSnapshot.fromWidgets(root)
+report = analysis.analyze(snapshot)
+print analysis.formatReport(report)
+"""
+import logging, re
+
+_logger = logging.getLogger(__name__)
+
+#source attributes that depend on a node's parent rather than the node
+_PARENT_ATTRS = set(['parentMatrix', 'parentInverseMatrix'])
+
+#multiplyDivide input attributes, and the channel each one feeds
+_MDN_CHANNELS = {'input1X': 'X', 'input1Y': 'Y', 'input1Z': 'Z',
+                 'input2X': 'X', 'input2Y': 'Y', 'input2Z': 'Z'}
+_MDN_ALL_CHANNELS = set(['input1', 'input2'])
+
+#constraint types that together set translate, rotate and scale of a node
+_TRIPLET_TYPES = [set(['pointConstraint', 'orientConstraint', 'scaleConstraint']),
+                  set(['parentConstraint', 'scaleConstraint'])]
+
+def _plugNode(plug):
+    return plug.split('.', 1)[0]
+
+def _plugAttr(plug):
+    """Get the first attribute name in a plug, without indices or children"""
+    return re.split(r'[\[.]', plug.split('.', 1)[1])[0]
+
+def isConstraint(nodeType):
+    return nodeType.endswith('Constraint')
+
+class SceneSnapshot(object):
+    """
+    The nodes of a rig and the connections between them.  All data is plain
+    python, so snapshots can be built by hand or loaded from json
+    """
+    def __init__(self, nodeTypes=None, connections=None, parents=None, owners=None):
+        """
+        @param nodeTypes: {node: node type}
+        @param connections: list of (source plug, destination plug), with
+        long attribute names
+        @param parents: {dag node: parent}
+        @param owners: {node: name of the widget that created it}
+        """
+        self.nodeTypes = dict(nodeTypes or {})
+        self.connections = [tuple(c) for c in (connections or [])]
+        self.parents = dict(parents or {})
+        self.owners = dict(owners or {})
+
+    @classmethod
+    def fromWidgets(cls, root):
+        """
+        Snapshot the nodes of a widget and all its children.  Widgets that
+        haven't been built are skipped
+        @param root: the top widget, usually a core.Root
+        @rtype: SceneSnapshot
+        """
+        import maya.cmds as MC
+        snapshot = cls()
+        for widget in [root] + root.children(recursive=True):
+            try:
+                nodes = widget.getNodes()
+            except Exception, e:
+                _logger.debug("Skipping %s: %s" % (widget.name(), e))
+                continue
+            if not nodes:
+                continue
+
+            nameAndTypes = MC.ls(nodes, showType=1)
+            for i in range(0, len(nameAndTypes), 2):
+                node = nameAndTypes[i]
+                snapshot.nodeTypes[node] = nameAndTypes[i+1]
+                snapshot.owners[node] = widget.name()
+
+            for node in MC.ls(nodes, dag=1, o=1):
+                parent = MC.listRelatives(node, parent=1)
+                if parent:
+                    snapshot.parents[node] = parent[0]
+
+            plugs = MC.listConnections(nodes, s=0, d=1, c=1, p=1, skipConversionNodes=1) or []
+            for i in range(0, len(plugs), 2):
+                snapshot.connections.append((plugs[i], plugs[i+1]))
+        return snapshot
+
+    def toDict(self):
+        return {'nodeTypes': self.nodeTypes,
+                'connections': [list(c) for c in self.connections],
+                'parents': self.parents,
+                'owners': self.owners}
+
+    @classmethod
+    def fromDict(cls, data):
+        return cls(data.get('nodeTypes'), data.get('connections'),
+                   data.get('parents'), data.get('owners'))
+
+    def dependencies(self):
+        """
+        Get node level dependencies.  Matrix inputs from parents and the
+        channels a constraint reads back from the node it drives are not
+        real dependencies on that node, so they are skipped or moved to the
+        parent.  Transforms depend on their parents
+        @return: {node: set of nodes that depend on it}
+        """
+        graph = dict([(node, set()) for node in self.nodeTypes])
+        for child, parent in self.parents.items():
+            if child in graph and parent in graph:
+                graph[parent].add(child)
+
+        for src, dst in self.connections:
+            srcNode, dstNode = _plugNode(src), _plugNode(dst)
+            if srcNode not in graph or dstNode not in graph:
+                continue
+            if _plugAttr(src) in _PARENT_ATTRS:
+                srcNode = self.parents.get(srcNode)
+                if srcNode not in graph:
+                    continue
+            elif isConstraint(self.nodeTypes[dstNode]) and \
+                     _plugAttr(dst).startswith('constraint'):
+                continue
+            if srcNode != dstNode:
+                graph[srcNode].add(dstNode)
+        return graph
+
+def stronglyConnected(graph):
+    """
+    Find strongly connected components with Tarjan's algorithm.  The search
+    is iterative, so large graphs don't hit the recursion limit
+    @param graph: {node: iterable of downstream nodes}
+    @return: list of components, each a list of nodes.  Components come out
+    downstream first
+    """
+    index = {}
+    lowLink = {}
+    stack = []
+    onStack = set()
+    result = []
+    counter = 0
+
+    for start in graph:
+        if start in index:
+            continue
+        index[start] = lowLink[start] = counter
+        counter += 1
+        stack.append(start)
+        onStack.add(start)
+        work = [(start, iter(graph[start]))]
+
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = lowLink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    onStack.add(child)
+                    work.append((child, iter(graph.get(child, ()))))
+                    break
+                elif child in onStack:
+                    lowLink[node] = min(lowLink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowLink[parent] = min(lowLink[parent], lowLink[node])
+                if lowLink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        onStack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    result.append(component)
+    return result
+
+def criticalPath(graph, components=None):
+    """
+    Get the longest dependency chain.  Each cycle counts as a single step
+    @param graph: {node: iterable of downstream nodes}
+    @param components: the result of stronglyConnected(graph), if already
+    computed
+    @return: list of nodes, upstream first.  Cycles are represented by one
+    of their nodes
+    """
+    if components is None:
+        components = stronglyConnected(graph)
+    componentOf = {}
+    for i, component in enumerate(components):
+        for node in component:
+            componentOf[node] = i
+
+    #components are downstream first, so every downstream component of
+    #component i has a lower index
+    length = [1] * len(components)
+    nextStep = [None] * len(components)
+    for i, component in enumerate(components):
+        for node in component:
+            for child in graph[node]:
+                j = componentOf[child]
+                if j != i and length[j] + 1 > length[i]:
+                    length[i] = length[j] + 1
+                    nextStep[i] = j
+
+    if not components:
+        return []
+    current = max(range(len(components)), key=lambda i: length[i])
+    path = []
+    while current is not None:
+        path.append(sorted(components[current])[0])
+        current = nextStep[current]
+    return path
+
+def _heavyPatterns(snapshot):
+    """
+    Find known expensive setups
+    @return: list of (pattern name, message, nodes)
+    """
+    drivers = {}
+    mdnChannels = {}
+    for src, dst in snapshot.connections:
+        srcNode, dstNode = _plugNode(src), _plugNode(dst)
+        srcType = snapshot.nodeTypes.get(srcNode, '')
+        if isConstraint(srcType) and not _plugAttr(dst) in _PARENT_ATTRS:
+            drivers.setdefault(dstNode, set()).add(srcType)
+        if snapshot.nodeTypes.get(dstNode) == 'multiplyDivide':
+            attr = _plugAttr(dst)
+            channels = mdnChannels.setdefault(dstNode, set())
+            if attr in _MDN_ALL_CHANNELS:
+                channels.update('XYZ')
+            elif attr in _MDN_CHANNELS:
+                channels.add(_MDN_CHANNELS[attr])
+
+    result = []
+    singles = sorted([node for node, channels in mdnChannels.items() if len(channels) == 1])
+    if len(singles) > 1:
+        result.append(('singleChannelMultiplyDivide',
+                       '%i multiplyDivide nodes use one channel each; '
+                       'up to three can share a node' % len(singles),
+                       singles))
+
+    triplets = sorted([node for node, types in drivers.items()
+                       if [t for t in _TRIPLET_TYPES if t.issubset(types)]])
+    if triplets:
+        result.append(('constraintTriplet',
+                       '%i nodes have separate translate, rotate and scale constraints; '
+                       'blending channels directly is cheaper' % len(triplets),
+                       triplets))
+    return result
+
+def analyze(snapshot):
+    """
+    Report the complexity of a snapshot
+    @type snapshot: SceneSnapshot
+    @return: dict with totals ('nodes', 'connections', 'constraints'),
+    'nodeTypes' {type: {'nodes', 'connections'}}, 'widgets' {widget name:
+    {'nodes', 'connections', 'constraints', 'nodeTypes'}}, 'criticalPath'
+    (list of nodes), 'criticalPathLength', 'cycles' (lists of nodes) and
+    'heavyPatterns' (list of (name, message, nodes))
+    """
+    nodeTypes = snapshot.nodeTypes
+    typeStats = {}
+    widgetStats = {}
+
+    def widgetStat(node):
+        owner = snapshot.owners.get(node, '')
+        return widgetStats.setdefault(owner, {'nodes': 0, 'connections': 0,
+                                              'constraints': 0, 'nodeTypes': {}})
+
+    for node, nodeType in nodeTypes.items():
+        typeStats.setdefault(nodeType, {'nodes': 0, 'connections': 0})['nodes'] += 1
+        stats = widgetStat(node)
+        stats['nodes'] += 1
+        stats['nodeTypes'][nodeType] = stats['nodeTypes'].get(nodeType, 0) + 1
+        if isConstraint(nodeType):
+            stats['constraints'] += 1
+
+    numConnections = 0
+    for src, dst in snapshot.connections:
+        srcNode = _plugNode(src)
+        if srcNode not in nodeTypes:
+            continue
+        numConnections += 1
+        typeStats[nodeTypes[srcNode]]['connections'] += 1
+        widgetStat(srcNode)['connections'] += 1
+
+    graph = snapshot.dependencies()
+    components = stronglyConnected(graph)
+    cycles = [sorted(c) for c in components if len(c) > 1]
+    path = criticalPath(graph, components)
+
+    return {'nodes': len(nodeTypes),
+            'connections': numConnections,
+            'constraints': len([t for t in nodeTypes.values() if isConstraint(t)]),
+            'nodeTypes': typeStats,
+            'widgets': widgetStats,
+            'criticalPath': path,
+            'criticalPathLength': len(path),
+            'cycles': cycles,
+            'heavyPatterns': _heavyPatterns(snapshot)}
+
+def checkLimits(report, maxNodes=None, maxConnections=None, maxConstraints=None,
+                maxCriticalPath=None, allowCycles=False):
+    """
+    Check a report against complexity limits
+    @return: list of messages for each limit exceeded; empty if the rig passes
+    """
+    failures = []
+    for key, limit in [('nodes', maxNodes),
+                       ('connections', maxConnections),
+                       ('constraints', maxConstraints),
+                       ('criticalPathLength', maxCriticalPath)]:
+        if limit is not None and report[key] > limit:
+            failures.append("%s: %i exceeds the limit of %i" % (key, report[key], limit))
+    if report['cycles'] and not allowCycles:
+        failures.append("%i dependency cycles" % len(report['cycles']))
+    return failures
+
+def formatReport(report):
+    """Get a report as readable text"""
+    lines = ['%i nodes, %i connections, %i constraints' % \
+             (report['nodes'], report['connections'], report['constraints']),
+             'critical path: %i nodes (%s)' % \
+             (report['criticalPathLength'], ' -> '.join(report['criticalPath'])),
+             '', 'widgets:']
+    for name in sorted(report['widgets']):
+        stats = report['widgets'][name]
+        lines.append('  %s: %i nodes, %i connections, %i constraints' % \
+                     (name or '<none>', stats['nodes'], stats['connections'], stats['constraints']))
+
+    lines.extend(['', 'node types:'])
+    byCount = sorted(report['nodeTypes'].items(), key=lambda item: -item[1]['nodes'])
+    for nodeType, stats in byCount:
+        lines.append('  %s: %i nodes, %i connections' % (nodeType, stats['nodes'], stats['connections']))
+
+    for cycle in report['cycles']:
+        lines.append('cycle: %s' % ', '.join(cycle))
+    for name, message, nodes in report['heavyPatterns']:
+        lines.append('%s: %s' % (name, message))
+    return '\n'.join(lines)
+
+def analyzeRig(root):
+    """
+    Snapshot and analyze a built rig
+    @param root: the top widget
+    @return: the report from analyze
+    """
+    report = analyze(SceneSnapshot.fromWidgets(root))
+    _logger.info(formatReport(report))
+    return report
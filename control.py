@@ -26,14 +26,13 @@ for f in fncs:
 """
 
 import logging, sys, copy, json, os, re
-import pymel.core as pm
 import maya.mel as MM
 import maya.cmds as MC
 import maya.OpenMaya as OM
 
 import utils
-reload(utils)
 import nodeTag
+pm = utils.LazyModule('pymel.core')
 
 _logger = logging.getLogger(__name__)
 _logger.setLevel(logging.INFO)
@@ -241,61 +240,148 @@ def getLockTag(node):
 
     return nodeTag.getTag(node, LOCKS_TAG_NAME)
 
-def _getLeafAttributes(node, attr, returnSelf=True):
+#{nodeType: {attr: (leafAttr, ...)}}.  Leaf attributes are queried once per
+#node type and attribute, then reused for every node of that type
+_leafAttrCache = {}
+
+def _getLeafAttributes(node, attr, nodeType=None):
     """
-    Get a list of child attributes.  If the attribute itself is the
-    leaf, return it in a list
+    Get a tuple of long names of the leaf children of an attribute.  If the
+    attribute itself is the leaf, its long name is returned in the tuple.
+    Non-existant attributes return an empty tuple.
     """
+    if nodeType is None:
+        nodeType = MC.nodeType(node)
+    typeCache = _leafAttrCache.setdefault(nodeType, {})
+    if attr in typeCache:
+        return typeCache[attr]
+
+    if not MC.attributeQuery(attr, n=node, ex=1):
+        #dynamic attrs might exist on other nodes of this type, so don't cache
+        return ()
+
     children = MC.attributeQuery(attr, n=node, lc=1)
     if not children:
-        if returnSelf:
-            return [attr]
-        else:
-            return []
-    for child in children:
-        children.extend(_getLeafAttributes(node, child, returnSelf=False))
-    return children
+        leaves = (MC.attributeQuery(attr, n=node, ln=1),)
+    else:
+        leaves = []
+        for child in children:
+            leaves.extend(_getLeafAttributes(node, child, nodeType=nodeType))
+        leaves = tuple(leaves)
 
+    typeCache[attr] = leaves
+    return leaves
 
-def setLocks(node):
+#{nodeType: (leafAttr, ...)} of the static leaf attributes keyable by default
+_keyableLeafCache = {}
+
+def _getKeyableLeaves(fn, nodeType):
     """
-    Lock a node according to its lock tag.
-    @param node: the node to lock
+    Get the long names of a node type's static leaf attributes that are
+    keyable by default.  Locking makes leaves unkeyable, so this is how the
+    leaves of a locked node are found again
+    @param fn: a function set attached to a node of the type
+    @type fn: MFnDependencyNode
     """
-
+    if nodeType not in _keyableLeafCache:
+        leaves = []
+        for i in range(fn.attributeCount()):
+            attr = fn.attribute(i)
+            if fn.attributeClass(attr) != OM.MFnDependencyNode.kNormalAttr or \
+                   attr.hasFn(OM.MFn.kCompoundAttribute):
+                continue
+            fnAttr = OM.MFnAttribute(attr)
+            if fnAttr.isKeyable():
+                leaves.append(fnAttr.name())
+        _keyableLeafCache[nodeType] = tuple(leaves)
+    return _keyableLeafCache[nodeType]
+
+#lock states applied for each lock tag type, in order
+_lockTypeStates = [('unlockedUnkeyable', {'l': False, 'k': False}),
+                   ('unlockedKeyable', {'l': False, 'k': True}),
+                   ('lockedKeyable', {'l': True, 'k': True})]
+
+def getLockPlan(node):
+    """
+    Get the final lock state of every keyable or channel box leaf attribute of
+    a node, with its lock tag merged in.  Each attribute appears once, so
+    applying a plan sets every plug a single time.
+    @param node: the node to plan
+    @type node: str
+    @return: dict of {longAttrName: {'l': bool, 'k': bool}}
+    """
+    node = str(node)
+    nodeType = MC.nodeType(node)
+    fn = utils.getHandle(node).fn(OM.MFnDependencyNode)
     lockData = getLockTag(node)
 
     attrs = set(MC.listAttr(node, k=True) or [])
     attrs.update(MC.listAttr(node, cb=True) or [])
+
+    plan = {}
     for attr in attrs:
         #don't lock compound attributes - just lock the 'leaf' children
-        if not MC.attributeQuery(attr, n=node, ex=1):
-            continue
+        for leaf in _getLeafAttributes(node, attr, nodeType=nodeType):
+            plan[leaf] = {'l': True, 'k': False}
 
-        children = MC.attributeQuery(attr, n=node, nc=1)
-        if children:
+    #leaves an earlier lock made unkeyable
+    for leaf in _getKeyableLeaves(fn, nodeType):
+        if leaf in plan:
             continue
-
         try:
-            MC.setAttr('%s.%s' % (node, attr), l=True, k=False)
-            _logger.debug("Locked '%s.%s'" % (node, attr))
-        except:
-            _logger.debug("Cannot lock %s.%s" % (node, attr))
-
-    d = {'unlockedKeyable': {'l': False, 'k': True},
-         'unlockedUnkeyable': {'l': False, 'k': False},
-         'lockedKeyable': {'l': True, 'k': True}}
+            locked = fn.findPlug(leaf, False).isLocked()
+        except RuntimeError:
+            continue
+        if locked:
+            plan[leaf] = {'l': True, 'k': False}
 
-    for lType, kwargs in d.items():
+    for lType, state in _lockTypeStates:
         for attr in lockData[lType]:
-            for childAttr in _getLeafAttributes(node, attr):
-                _logger.debug("setting %s: %s" % (lType, "%s.%s" % (node, childAttr)))
-                MC.setAttr('%s.%s' % (node, childAttr), **kwargs)
+            for leaf in _getLeafAttributes(node, attr, nodeType=nodeType):
+                plan[leaf] = copy.copy(state)
 
     if MC.objectType(node, isAType='joint') and not isControl(node):
-        _logger.debug('unlocking joint rotations for %s' % node)
-        for attr in ['rx', 'ry', 'rz']:
-            MC.setAttr('%s.%s' % (node, attr), l=False)
+        for leaf in ['rotateX', 'rotateY', 'rotateZ']:
+            plan.setdefault(leaf, {'l': False, 'k': False})['l'] = False
+
+    return plan
+
+def applyLockPlan(node, plan, unlock=False):
+    """
+    Apply a lock plan from getLockPlan.  Plugs are set directly through the
+    API, so no commands are issued per attribute
+    @param unlock=False: unlock all attributes in the plan.  Attributes the
+    plan locks get back their default keyable state, so they stay in the
+    channel box until they are relocked
+    """
+    node = str(node)
+    fn = utils.getHandle(node).fn(OM.MFnDependencyNode)
+    for attr, state in plan.iteritems():
+        try:
+            plug = fn.findPlug(attr, False)
+            keyable = state['k']
+            if unlock and state['l']:
+                keyable = keyable or OM.MFnAttribute(plug.attribute()).isKeyable()
+            plug.setKeyable(keyable)
+            plug.setLocked(False if unlock else state['l'])
+        except RuntimeError:
+            _logger.debug("Cannot set lock state on %s.%s" % (node, attr))
+
+def setLocks(node):
+    """
+    Lock a node according to its lock tag.
+    @param node: the node to lock
+    """
+    applyLockPlan(node, getLockPlan(node))
+
+def setLocksMany(nodes, unlock=False):
+    """
+    Lock many nodes according to their lock tags.
+    @param unlock=False: unlock the attributes that would be locked instead.
+    Use this to temporarily edit a locked rig; relock with unlock=False
+    """
+    for node in nodes:
+        applyLockPlan(node, getLockPlan(node), unlock=unlock)
 
 def isControl(xform):
     if nodeTag.hasTag(xform, CONTROL_TAG_NAME):
@@ -461,6 +547,76 @@ def setEditable(ctl, state):
         utils.parentShape(ctl, editor, deleteChildXform=True)
     return True
 
+_channelLongNames = {'tx': 'translateX', 'ty': 'translateY', 'tz': 'translateZ',
+                     'rx': 'rotateX', 'ry': 'rotateY', 'rz': 'rotateZ',
+                     'sx': 'scaleX', 'sy': 'scaleY', 'sz': 'scaleZ'}
+_channelCompounds = {'t': ['tx', 'ty', 'tz'],
+                     'r': ['rx', 'ry', 'rz'],
+                     's': ['sx', 'sy', 'sz']}
+
+def connectMirroredChannels(source, target, direct, inverted, name):
+    """
+    Drive a target transform's channels from a mirrored source.  Direct
+    channels are connected straight through - whole compounds at once where
+    possible - and up to three inverted channels share a single multiplyDivide.
+    Channels on the target that are already connected or locked are skipped,
+    and all connections are made with one DG modifier.
+    @param direct: channels to connect directly, ie ['ty', 'tz', 'rx']
+    @param inverted: channels to connect negated, ie ['tx', 'ry', 'rz']
+    @param name: name for the multiplyDivide nodes
+    @return: dict with the 'nodes' created, the number of 'connections' made,
+    and the 'legacyNodes' and 'legacyConnections' that mirroring with one
+    multiplyDivide per inverted channel would have needed
+    """
+    source = str(source)
+    target = str(target)
+    result = {'nodes': [], 'connections': 0,
+              'legacyNodes': 0, 'legacyConnections': 0}
+
+    srcFn = utils.getHandle(source).fn(OM.MFnDependencyNode)
+    tgtFn = utils.getHandle(target).fn(OM.MFnDependencyNode)
+
+    def isFree(channel):
+        plug = tgtFn.findPlug(_channelLongNames[channel], False)
+        if plug.isLocked() or plug.isConnected():
+            return False
+        parent = plug.parent()
+        return not (parent.isLocked() or parent.isConnected())
+
+    direct = [c for c in direct if isFree(c)]
+    inverted = [c for c in inverted if isFree(c)]
+    result['legacyNodes'] = len(inverted)
+    result['legacyConnections'] = len(direct) + 2 * len(inverted)
+
+    dgMod = OM.MDGModifier()
+
+    #connect whole compounds when all their children are direct
+    for compound, children in _channelCompounds.items():
+        if set(children).issubset(direct):
+            direct = [c for c in direct if c not in children]
+            dgMod.connect(srcFn.findPlug(compound, False), tgtFn.findPlug(compound, False))
+            result['connections'] += 1
+
+    for channel in direct:
+        dgMod.connect(srcFn.findPlug(_channelLongNames[channel], False),
+                      tgtFn.findPlug(_channelLongNames[channel], False))
+        result['connections'] += 1
+
+    for i in range(0, len(inverted), 3):
+        mdn = MC.createNode('multiplyDivide', n=name)
+        MC.setAttr('%s.input2' % mdn, -1, -1, -1, type='double3')
+        mdnFn = OM.MFnDependencyNode(utils.strToObj(mdn))
+        for channel, axis in zip(inverted[i:i + 3], 'XYZ'):
+            dgMod.connect(srcFn.findPlug(_channelLongNames[channel], False),
+                          mdnFn.findPlug('input1%s' % axis, False))
+            dgMod.connect(mdnFn.findPlug('output%s' % axis, False),
+                          tgtFn.findPlug(_channelLongNames[channel], False))
+            result['connections'] += 2
+        result['nodes'].append(mdn)
+
+    dgMod.doIt()
+    return result
+
 STORABLE_TAG_NAME = 'recordableXform'
 
 
@@ -701,6 +857,41 @@ def substituteInData(xformData, *args):
         result[k] = v
     return result
 
+def mirrorAxisFromChannels(inverted):
+    """
+    Get the axis a set of inverted mirror channels reflects across
+    @param inverted: inverted channels, ie ['tx', 'ry', 'rz']
+    @return: 0, 1 or 2
+    """
+    inverted = set(inverted)
+    for axis, name in enumerate('xyz'):
+        others = set(['r%s' % a for a in 'xyz' if a != name])
+        if inverted == others.union(['t%s' % name]):
+            return axis
+    raise RuntimeError("%s do not describe a mirror across an axis" % sorted(inverted))
+
+def mirrorStorableXformInfo(info, axis=0, mirrorShape=False):
+    """
+    Mirror the data from getStorableXformInfo across an axis - the data space
+    equivalent of connecting mirrored channels.  Parent names are not changed.
+    @param mirrorShape=False: mirror the control shape's t and r offsets too,
+    as happens when a control's editor is mirrored
+    @return: new info dict
+    """
+    info = copy.deepcopy(info)
+    if info.get('matrix', None) is not None:
+        info['matrix'] = utils.mirrorMatrix(info['matrix'], axis)
+    for key in ['jointOrient', 'rotation']:
+        if info.get(key, None):
+            info[key] = utils.mirrorEuler(info[key], axis)
+    if mirrorShape and info.get('controlArgs', None):
+        args = info['controlArgs']
+        if args.get('t', None):
+            args['t'] = [-v if i == axis else v for i, v in enumerate(args['t'])]
+        if args.get('r', None):
+            args['r'] = utils.mirrorEuler(args['r'], axis)
+    return info
+
 def _allParents(node):
     result = []
     parts = [x for x in MC.ls(node, l=1)[0].split('|') if x]
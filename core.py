@@ -1,22 +1,16 @@
 """
 The core widget and rig objects that custom widgets should inherit
 """
-import logging, re, copy, os, sys, __builtin__, json
+import logging, re, copy, os, sys, time, __builtin__, json, imp
 import maya.cmds as MC
-import pymel.core as PM
-from PyQt4 import QtCore, QtGui
 
 import control as control
-reload(control)
 import utils as utils
-reload(utils)
 
 from utils.Naming import Namer
 import options
-reload(options)
 
 import treeItem
-reload(treeItem)
 import nodeTag as NT
 
 
@@ -52,13 +46,28 @@ _setupLogging()
 
 #todo: move this to a module, ditch the singleton
 class WidgetRegistry(object):
-    """Singleton that keeps data about widgets that are part of the system"""
+    """
+    Singleton that keeps data about widgets that are part of the system.
+
+    Widget modules are found in the beings 'widgets' directory, the
+    directories in the BEINGS_WIDGET_PATH environment variable and any added
+    with addSearchPath.  What each module registers is cached in a manifest
+    file along with the module's modification time, so a module is only
+    imported when one of its widgets is instantiated or when its file changes.
+    """
     instance = None
+    MANIFEST_PATH = os.environ.get('BEINGS_WIDGET_MANIFEST',
+                                   os.path.join(os.path.expanduser('~'), '.beingsWidgetManifest.json'))
     def __new__(cls, *args, **kwargs):
         if cls != type(cls.instance):
             cls.instance = super(WidgetRegistry, cls).__new__(cls, *args, **kwargs)
             cls.instance._widgets = {}
             cls.instance._descriptions = {}
+            #{moduleName: {'path': path, 'mtime': mtime}} of widget modules
+            cls.instance._modules = {}
+            cls.instance._searchPaths = []
+            cls.instance._discovered = False
+            cls.instance._manifestRead = False
         return cls.instance
 
     def register(self, class_, niceName=None, description=None):
@@ -70,7 +79,7 @@ class WidgetRegistry(object):
         if description is None:
             description = 'No description provided'
         if niceName in self._widgets.keys() and \
-               self._widgets[niceName] != class_:
+               self._widgets[niceName] != (module, classname):
             _logger.warning("%s is already registered" % niceName)
             return False
 
@@ -91,16 +100,180 @@ class WidgetRegistry(object):
         raise RuntimeError("could not get widget name for %r" % instance)
 
     def widgetNames(self):
+        self.discover()
         return self._widgets.keys()
 
     def getInstance(self, widgetName):
+        self.discover()
         moduleName, className = self._widgets[widgetName]
-        module = sys.modules[moduleName]
+        module = self._getModule(moduleName)
         return getattr(module, className)()
 
     def getDescription(self, widgetName):
+        self.discover()
         return self._descriptions[widgetName]
 
+    def searchPaths(self):
+        """
+        Get the directories searched for widget modules
+        """
+        rootDir = os.path.dirname(sys.modules[__name__].__file__)
+        paths = [os.path.join(rootDir, 'widgets')]
+        envPaths = os.environ.get('BEINGS_WIDGET_PATH', '').split(os.pathsep)
+        for path in envPaths + self._searchPaths:
+            if path and os.path.abspath(path) not in paths:
+                paths.append(os.path.abspath(path))
+        return paths
+
+    def addSearchPath(self, path):
+        """
+        Add a directory of studio widgets.  Its modules are loaded with
+        the name 'beingsWidget_<module name>'
+        """
+        path = os.path.abspath(path)
+        if path not in self._searchPaths:
+            self._searchPaths.append(path)
+            self._discovered = False
+
+    def _widgetFiles(self):
+        """
+        @return: {moduleName: path} of the widget modules in the search paths
+        """
+        result = {}
+        for i, widgetsDir in enumerate(self.searchPaths()):
+            if not os.path.isdir(widgetsDir):
+                _logger.warning("Widget path %s does not exist" % widgetsDir)
+                continue
+            for base in os.listdir(widgetsDir):
+                path = os.path.join(widgetsDir, base)
+                #don't match py files starting with an underscore
+                match = re.match(r'^((?!_)[a-zA-Z0-9_]+)\.py$', base)
+                if match and os.path.isfile(path):
+                    name = match.groups()[0]
+                    if i == 0:
+                        result['beings.widgets.%s' % name] = path
+                    else:
+                        result['beingsWidget_%s' % name] = path
+        return result
+
+    def _readManifest(self):
+        if self._manifestRead:
+            return
+        self._manifestRead = True
+        if not os.path.exists(self.MANIFEST_PATH):
+            return
+        try:
+            with open(self.MANIFEST_PATH) as f:
+                data = loadJsonData(f)
+        except (IOError, ValueError), e:
+            _logger.warning("Could not read widget manifest %s: %s" % (self.MANIFEST_PATH, e))
+            return
+
+        for moduleName, info in data['modules'].items():
+            self._modules.setdefault(str(moduleName), info)
+        for niceName, (moduleName, className, description) in data['widgets'].items():
+            if niceName not in self._widgets:
+                self._widgets[niceName] = (str(moduleName), str(className))
+                self._descriptions[niceName] = description
+
+    def _writeManifest(self):
+        data = {'modules': self._modules, 'widgets': {}}
+        for niceName, (moduleName, className) in self._widgets.items():
+            if moduleName in self._modules:
+                data['widgets'][niceName] = [moduleName, className, self._descriptions[niceName]]
+        try:
+            with open(self.MANIFEST_PATH, 'w') as f:
+                json.dump(data, f, indent=1)
+        except IOError, e:
+            _logger.debug("Could not write widget manifest %s: %s" % (self.MANIFEST_PATH, e))
+
+    def _loadModule(self, moduleName, path):
+        """Import or reload a widget module, updating what it registers"""
+        for niceName, (m, c) in self._widgets.items():
+            if m == moduleName:
+                self._widgets.pop(niceName)
+                self._descriptions.pop(niceName)
+
+        moduleObj = sys.modules.get(moduleName, None)
+        if not moduleName.startswith('beings.widgets.'):
+            #modules outside the package aren't on the path, so reload by file
+            _logger.info('Loading %s' % path)
+            imp.load_source(moduleName, path)
+        elif moduleObj:
+            _logger.info('Reloading %s' % moduleName)
+            reload(moduleObj)
+        else:
+            _logger.info('Importing %s' % moduleName)
+            __builtin__.__import__(moduleName, globals(), locals(), [], -1)
+        self._modules[moduleName] = {'path': path, 'mtime': os.path.getmtime(path)}
+        return sys.modules[moduleName]
+
+    def _getModule(self, moduleName):
+        """Get a module, loading it if it isn't loaded or its file changed"""
+        info = self._modules.get(moduleName, None)
+        moduleObj = sys.modules.get(moduleName, None)
+        if not info:
+            return moduleObj
+        if not moduleObj or os.path.getmtime(info['path']) != info['mtime']:
+            moduleObj = self._loadModule(moduleName, info['path'])
+            self._writeManifest()
+        return moduleObj
+
+    def discover(self, force=False):
+        """
+        Find the widget modules in the search paths.  Modules recorded in the
+        manifest whose files haven't changed are not imported; new or changed
+        modules are imported, or reloaded if they were already loaded.
+        @param force=False: rescan the search paths even if they were
+        already scanned this session
+        """
+        if self._discovered and not force:
+            return
+        self._readManifest()
+        files = self._widgetFiles()
+        changed = False
+
+        for moduleName in self._modules.keys():
+            if moduleName not in files:
+                self._modules.pop(moduleName)
+                for niceName, (m, c) in self._widgets.items():
+                    if m == moduleName:
+                        self._widgets.pop(niceName)
+                        self._descriptions.pop(niceName)
+                changed = True
+
+        for moduleName, path in sorted(files.items()):
+            mtime = os.path.getmtime(path)
+            info = self._modules.get(moduleName, None)
+            if info and info['mtime'] == mtime and info['path'] == path:
+                continue
+            if not info and moduleName in sys.modules:
+                #imported directly rather than through the registry
+                self._modules[moduleName] = {'path': path, 'mtime': mtime}
+            else:
+                self._loadModule(moduleName, path)
+            changed = True
+
+        self._discovered = True
+        if changed:
+            self._writeManifest()
+
+    def loadAll(self, force=False):
+        """
+        Make sure all widget modules are loaded and up to date
+        @param force=False: reload modules even if their files haven't changed
+        @return: list of module names
+        """
+        self.discover(force=True)
+        for moduleName, info in sorted(self._modules.items()):
+            if force and moduleName in sys.modules:
+                self._loadModule(moduleName, info['path'])
+            else:
+                self._getModule(moduleName)
+        if force:
+            self._writeManifest()
+        return sorted(self._modules.keys())
+
 
 class BuildCheck(object):
     """
@@ -132,6 +305,335 @@ class BuildCheck(object):
         return new
 
 
+class BuildContext(object):
+    """
+    Run the decorated build method inside the build contexts:
+        - utils.UndoState, with the mode taken from an 'undoMode' kwarg or the
+          widget's BUILD_UNDO_MODE
+        - utils.DeferredEvaluation, enabled by a 'deferEvaluation' kwarg or the
+          widget's BUILD_DEFER_EVALUATION
+    Builds of children run inside their parent's contexts, so only the
+    top-level build touches the undo queue and refreshes the scene.
+    """
+    def __call__(self, method):
+        def new(thisObj, *args, **kwargs):
+            mode = kwargs.pop('undoMode', None) or thisObj.BUILD_UNDO_MODE
+            defer = kwargs.pop('deferEvaluation', None)
+            if defer is None:
+                defer = thisObj.BUILD_DEFER_EVALUATION
+            with utils.UndoState(mode):
+                with utils.DeferredEvaluation(enabled=defer):
+                    return method(thisObj, *args, **kwargs)
+        new.__name__  = method.__name__
+        new.__doc__   = method.__doc__
+        new.__dict__.update(method.__dict__)
+        return new
+
+
+class BuildJob(object):
+    """
+    Build a widget tree a widget at a time, so a caller like the ui can run
+    other code, report progress or cancel between widgets:
+
+        job = BuildJob(root, 'rig')
+        while job.step():
+            print job.done, job.total, job.elapsed()
+
+    Deferred evaluation (see BuildContext) and the undo state are entered at
+    the first step and held until the job ends, so the scene is refreshed
+    once at the end and a 'chunk' build is undone in one go.  Cancelling, or an error in a step,
+    deletes what the job built, so the scene isn't left with a partial
+    build.
+    """
+    def __init__(self, widget, buildType, undoMode=None, deferEvaluation=None, **kwargs):
+        """
+        @param widget: the widget to build
+        @param buildType: 'layout' or 'rig'
+        @param undoMode=None: see BuildContext.  Defaults to the widget's
+        BUILD_UNDO_MODE
+        @param deferEvaluation=None: see BuildContext.  Defaults to the
+        widget's BUILD_DEFER_EVALUATION
+        other kwargs are passed to the widget's buildLayout or buildRig
+        """
+        if buildType not in Widget.BUILD_TYPES:
+            raise utils.BeingsError("Invalid build type '%s'" % buildType)
+        self.widget = widget
+        self.buildType = buildType
+        self._undo = utils.UndoState(undoMode or widget.BUILD_UNDO_MODE)
+        if deferEvaluation is None:
+            deferEvaluation = widget.BUILD_DEFER_EVALUATION
+        self._defer = deferEvaluation
+        self._deferred = utils.DeferredEvaluation(enabled=deferEvaluation)
+
+        #widgets in the order the steps build them
+        self._order = [widget]
+        if buildType == 'rig' or kwargs.get('children', True):
+            def addChildren(parent):
+                for child in parent.children():
+                    self._order.append(child)
+                    addChildren(child)
+            addChildren(widget)
+
+        self.total = len(self._order)
+        self.done = 0
+        #the last widget built
+        self.current = None
+        self.results = []
+
+        if buildType == 'layout':
+            self._steps = widget.iterBuildLayout(**kwargs)
+        else:
+            self._steps = widget.iterBuildRig(**kwargs)
+        self._built = []
+        #handles of the nodes the steps created
+        self._nodes = []
+        self._finished = False
+        self._cancelled = False
+        self._startTime = None
+        self._endTime = None
+
+    def isFinished(self): return self._finished
+    def isCancelled(self): return self._cancelled
+
+    def elapsed(self):
+        """@return: seconds since the first step, up to the end of the job"""
+        if self._startTime is None:
+            return 0.0
+        return (self._endTime or time.time()) - self._startTime
+
+    def step(self):
+        """
+        Build the next widget.  The last step also finishes the build - it
+        runs the remaining callbacks and cleanup.  If the step raises, what
+        the job built is deleted before the error is re-raised
+        @return: True if there are more steps
+        """
+        if self._finished:
+            return False
+        if self._startTime is None:
+            self._startTime = time.time()
+            self._undo.__enter__()
+            self._deferred.__enter__()
+
+        try:
+            with utils.NodeTracker() as nt:
+                try:
+                    widget, result = self._steps.next()
+                    if self.done + 1 == self.total:
+                        #run what's left after the last widget
+                        for step in self._steps:
+                            pass
+                finally:
+                    self._nodes.extend(nt.getHandles())
+        except StopIteration:
+            self._finish()
+            return False
+        except:
+            _logger.error("%s build of %s failed after %i of %i widgets - deleting it" % \
+                          (self.buildType, self.widget.name(), self.done, self.total))
+            #the widget being built when the step failed
+            failed = self._order[len(self._built):len(self._built) + 1]
+            self._deleteBuilt(self._built + failed)
+            self._finish()
+            raise
+
+        if widget not in self._built:
+            self._built.append(widget)
+        self.done = len(self._built)
+        self.current = widget
+        self.results.append((widget, result))
+        if self.done >= self.total:
+            self._finish()
+            return False
+        return True
+
+    def run(self):
+        """Run all remaining steps"""
+        while self.step():
+            pass
+        return self.results
+
+    def cancel(self):
+        """
+        Stop building and delete what the job built.  Does nothing if the job
+        finished
+        """
+        if self._finished:
+            return
+        self._steps.close()
+        self._cancelled = True
+        _logger.info("Cancelled %s build of %s after %i of %i widgets" % \
+                     (self.buildType, self.widget.name(), self.done, self.total))
+        self._deleteBuilt(self._built)
+        self._finish()
+
+    def _deleteBuilt(self, widgets):
+        with utils.DeferredEvaluation(enabled=self._defer):
+            for widget in reversed(widgets):
+                if widget.state() != 'unbuilt':
+                    widget.delete(cache=False)
+            #nodes of a widget that failed before it was marked built
+            nodes = [h.name() for h in self._nodes if h.isValid()]
+            if nodes:
+                MC.delete(nodes)
+
+    def _finish(self):
+        self._finished = True
+        self._endTime = time.time()
+        if self._startTime is not None:
+            self._deferred.__exit__(None, None, None)
+            self._undo.__exit__(None, None, None)
+
+
+#file recorded build timings are kept in between sessions
+BUILD_TIMINGS_PATH = os.environ.get('BEINGS_BUILD_TIMINGS',
+                                    os.path.join(os.path.expanduser('~'), '.beingsBuildTimings.json'))
+#estimates average at most this many of the latest timings
+BUILD_TIMING_SAMPLES = 20
+#seconds estimated for steps that have never been timed
+DEFAULT_STEP_COSTS = {'delete': 0.1,
+                      'layout': 1.0,
+                      'throwawayLayout': 1.1,
+                      'mirror': 0.1,
+                      'rig': 1.0,
+                      'parent': 0.1}
+
+#{widget class name: {step type: [sample count, total seconds]}}
+_buildTimings = {}
+_buildTimingsLoaded = False
+
+def recordBuildTime(className, stepType, seconds):
+    """
+    Record how long a build step of a widget class took
+    @param className: the name of the widget class
+    @param stepType: one of DEFAULT_STEP_COSTS' keys
+    @param seconds: the time the step took
+    """
+    samples = _buildTimings.setdefault(className, {}).setdefault(stepType, [0, 0.0])
+    if samples[0] >= BUILD_TIMING_SAMPLES:
+        samples[1] *= (samples[0] - 1.0) / samples[0]
+        samples[0] -= 1
+    samples[0] += 1
+    samples[1] += seconds
+
+def estimateBuildTime(className, stepType, default=None):
+    """
+    Estimate the time a build step takes from recorded timings
+    @param default=None: the estimate if the class has no timings for the step.
+    If None, the average of all classes' timings for the step, or
+    DEFAULT_STEP_COSTS
+    @return: seconds
+    """
+    if not _buildTimingsLoaded:
+        loadBuildTimings()
+
+    samples = _buildTimings.get(className, {}).get(stepType, None)
+    if samples:
+        return samples[1] / samples[0]
+    if default is not None:
+        return default
+    averages = [t[stepType][1] / t[stepType][0] for t in _buildTimings.values() \
+                if t.get(stepType, None)]
+    if averages:
+        return sum(averages) / len(averages)
+    return DEFAULT_STEP_COSTS[stepType]
+
+def loadBuildTimings(path=None):
+    """
+    Load build timings saved with saveBuildTimings, keeping timings recorded
+    since for classes and steps the file doesn't have
+    @param path=None: the file.  Defaults to BUILD_TIMINGS_PATH
+    """
+    global _buildTimingsLoaded
+    _buildTimingsLoaded = True
+    path = path or BUILD_TIMINGS_PATH
+    if not os.path.exists(path):
+        return
+    try:
+        with open(path) as f:
+            data = loadJsonData(f)
+    except (IOError, ValueError), e:
+        _logger.warning("Could not read build timings from %s: %s" % (path, e))
+        return
+    for className, steps in data.items():
+        _buildTimings.setdefault(className, {}).update(steps)
+
+def saveBuildTimings(path=None):
+    """
+    Save the recorded build timings
+    @param path=None: the file.  Defaults to BUILD_TIMINGS_PATH
+    """
+    path = path or BUILD_TIMINGS_PATH
+    try:
+        with open(path, 'w') as f:
+            json.dump(_buildTimings, f, indent=2, sort_keys=True)
+    except IOError, e:
+        _logger.debug("Could not write build timings to %s: %s" % (path, e))
+
+
+class BuildStep(object):
+    """A step of a BuildPlan"""
+    def __init__(self, widget, stepType, cost, note=''):
+        self.widget = widget
+        self.stepType = stepType
+        #estimated seconds
+        self.cost = cost
+        self.note = note
+
+    def __repr__(self):
+        return "BuildStep(%r, %r, %.3f)" % (self.widget, self.stepType, self.cost)
+
+
+class BuildPlan(object):
+    """
+    The ordered steps a build would run, with estimated costs.  Made by
+    Widget.planBuild.  Step types are:
+        - delete: delete an existing build
+        - throwawayLayout: build and delete a layout to get diffs for a rig.
+          The widget's children's layouts are built too
+        - mirror: get a mirror target's diffs from its source
+        - layout, rig: build the widget's nodes
+        - parent: parent the widget's rig into its parent's
+    """
+    def __init__(self, widget, buildType, steps=None):
+        self.widget = widget
+        self.buildType = buildType
+        self.steps = steps or []
+
+    def __iter__(self): return iter(self.steps)
+    def __len__(self): return len(self.steps)
+
+    def add(self, widget, stepType, cost=None, note=''):
+        if cost is None:
+            cost = estimateBuildTime(widget.__class__.__name__, stepType)
+        step = BuildStep(widget, stepType, cost, note=note)
+        self.steps.append(step)
+        return step
+
+    def totalCost(self, stepTypes=None):
+        """
+        @param stepTypes=None: only add up these types of steps
+        @return: estimated seconds
+        """
+        return sum([s.cost for s in self.steps \
+                    if stepTypes is None or s.stepType in stepTypes])
+
+    def widgets(self, stepType):
+        """@return: the widgets with a stepType step, in order"""
+        return [s.widget for s in self.steps if s.stepType == stepType]
+
+    def format(self):
+        """@return: a table of the steps"""
+        lines = ["%s build of %s: %i steps, about %.1f seconds" % \
+                 (self.buildType, self.widget.name(), len(self.steps), self.totalCost())]
+        for i, step in enumerate(self.steps):
+            line = "%4i  %-16s %-40s %8.3f" % (i, step.stepType, step.widget.name(), step.cost)
+            if step.note:
+                line += "  (%s)" % step.note
+            lines.append(line)
+        return '\n'.join(lines)
+
+
 def _addControlToDisplayLayer(ctl, layer):
     if layer not in ['layout', 'rig']:
         raise RuntimeError("invalid layer")
@@ -165,6 +667,15 @@ class Widget(treeItem.PluggedTreeItem):
     '''
 
     BUILD_TYPES = ['layout', 'rig']
+    #builds are deleted rather than undone, so by default don't record them
+    #in the undo queue.  See utils.UndoState for other modes
+    BUILD_UNDO_MODE = 'suspend'
+    #suspend refreshes while building, and only evaluate nodes that need it.
+    #See utils.DeferredEvaluation
+    BUILD_DEFER_EVALUATION = True
+    #channels connected from a mirror source control to its target
+    MIRROR_DIRECT = ['tz', 'ty', 'rx', 'sx', 'sy', 'sz']
+    MIRROR_INVERTED = ['tx', 'ry', 'rz']
     VALID_NODE_CATEGORIES = ['dnt', 'cog', 'parent', 'ik']
     def __init__(self, part='widget', plugs=None):
         super(Widget, self).__init__(plugs=plugs)
@@ -179,7 +690,7 @@ class Widget(treeItem.PluggedTreeItem):
         self.options.subscribe('optChanged', self._optionChanged)
         self.options.subscribe('optAboutToChange', self._optionAboutToChange)
 
-        self._nodes = [] #stores all nodes
+        self._nodes = [] #stores handles of all nodes
         self.__state = 'unbuilt'
         self._joints = set()
         self._controls = set()
@@ -288,9 +799,11 @@ class Widget(treeItem.PluggedTreeItem):
             plug = self.plugOfChild(child)
             parentNode = self.__plugNodes[plug]
 
-            for node in child.getNodes('parent'):
+            nodes = child.getNodes('parent')
+            utils.syncEvaluation(nodes + [parentNode])
+            for node in nodes:
                 MC.parent(node, parentNode)
-                utils.fixInverseScale([node])
+            utils.fixInverseScale(nodes)
 
     def parentCompletedBuild(self, parent, buildType):
         if buildType == 'layout':
@@ -322,13 +835,14 @@ class Widget(treeItem.PluggedTreeItem):
                 if category not in self._nodeCategories.keys():
                     raise utils.BeingsError("Invalid category %s" % category)
 
-                nodes = [n for n in self._nodeCategories[category] if MC.objExists(n)]
-                self._nodeCategories[category] = copy.copy(nodes) # set it to the existing objs
+                handles = [h for h in self._nodeCategories[category] if h.isValid()]
+                self._nodeCategories[category] = handles # set it to the existing objs
+                nodes = [h.name() for h in handles]
 
                 if category == 'parent':
                     otherCategoryNodes = set([])
                     for grp in self._nodeCategories.values():
-                        otherCategoryNodes.update(grp)
+                        otherCategoryNodes.update([h.name() for h in grp if h.isValid()])
 
                     for n in self.getNodes():
                         if MC.objectType(n, isAType='transform') and not MC.listRelatives(n, parent=1):
@@ -338,9 +852,8 @@ class Widget(treeItem.PluggedTreeItem):
                                 nodes.append(n)
 
             else:
-                nodes = self._nodes
-                nodes = [n for n in nodes if MC.objExists(n)]
-                self._nodes = copy.copy(nodes)
+                self._nodes = [h for h in self._nodes if h.isValid()]
+                nodes = [h.name() for h in self._nodes]
 
         return nodes
 
@@ -404,12 +917,33 @@ class Widget(treeItem.PluggedTreeItem):
         self._controls.add(ctl)
 
 
+    @BuildContext()
     def buildLayout(self, useCachedDiffs=True, altDiffs=None, children=True):
+        """build the layout
+        @param undoMode=None: 'chunk', 'suspend' or 'none' - how the undo queue
+        records the build.  Defaults to BUILD_UNDO_MODE
+        @param deferEvaluation=None: suspend refreshes during the build.
+        Defaults to BUILD_DEFER_EVALUATION"""
+        steps = self.iterBuildLayout(useCachedDiffs=useCachedDiffs,
+                                     altDiffs=altDiffs, children=children)
+        widget, result = steps.next()
+        for step in steps:
+            pass
+        return result
+
+    def iterBuildLayout(self, useCachedDiffs=True, altDiffs=None, children=True):
+        """
+        Build the layout one widget at a time.  Takes the same args as
+        buildLayout, but doesn't enter the build contexts - see BuildJob
+        @return: a generator yielding (widget, result of its _makeLayout) after
+        each widget's nodes are built
+        """
         if self.state() != 'unbuilt':
             if self.state() == 'layoutBuilt':
                 self.cacheDiffs()
             self.delete()
 
+        start = time.time()
         self.__validateChildSettings()
 
         side = self.options.getValue('side')
@@ -429,11 +963,11 @@ class Widget(treeItem.PluggedTreeItem):
                 self.__state = 'layoutBuilt'
 
             finally:
-                self._nodes = nt.getObjects()
+                self._nodes = nt.getHandles()
 
         #parent all nodes under a single group
         parentToTopNode = []
-        for node in self._nodes:
+        for node in self.getNodes():
             if not MC.objectType(node, isAType='transform'):
                 continue
             if not MC.listRelatives(node, parent=1, pa=1) and node != topNode:
@@ -456,11 +990,14 @@ class Widget(treeItem.PluggedTreeItem):
         elif useCachedDiffs and self._cachedDiffs:
             self.applyDiffs(self.getDiffs(cached=True))
 
+        recordBuildTime(self.__class__.__name__, 'layout', time.time() - start)
+        yield self, result
 
         #build all children
         if children:
             for child in self.children():
-                child.buildLayout()
+                for step in child.iterBuildLayout():
+                    yield step
 
 
         #setup display layers
@@ -476,9 +1013,6 @@ class Widget(treeItem.PluggedTreeItem):
         #notify relatives build finished
         self.__notifyBuildComplete('layout')
 
-
-        return result
-
     def _makeLayout(self, namer):
         """
         build the layout
@@ -491,6 +1025,7 @@ class Widget(treeItem.PluggedTreeItem):
         Delete nodes
         """
         _logger.info("deleting %s" % self.name())
+        start = time.time()
         if deleteChildren:
             for child in self.children(recursive=True):
                 child.delete(cache=cache)
@@ -525,6 +1060,8 @@ class Widget(treeItem.PluggedTreeItem):
             self._nodeCategories[category] = []
         self._nodeStatus = {}
         self.__state = 'unbuilt'
+        if not deleteChildren:
+            recordBuildTime(self.__class__.__name__, 'delete', time.time() - start)
 
 
     @BuildCheck('layoutBuilt')
@@ -648,7 +1185,7 @@ class Widget(treeItem.PluggedTreeItem):
         if category not in self._nodeCategories.keys():
             raise utils.BeingsError("invalid category %s" % category)
 
-        self._nodeCategories[category].append(str(node))
+        self._nodeCategories[category].append(utils.getHandle(node))
 
     #TODO:  Move node statuses and categories into a new class - this one is
     #way too big.
@@ -662,11 +1199,30 @@ class Widget(treeItem.PluggedTreeItem):
             raise utils.BeingsError("Invalid status '%s'" % status)
         status = self._nodeStatus[node] = status
 
+    @BuildContext()
     def buildRig(self, altDiffs=None, returnBeforeBuild=False, skipCallbacks=False):
         """build the rig
         @param altDiffs=None: Use the provided diff dict instead of the internal diffs
         @param returnBeforeBuild=False:  for developing rig methods.  Returns the args
-        passed tot he _makeRig method"""
+        passed tot he _makeRig method
+        @param undoMode=None: 'chunk', 'suspend' or 'none' - how the undo queue
+        records the build.  Defaults to BUILD_UNDO_MODE
+        @param deferEvaluation=None: suspend refreshes during the build.
+        Defaults to BUILD_DEFER_EVALUATION"""
+        steps = self.iterBuildRig(altDiffs=altDiffs, returnBeforeBuild=returnBeforeBuild,
+                                  skipCallbacks=skipCallbacks)
+        widget, result = steps.next()
+        for step in steps:
+            pass
+        return result
+
+    def iterBuildRig(self, altDiffs=None, returnBeforeBuild=False, skipCallbacks=False):
+        """
+        Build the rig one widget at a time.  Takes the same args as buildRig,
+        but doesn't enter the build contexts - see BuildJob
+        @return: a generator yielding (widget, result of its _makeRig) after
+        each widget's nodes are built
+        """
         self.__validateChildSettings()
 
         if self.state() == 'rigBuilt' or self.state() == 'layoutBuilt':
@@ -674,21 +1230,19 @@ class Widget(treeItem.PluggedTreeItem):
 
         if altDiffs is not None:
             self._cachedDiffs = altDiffs
-        elif not self._cachedDiffs:
-            self.buildLayout()
-            self.delete()
+        else:
+            self._resolveCachedDiffs()
 
         for child in self.children(recursive=True):
             if child.state() == 'rigBuilt' or child.state() == 'layoutBuilt':
                 child.delete()
-            if not child._cachedDiffs:
-                child.buildLayout()
-                child.delete()
+            child._resolveCachedDiffs()
 
         #this seems to be a bug - if refresh isn't called, there is some odd behavior when things
-        #are dupicated
-        MC.refresh()
+        #are dupicated.  When evaluation is deferred, nodes are synced as they're parented instead
+        utils.syncEvaluation()
 
+        start = time.time()
         namer = Namer(self.options.getValue('char'),
                       side=self.options.getValue('side'),
                       part=self.options.getValue('part'))
@@ -704,28 +1258,35 @@ class Widget(treeItem.PluggedTreeItem):
 
             #kwarg for debugging
             if returnBeforeBuild:
-                self._nodes = [n for n in nt.getObjects() if MC.objExists(n)]
+                self._nodes = nt.getHandles()
                 self.__state = 'rigBuilt'
-                return  namer
+                yield self, namer
+                return
 
             #make the rig
             result = self._makeRig(namer)
             self.__state = 'rigBuilt'
 
-            self._nodes = [n for n in nt.getObjects() if MC.objExists(n)]
+            self._nodes = nt.getHandles()
 
         #Check that the rig was created properly
         for plug in self.plugs():
             if plug not in self.__plugNodes:
                 _logger.warning("The '%s' plug was not assigned a a node" % plug)
 
+        recordBuildTime(self.__class__.__name__, 'rig', time.time() - start)
+        yield self, result
+
         #build children
         for child in self.children():
-            child.buildRig(skipCallbacks=skipCallbacks)
+            for step in child.iterBuildRig(skipCallbacks=skipCallbacks):
+                yield step
 
         #notify relatives that build finished
         if not skipCallbacks:
+            start = time.time()
             self.__notifyBuildComplete('rig')
+            recordBuildTime(self.__class__.__name__, 'parent', time.time() - start)
 
         #cleanup
         nodes = self.getNodes()
@@ -733,19 +1294,125 @@ class Widget(treeItem.PluggedTreeItem):
         for cst in csts:
             utils.fixJointConstraints(utils.getConstraintSlave(cst))
 
-        jnts = [x for x in nodes if MC.objectType(x, isAType='joint')]
-        utils.fixInverseScale(jnts)
-
-        return result
+        #non-joints are skipped
+        utils.fixInverseScale(nodes)
 
-    def lockNodes(self, recursive=True):
-        nodes = [x for x in self.getNodes() if MC.objectType(x, isAType='dagNode')]
-        for node in nodes:
-            control.setLocks(node)
+    def planBuild(self, buildType, altDiffs=None, children=True, skipCallbacks=False):
+        """
+        Plan a build without running it or touching the scene.  The plan
+        follows the order buildLayout and buildRig work in, and estimates
+        costs from timings of earlier builds
+        @param buildType: 'layout' or 'rig'
+        @param altDiffs=None: for rig builds - diffs that will be passed to
+        buildRig, so this widget doesn't need a throwaway layout
+        @param children=True: for layout builds - whether children are built
+        @param skipCallbacks=False: for rig builds - whether parenting is
+        skipped
+        @return: a BuildPlan
+        """
+        if buildType not in self.BUILD_TYPES:
+            raise utils.BeingsError("Invalid build type '%s'" % buildType)
 
+        plan = BuildPlan(self, buildType)
+        if buildType == 'layout':
+            def buildLayout(widget):
+                if widget.state() != 'unbuilt':
+                    plan.add(widget, 'delete', note=widget.state())
+                plan.add(widget, 'layout')
+                if children:
+                    for child in widget.children():
+                        buildLayout(child)
+            buildLayout(self)
+            return plan
+
+        #simulate the states and diffs _resolveCachedDiffs works from
+        states = {}
+        hasDiffs = {}
+        for widget in [self] + self.children(recursive=True):
+            states[widget] = widget.state()
+            hasDiffs[widget] = bool(widget._cachedDiffs)
+
+        def delete(widget):
+            if states[widget] != 'unbuilt':
+                plan.add(widget, 'delete', note=states[widget])
+                if states[widget] == 'layoutBuilt':
+                    hasDiffs[widget] = True
+                states[widget] = 'unbuilt'
+
+        def resolve(widget):
+            if widget.mirroredState() == 'target':
+                source = widget.getMirrorableWidget()
+                if source:
+                    if source not in hasDiffs:
+                        states[source] = source.state()
+                        hasDiffs[source] = bool(source._cachedDiffs)
+                    if not hasDiffs[source]:
+                        resolve(source)
+                    plan.add(widget, 'mirror', note='from %s' % source.name())
+                    hasDiffs[widget] = True
+                    return
+            if not hasDiffs[widget]:
+                #the layouts of the widget's children are built too, and
+                #left for their deletes to cache
+                subtree = widget.children(recursive=True)
+                default = sum([estimateBuildTime(w.__class__.__name__, 'layout') \
+                               for w in [widget] + subtree])
+                cost = estimateBuildTime(widget.__class__.__name__, 'throwawayLayout',
+                                         default=default)
+                plan.add(widget, 'throwawayLayout', cost=cost, note='no cached diffs')
+                for child in subtree:
+                    if states.get(child, child.state()) == 'layoutBuilt':
+                        hasDiffs[child] = True
+                    states[child] = 'layoutBuilt'
+                hasDiffs[widget] = True
+
+        delete(self)
+        if altDiffs is None:
+            resolve(self)
+        for child in self.children(recursive=True):
+            delete(child)
+            resolve(child)
+
+        def build(widget):
+            plan.add(widget, 'rig')
+            for child in widget.children():
+                build(child)
+            if not skipCallbacks and widget.parent():
+                plan.add(widget, 'parent', note='into %s' % widget.parent().name())
+        build(self)
+        return plan
+
+    def _lockableNodes(self, recursive=True, controlsOnly=False):
+        widgets = [self]
         if recursive:
-            for child in self.children():
-                child.lockNodes(recursive=recursive)
+            widgets.extend(self.children(recursive=True))
+        nodes = []
+        for widget in widgets:
+            if widget.state() == 'unbuilt':
+                continue
+            nodes.extend(widget.getNodes())
+        nodes = MC.ls(nodes, type='dagNode') or []
+        if controlsOnly:
+            nodes = NT.getNodesWithTag(control.CONTROL_TAG_NAME, inNodeList=nodes)
+        return nodes
+
+    def lockNodes(self, recursive=True, controlsOnly=False):
+        """
+        Lock all dag nodes according to their lock tags
+        @param controlsOnly=False: only lock controls
+        """
+        control.setLocksMany(self._lockableNodes(recursive=recursive,
+                                                 controlsOnly=controlsOnly))
+
+    def unlockNodes(self, recursive=True, controlsOnly=True):
+        """
+        Unlock the attributes lockNodes would lock, ie for tweaking a
+        layout.  Relock with lockNodes
+        @param controlsOnly=True: only unlock controls
+        """
+        control.setLocksMany(self._lockableNodes(recursive=recursive,
+                                                 controlsOnly=controlsOnly),
+                             unlock=True)
 
     def _makeRig(self, namer):
         return namer
@@ -810,16 +1477,24 @@ class Widget(treeItem.PluggedTreeItem):
     def _preMirror(self, thisCtl, otherCtl, thisNamer, otherNamer):
         return False
 
+    def _mirrorChannels(self, thisCtl, thisNamer):
+        """
+        Get the (direct, inverted) channels used to mirror a control.  Widgets
+        whose controls mirror across a different axis can override this
+        """
+        return (self.MIRROR_DIRECT, self.MIRROR_INVERTED)
+
     @BuildCheck('layoutBuilt')
     def mirror(self, other, template=False):
         '''
         Mirror this widget to another widget.  this assumes controls are in world space.
         Templates mirrored controls
+        @return: dict of the DG 'nodes' and 'connections' made, and the
+        'nodesSaved' and 'connectionsSaved' compared to mirroring with one
+        multiplyDivide per inverted channel
         '''
         diffs = self.getDiffs(generic=True)
         otherDiffs = other.getDiffs(generic=True)
-        direct = ['tz', 'ty', 'rx', 'sx', 'sy', 'sz']
-        inverted = ['tx', 'ry', 'rz']
         namer = Namer(self.options.getValue('char'),
                           self.options.getValue('side'),
                           self.options.getValue('part'))
@@ -828,6 +1503,8 @@ class Widget(treeItem.PluggedTreeItem):
                            other.options.getValue('side'),
                            other.options.getValue('part'))
 
+        stats = {'nodes': 0, 'connections': 0, 'nodesSaved': 0, 'connectionsSaved': 0}
+
         for ctlType in ['layout', 'rig']:
             rebuildData = diffs[ctlType]
             otherRebuildData = otherDiffs[ctlType]
@@ -863,40 +1540,116 @@ class Widget(treeItem.PluggedTreeItem):
                     #set up the mirroring and can be skipped
                     with utils.NodeTracker() as nt:
                         if self._preMirror(thisCtl, otherCtl, namer, otherNamer):
-                            self._nodes.extend(nt.getObjects())
+                            self._nodes.extend(nt.getHandles())
                             continue
 
+                    direct, inverted = self._mirrorChannels(thisCtl, namer)
+                    result = control.connectMirroredChannels(
+                        thisCtl, otherCtl, direct, inverted,
+                        namer.name(d='%sTo%s' % (thisCtl, otherCtl)))
+                    self._nodes.extend([utils.getHandle(n) for n in result['nodes']])
+
+                    stats['nodes'] += len(result['nodes'])
+                    stats['connections'] += result['connections']
+                    stats['nodesSaved'] += result['legacyNodes'] - len(result['nodes'])
+                    stats['connectionsSaved'] += result['legacyConnections'] - result['connections']
+
+        _logger.info("Mirrored %s to %s with %i nodes and %i connections (saved %i nodes, %i connections)" % \
+                     (self.name(), other.name(), stats['nodes'], stats['connections'],
+                      stats['nodesSaved'], stats['connectionsSaved']))
+        return stats
+
+    def _mirroredNodeName(self, node, other, namer, otherNamer):
+        """Get the name of a node of this widget on the mirrored widget"""
+        if node is None:
+            return None
+        if node == self.name():
+            return other.name()
+        try:
+            toks = Namer.getTokensFromName(node)
+        except RuntimeError:
+            return node
+        if toks['side'] != namer.getToken('side') or \
+               toks['part'] != namer.getToken('part'):
+            return node
+        return utils.getFullNodeName(utils.getGenericNodeName(node), namer=otherNamer)
+
+    def getMirroredDiffs(self):
+        """
+        Compute this widget's generic diffs from its mirror source's diffs,
+        without building layouts or connecting anything.  Channels are mirrored
+        with the source's _mirrorChannels, the same as Widget.mirror.
+        @return: generic diffs, or None if this isn't a mirror target or the
+        source has no diffs
+        """
+        if self.mirroredState() != 'target':
+            return None
+        source = self.getMirrorableWidget()
+        if not source:
+            return None
+        if source.state() == 'unbuilt' and not source._cachedDiffs:
+            return None
 
-                    for attr in direct:
-                        try:
-                            MC.connectAttr('%s.%s' % (thisCtl, attr),
-                                           '%s.%s' % (otherCtl, attr))
-                        except RuntimeError:
-                            pass
-                        except Exception, e:
-                            _logger.warning("Error during connection: %s" % str(e))
-
-                    for attr in inverted:
-                        fromAttr = '%s.%s' % (thisCtl, attr)
-                        toAttr = '%s.%s' % (otherCtl, attr)
-
-
-                        mdn = MC.createNode('multiplyDivide',
-                                            n=namer.name(d='%s%sTo%s%s' % (thisCtl,attr,otherCtl,attr)))
+        sourceDiffs = source.getDiffs(generic=True)
+        namer = Namer(source.options.getValue('char'),
+                      source.options.getValue('side'),
+                      source.options.getValue('part'))
+        otherNamer = Namer(self.options.getValue('char'),
+                           self.options.getValue('side'),
+                           self.options.getValue('part'))
 
-                        MC.setAttr('%s.input2X' % mdn, -1)
-                        MC.setAttr('%s.operation' % mdn, 1)
+        result = {}
+        for diffType in ['rig', 'layout', 'joints']:
+            ownDiffs = self._cachedDiffs.get(diffType, {})
+            result[diffType] = {}
+            for genericName, info in sourceDiffs.get(diffType, {}).iteritems():
+                fullName = utils.getFullNodeName(genericName, namer=namer)
+                axis = control.mirrorAxisFromChannels(
+                    source._mirrorChannels(fullName, namer)[1])
+                new = control.mirrorStorableXformInfo(info, axis)
+
+                #rig controls always have editors, and mirror their shapes
+                #through them
+                if diffType == 'rig' and new.get('controlArgs', None):
+                    editorAxis = control.mirrorAxisFromChannels(
+                        source._mirrorChannels('%s_editor' % fullName, namer)[1])
+                    editorInfo = control.mirrorStorableXformInfo(info, editorAxis,
+                                                                 mirrorShape=True)
+                    new['controlArgs'] = editorInfo['controlArgs']
+
+                    #anything not mirrored, ie colors, comes from this side
+                    own = ownDiffs.get(genericName, {}).get('controlArgs', None)
+                    if own:
+                        own = copy.deepcopy(own)
+                        for key in ['t', 'r', 's']:
+                            own[key] = new['controlArgs'].get(key, own.get(key))
+                        new['controlArgs'] = own
+
+                new['parent'] = source._mirroredNodeName(new.get('parent', None),
+                                                         self, namer, otherNamer)
+                result[diffType][genericName] = new
+        return result
 
-                        MC.connectAttr(fromAttr, '%s.input1X' % mdn)
-                        try:
-                            MC.connectAttr('%s.outputX' % mdn, toAttr)
-                        except RuntimeError:
-                            MC.delete(mdn)
-                        except Exception, e:
-                            _logger.warning("Error during connection: %s" % str(e))
-                            MC.delete(mdn)
-                        else:
-                            self._nodes.append(mdn)
+    def _resolveCachedDiffs(self):
+        """
+        Make sure there are cached diffs to build a rig from.  Mirror targets
+        get theirs from their source's diffs; widgets without diffs build and
+        delete a layout
+        """
+        if self.mirroredState() == 'target':
+            source = self.getMirrorableWidget()
+            if source:
+                if not source._cachedDiffs:
+                    source._resolveCachedDiffs()
+                start = time.time()
+                self.setDiffs(self.getMirroredDiffs(), generic=True)
+                recordBuildTime(self.__class__.__name__, 'mirror', time.time() - start)
+                return
+        if not self._cachedDiffs:
+            start = time.time()
+            self.buildLayout()
+            self.delete()
+            recordBuildTime(self.__class__.__name__, 'throwawayLayout', time.time() - start)
 
 class Root(Widget):
     """Builds a master control and main hierarchy of a rig"""
@@ -918,7 +1671,6 @@ class Root(Widget):
 
 
     def childCompletedBuild(self, child, buildType):
-        MC.refresh()
         if buildType == 'rig':
             if self.root() == self:
                 children = child.children(recursive=True) + [child]
@@ -939,7 +1691,7 @@ class Root(Widget):
                     if dntNodes:
                         for dntNode in dntNodes:
                             rels = MC.listRelatives(dntNode)
-                            MC.refresh()
+                            utils.syncEvaluation([dntNode, self._otherNodes['dnt']])
                             MC.parent(dntNode, self._otherNodes['dnt'])
                             newRels = MC.listRelatives(dntNode)
                             diff = set(newRels).difference(rels)
@@ -949,9 +1701,9 @@ class Root(Widget):
                     ikNodes = child.getNodes('ik')
                     for node in ikNodes:
                         if child.nodeStatus(node) != 'handled':
-                            MC.refresh()
+                            utils.syncEvaluation([node, self.plugNode('master')])
                             MC.parent(node, self.plugNode('master'))
-        MC.refresh()
+
         super(Root, self).childCompletedBuild(child, buildType)
 
 
@@ -1020,7 +1772,6 @@ class CenterOfGravity(Widget):
 
     def childCompletedBuild(self, child, buildType):
         """Find all child nodes set to 'cog' or 'ik'"""
-        MC.refresh()
         if buildType == 'rig' and self.root() == self:
 
             children = child.children(recursive=True) + [child]
@@ -1028,10 +1779,10 @@ class CenterOfGravity(Widget):
                 cogNodes = child.getNodes('ik')
                 cogNodes.extend(child.getNodes('cog'))
                 if cogNodes:
+                    utils.syncEvaluation(cogNodes + [self.plugNode('cog_bnd')])
                     MC.parent(cogNodes, self.plugNode('cog_bnd'))
                     for node in cogNodes:
                         child.setNodeStatus(node, 'handled')
-        MC.refresh()
 
         super(CenterOfGravity, self).childCompletedBuild(child, buildType)
 
@@ -1128,198 +1879,6 @@ class CenterOfGravity(Widget):
 
 WidgetRegistry().register(CenterOfGravity, 'Center Of Gravity', 'Put body widgets under this')
 
-class RigModel(QtGui.QStandardItemModel):
-
-    #a dummy object used as the 'root' of the rig
-    WIDGET_ROLE = QtCore.Qt.UserRole + 2
-
-    def __init__(self, parent=None):
-        super(RigModel, self).__init__(parent=parent)
-        self.root = Root()
-        rootItem = self.invisibleRootItem()
-        rootItem.setData(self.root, self.WIDGET_ROLE)
-
-        self.headers = ['Part', 'Side', 'Parent Part', 'Class', 'Mirrored']
-
-        self.reset()
-
-        self._mimeDataWidgets = []
-
-    def _aboutToRemoveChild(self, event):
-        #TODO:  this is dirty - should't set object attrs from ui code.  fix this.
-        parent = event.parent
-        child = event.child
-        mw = child.getMirrorableWidget()
-        if mw:
-            mw._mirroring = ''
-            self.itemFromWidget(mw)
-        child.mirroring = ''
-        _logger.debug("Added child %r under parent %s" % (child, parent))
-
-
-    def widgetFromIndex(self, index):
-        item = self.itemFromIndex(index)
-        if item.column() != 0:
-            parent = item.parent()
-            if not parent:
-                item = self.item(item.row(), 0)
-            else:
-                item = parent.child(item.row(), 0)
-
-        return item.data(self.WIDGET_ROLE).toPyObject()
-
-    def itemFromWidget(self, widget, rootItem=None):
-        if widget == self.root:
-            return self.invisibleRootItem()
-
-        if not rootItem:
-            rootItem = self.invisibleRootItem()
-
-        for row in range(rootItem.rowCount()):
-            childItem = rootItem.child(row, 0)
-            childWidget = childItem.data(self.WIDGET_ROLE).toPyObject()
-            if childWidget == widget:
-                return childItem
-            item = self.itemFromWidget(widget, rootItem=childItem)
-            if item:
-                return item
-
-        return None
-
-    def refreshWidgetItems(self, widget):
-        widgetItem = self.itemFromWidget(widget)
-        widgetIndex = widgetItem.index()
-        for i, colName in enumerate(self.headers):
-            colIndex = self.index(widgetIndex.row(), i, widgetIndex.parent())
-            colItem = self.itemFromIndex(colIndex)
-            if colName == 'Part':
-                colItem.setText(widget.options.getValue('part'))
-            elif colName == 'Side':
-                colItem.setText(widget.options.getValue('side'))
-            elif colName == 'Mirrored':
-                colItem.setText(widget.getMirroredState())
-            elif colName == 'Parent Part':
-                colItem.setText(widget.plugOfParent())
-
-
-    def reset(self, root=None):
-        self.clear()
-        del self.root
-
-        if root:
-            self.root = root
-        else:
-            self.root = Root()
-
-        self.root.subscribe('aboutToRemoveChild', self._aboutToRemoveChild)
-        self.root.subscribe('addedChild', self._addedChild)
-        self.root.subscribe('removedChild', self._removedChild)
-
-        self.setHorizontalHeaderLabels(self.headers)
-        self.setColumnCount(len(self.headers))
-
-        for child in self.root.children():
-            self.addWidgetItems(child)
-
-    def addWidgetItems(self, widget):
-        parent = widget.parent()
-        parentItem = self.itemFromWidget(parent)
-        rowIndex = parentItem.rowCount()
-        childItem = QtGui.QStandardItem(widget.options.getValue('part'))
-        childItem.setData(widget, self.WIDGET_ROLE)
-
-        flags =  QtCore.Qt.ItemIsEnabled | \
-                QtCore.Qt.ItemIsSelectable | \
-                QtCore.Qt.ItemIsEditable | \
-                QtCore.Qt.ItemIsDragEnabled | \
-                QtCore.Qt.ItemIsDropEnabled
-
-        childItem.setFlags(flags)
-
-
-        parentItem.appendRow(childItem)
-
-        parentItem.setChild(rowIndex, self.headers.index('Side'),
-                            QtGui.QStandardItem(widget.options.getValue('side')))
-        parentItem.setChild(rowIndex, self.headers.index('Parent Part'),
-                            QtGui.QStandardItem(widget.parent().plugOfChild(widget)))
-        parentItem.setChild(rowIndex, self.headers.index('Class'),
-                            QtGui.QStandardItem(widget.__class__.__name__))
-        parentItem.setChild(rowIndex, self.headers.index('Mirrored'),
-                            QtGui.QStandardItem(widget.mirroredState()))
-
-        for child in widget.children():
-            self.addWidgetItems(child)
-
-    def _addedChild(self, event):
-        parent = event.parent
-        child = event.child
-        _logger.debug("Added child %r under parent %s" % (child, parent))
-
-        self.addWidgetItems(child)
-
-
-    def _removedChild(self, event):
-        parent = event.parent
-        child = event.child
-        _logger.debug("Added child %r under parent %s" % (child, parent))
-
-        parentItem = self.itemFromWidget(parent)
-        childItem = self.itemFromWidget(child)
-        childRow = childItem.index().row()
-        parentItem.removeRow(childRow)
-        for child in parent.children():
-            self.refreshWidgetItems(child)
-
-    def mimeTypes(self):
-        types = QtCore.QStringList()
-        types.append('application/x-widgetlist')
-        types.append('application/x-widget-classname')
-        return types
-
-    def mimeData(self, indexList):
-        widgets = []
-
-        for index in indexList:
-            widget = self.widgetFromIndex(index)
-            widgets.append(widget)
-
-        self._mimeDataWidgets = list(set(widgets))
-
-        mimeData = QtCore.QMimeData()
-        mimeData.setData("application/x-widgetlist", QtCore.QByteArray())
-
-        return mimeData
-
-    def dropMimeData(self, mimedata, action, row, column, parentIndex):
-        if parentIndex.isValid():
-            newParent = self.widgetFromIndex(parentIndex)
-        else:
-            newParent = self.root
-
-        if mimedata.hasFormat('application/x-widgetlist'):
-            for widget in self._mimeDataWidgets:
-                if widget.parent() is newParent:
-                    continue
-                if widget is newParent:
-                    continue
-
-                widget.parent().rmChild(widget)
-                newParent.addChild(widget)
-
-        elif mimedata.hasFormat('application/x-widget-classname'):
-            data = mimedata.data('application/x-widget-classname')
-            stream = QtCore.QDataStream(data, QtCore.QIODevice.ReadOnly)
-            classname = QtCore.QString()
-            stream >> classname
-            widget = WidgetRegistry().getInstance(str(classname))
-            newParent.addChild(widget)
-        return True
-
-    def supportedDropActions(self):
-        return QtCore.Qt.MoveAction | QtCore.Qt.CopyAction
-
-
 def loadJsonData(f):
     """
     Convert strings to unicode
@@ -1338,7 +1897,6 @@ def loadJsonData(f):
 
 
 def buildRig(fromPath=None, skipBuild=False):
-    _importAllWidgets(reloadThem=True)
     if fromPath:
         if not os.path.exists(fromPath):
             raise RuntimeError("%s does not exist" % fromPath)
@@ -1380,7 +1938,11 @@ def getSaveData(widget):
             wdata['parentID'] = str(id(widget.parent()))
             wdata['plug'] = str(widget.parent().plugOfChild(widget))
         wdata['options'] = widget.options.getData()
-        wdata['diffs'] = widget.getDiffs(generic=True)
+        wdata['diffs'] = None
+        if widget.state() == 'unbuilt':
+            wdata['diffs'] = widget.getMirroredDiffs()
+        if wdata['diffs'] is None:
+            wdata['diffs'] = widget.getDiffs(generic=True)
         wdata['widgetName'] = registry.widgetName(widget)
         result[str(id(widget))] = wdata
 
@@ -1423,25 +1985,7 @@ def rigFromData(data):
 
 def _importAllWidgets(reloadThem=False):
     """
-    Import all modules in 'widgets' directories.
+    Import all modules in the widget search paths.
+    @param reloadThem=False: reload modules even if their files haven't changed
     """
-    rootDir = os.path.dirname(sys.modules[__name__].__file__)
-    widgetsDir = os.path.join(rootDir, 'widgets')
-    _logger.info("Loading widgets from %s" %  widgetsDir)
-    modules = []
-    for base in os.listdir(widgetsDir):
-        path = os.path.join(widgetsDir, base)
-        #don't match py files starting with an underscore
-        match = re.match(r'^((?!_)[a-zA-Z0-9_]+)\.py$', base)
-        if match and os.path.isfile(path):
-            name = match.groups()[0]
-            modules.append('beings.widgets.%s' % name)
-    for module in modules:
-        moduleObj = sys.modules.get(module, None)
-        if moduleObj and reloadThem:
-            _logger.info('Reloading %s' % module)
-            reload(sys.modules[module])
-        else:
-            _logger.info('Importing %s' % module)
-            __builtin__.__import__(module, globals(), locals(), [], -1)
-    return modules
+    return WidgetRegistry().loadAll(force=reloadThem)
@@ -0,0 +1,161 @@
+"""
+Development helpers.  Importing beings no longer reloads anything, so after
+editing code reload it with:
+
+import beings.dev
+beings.dev.reloadAll()
+"""
+import logging, sys, time
+
+_logger = logging.getLogger(__name__)
+
+#modules are reloaded in this order, so each one picks up the reloaded
+#versions of the modules it imports
+_reloadOrder = ['beings.utils.Exceptions',
+                'beings.utils.PyUtils',
+                'beings.utils.BatchMath',
+                'beings.utils.Types',
+                'beings.utils.GeneralUtils',
+                'beings.utils.MathUtils',
+                'beings.utils.Api',
+                'beings.utils.NodeTracking',
+                'beings.utils.Decorators',
+                'beings.utils.Orientation',
+                'beings.utils.Geometry',
+                'beings.utils.Naming',
+                'beings.utils',
+                'beings.observer',
+                'beings.treeItem',
+                'beings.options',
+                'beings.nodeTag',
+                'beings.control',
+                'beings.core']
+
+#widget modules other widgets import from
+_baseWidgets = ['beings.widgets.fkChain', 'beings.widgets.spine']
+
+#modules that should stay out of headless builds
+HEAVY_MODULES = ['pymel.core', 'PyQt4.QtCore', 'PyQt4.QtGui']
+
+def reloadAll():
+    """
+    Reload all loaded beings modules in dependency order, then import any new
+    widget modules.  Existing widget instances keep their old classes
+    @return: list of reloaded module names
+    """
+    reloaded = []
+    for name in _reloadOrder:
+        if name in sys.modules:
+            reload(sys.modules[name])
+            reloaded.append(name)
+
+    widgets = [n for n in sys.modules if n.startswith('beings.widgets.') and sys.modules[n]]
+    widgets.sort(key=lambda n: (n not in _baseWidgets, n))
+    for name in widgets:
+        reload(sys.modules[name])
+        reloaded.append(name)
+    if 'beings.core' in sys.modules:
+        sys.modules['beings.core']._importAllWidgets()
+
+    for name in ['beings.analysis', 'beings.models', 'beings.ui', 'beings.tests']:
+        if name in sys.modules:
+            reload(sys.modules[name])
+            reloaded.append(name)
+
+    _logger.info("Reloaded %i modules" % len(reloaded))
+    return reloaded
+
+def timeImport(moduleName='beings.core', repeat=3):
+    """
+    Time importing a module from scratch.  All beings modules are removed from
+    sys.modules before each import, so use reloadAll (or restart) afterwards if
+    other code holds on to the old modules.  Modules outside beings can't be
+    unloaded, so run this in a fresh session (see __main__) to include them.
+    @param moduleName='beings.core': the module to import
+    @param repeat=3: number of imports to time
+    @return: dict with 'best' and 'times' in seconds, and 'heavyModules',
+    the HEAVY_MODULES the import loaded
+    """
+    times = []
+    loadedBefore = set(sys.modules)
+    for i in range(repeat):
+        for name in [n for n in sys.modules if n == 'beings' or n.startswith('beings.')]:
+            del sys.modules[name]
+        start = time.time()
+        __import__(moduleName)
+        times.append(time.time() - start)
+
+    heavy = [n for n in HEAVY_MODULES if n in sys.modules and n not in loadedBefore]
+    result = {'best': min(times), 'times': times, 'heavyModules': heavy}
+    _logger.info("Imported %s in %.3f seconds (best of %i)" % (moduleName, result['best'], repeat))
+    if heavy:
+        _logger.warning("Importing %s loaded %s" % (moduleName, ', '.join(heavy)))
+    return result
+
+def _makeChain(name, numJnts):
+    import maya.cmds as MC
+    MC.select(cl=1)
+    jnts = [MC.joint(p=(i * 2, 0, (i % 2) * -0.5), n='%s_%i' % (name, i)) for i in range(numJnts)]
+    MC.joint(jnts[0], e=1, oj='xyz', sao='yup', ch=1, zso=1)
+    return jnts
+
+def compareBlendMethods(numChains=20, numJnts=4, frames=100):
+    """
+    Build fk/ik/bind chains with each of utils.BLEND_METHODS in a new scene,
+    and report the nodes each method creates and the time to evaluate the
+    bind chains over an animated fkIk switch.  This clears the scene.
+    @param numChains=20: number of blended chains per method
+    @param numJnts=4: joints per chain
+    @param frames=100: number of frames to evaluate
+    @return: {method: {'nodes': node count, 'nodeTypes': {type: count},
+    'seconds': evaluation time}}
+    """
+    import maya.cmds as MC
+    import beings.utils as utils
+
+    result = {}
+    for method in utils.BLEND_METHODS:
+        MC.file(newFile=1, f=1)
+        MC.playbackOptions(min=1, max=frames)
+        ctl = MC.createNode('transform', n='switch')
+        MC.addAttr(ctl, ln='fkIk', min=0, max=1, dv=0, k=1)
+        MC.setKeyframe(ctl, at='fkIk', t=1, v=0)
+        MC.setKeyframe(ctl, at='fkIk', t=frames, v=1)
+        namer = utils.Namer(c='cmp', s='cn', p='blend')
+
+        bindChains = []
+        nodes = []
+        for i in range(numChains):
+            fk = _makeChain('fk%i' % i, numJnts)
+            ik = _makeChain('ik%i' % i, numJnts)
+            bind = _makeChain('bind%i' % i, numJnts)
+            MC.setAttr('%s.rz' % fk[1], 30)
+            MC.setAttr('%s.ry' % ik[1], -45)
+            with utils.NodeTracker() as nt:
+                utils.blendJointChains(fk, ik, bind, '%s.fkIk' % ctl, namer, method=method)
+            nodes.extend(nt.getObjects())
+            bindChains.append(bind)
+
+        nodeTypes = {}
+        for node in nodes:
+            nodeType = MC.nodeType(node)
+            nodeTypes[nodeType] = nodeTypes.get(nodeType, 0) + 1
+
+        plugs = ['%s.worldMatrix' % chain[-1] for chain in bindChains]
+        start = time.time()
+        for frame in range(1, frames + 1):
+            MC.currentTime(frame, update=True)
+            for plug in plugs:
+                MC.getAttr(plug)
+        seconds = time.time() - start
+
+        result[method] = {'nodes': len(nodes), 'nodeTypes': nodeTypes, 'seconds': seconds}
+        _logger.info("%s: %i nodes, %.3f seconds for %i frames" % \
+                     (method, len(nodes), seconds, frames))
+    return result
+
+if __name__ == '__main__':
+    #time a cold start with:  mayapy dev.py
+    import maya.standalone
+    maya.standalone.initialize()
+    print timeImport(repeat=1)
@@ -0,0 +1,460 @@
+"""
+Qt item models used by the ui.  They live here rather than in core and
+options so that building rigs doesn't import PyQt
+"""
+import logging, weakref, collections, bisect
+from PyQt4 import QtCore, QtGui
+
+import core
+import options
+
+_logger = logging.getLogger(__name__)
+
+class RigModel(QtGui.QStandardItemModel):
+    """
+    A model of a widget tree.  Rows are indexed by widget and updated from
+    tree and option events, so edits don't search or rebuild the model
+    """
+    #a dummy object used as the 'root' of the rig
+    WIDGET_ROLE = QtCore.Qt.UserRole + 2
+
+    #options shown in the rows
+    ROW_OPTIONS = ['part', 'side']
+
+    #widgets added per event loop iteration by batched resets
+    POPULATE_BATCH_SIZE = 50
+
+    def __init__(self, parent=None):
+        super(RigModel, self).__init__(parent=parent)
+        self.root = core.Root()
+        rootItem = self.invisibleRootItem()
+        rootItem.setData(self.root, self.WIDGET_ROLE)
+
+        self.headers = ['Part', 'Side', 'Parent Part', 'Class', 'Mirrored']
+
+        #{id(widget): QPersistentModelIndex of its first column}
+        self._indexes = {}
+        #widgets waiting to be added by a batched reset
+        self._pending = collections.deque()
+        #widgets whose options are watched
+        self._watched = weakref.WeakKeyDictionary()
+
+        self.reset()
+
+        self._mimeDataWidgets = []
+
+    def _aboutToRemoveChild(self, event):
+        #TODO:  this is dirty - should't set object attrs from ui code.  fix this.
+        parent = event.parent
+        child = event.child
+        mw = child.getMirrorableWidget()
+        if mw:
+            mw._mirroring = ''
+            self.refreshWidgetItems(mw)
+        child.mirroring = ''
+        _logger.debug("Removing child %r from parent %s" % (child, parent))
+
+
+    def widgetFromIndex(self, index):
+        item = self.itemFromIndex(index)
+        if item.column() != 0:
+            parent = item.parent()
+            if not parent:
+                item = self.item(item.row(), 0)
+            else:
+                item = parent.child(item.row(), 0)
+
+        return item.data(self.WIDGET_ROLE).toPyObject()
+
+    def itemFromWidget(self, widget):
+        """
+        Get the first column item of a widget
+        @return: the item, or None if the widget isn't in the model (yet)
+        """
+        if widget is self.root:
+            return self.invisibleRootItem()
+
+        index = self._indexes.get(id(widget), None)
+        if index is None or not index.isValid():
+            return None
+        return self.itemFromIndex(QtCore.QModelIndex(index))
+
+    def _rowValues(self, widget):
+        return [widget.options.getValue('part'),
+                widget.options.getValue('side'),
+                widget.plugOfParent(),
+                widget.__class__.__name__,
+                widget.getMirroredState()]
+
+    def refreshWidgetItems(self, widget):
+        """Update the text of a widget's row.  Only changed cells emit
+        dataChanged"""
+        widgetItem = self.itemFromWidget(widget)
+        if widgetItem is None or widget is self.root:
+            return
+        parentItem = widgetItem.parent() or self.invisibleRootItem()
+        row = widgetItem.row()
+        for col, value in enumerate(self._rowValues(widget)):
+            colItem = parentItem.child(row, col)
+            if colItem.text() != value:
+                colItem.setText(value)
+
+    def _watchOptions(self, widget):
+        if widget in self._watched:
+            return
+        self._watched[widget] = True
+        modelRef = weakref.ref(self)
+        def optChanged(event):
+            model = modelRef()
+            if model is not None and event.optName in model.ROW_OPTIONS:
+                model.refreshWidgetItems(widget)
+        widget.options.subscribe('optChanged', optChanged)
+
+    def _makeRow(self, widget):
+        items = [QtGui.QStandardItem(value) for value in self._rowValues(widget)]
+        items[0].setData(widget, self.WIDGET_ROLE)
+        items[0].setFlags(QtCore.Qt.ItemIsEnabled | \
+                          QtCore.Qt.ItemIsSelectable | \
+                          QtCore.Qt.ItemIsEditable | \
+                          QtCore.Qt.ItemIsDragEnabled | \
+                          QtCore.Qt.ItemIsDropEnabled)
+        self._watchOptions(widget)
+        return items
+
+    def _makeRows(self, widget):
+        """Make the rows for a widget and its children before they are added to
+        the model, so adding them emits a single insert"""
+        items = self._makeRow(widget)
+        for child in widget.children():
+            items[0].appendRow(self._makeRows(child))
+        return items
+
+    def _indexRows(self, widget, item):
+        self._indexes[id(widget)] = QtCore.QPersistentModelIndex(item.index())
+        for row, child in enumerate(widget.children()):
+            self._indexRows(child, item.child(row, 0))
+
+    def reset(self, root=None, batched=False):
+        """
+        Show a new widget tree
+        @param root=None: the root widget.  A new core.Root by default
+        @param batched=False: add POPULATE_BATCH_SIZE widgets at a time,
+        returning to the event loop in between, so big rigs don't block the
+        ui.  populated() is emitted when all widgets are added
+        """
+        self.clear()
+        self._indexes = {}
+        self._pending.clear()
+        del self.root
+
+        if root:
+            self.root = root
+        else:
+            self.root = core.Root()
+
+        self.root.subscribe('aboutToRemoveChild', self._aboutToRemoveChild)
+        self.root.subscribe('addedChild', self._addedChild)
+        self.root.subscribe('removedChild', self._removedChild)
+
+        self.setHorizontalHeaderLabels(self.headers)
+        self.setColumnCount(len(self.headers))
+
+        if batched:
+            self._pending.extend(self.root.children())
+            QtCore.QTimer.singleShot(0, self._populateBatch)
+        else:
+            for child in self.root.children():
+                self.addWidgetItems(child)
+            self.emit(QtCore.SIGNAL('populated()'))
+
+    def isPopulating(self):
+        return bool(self._pending)
+
+    def _populateBatch(self):
+        count = 0
+        while self._pending and count < self.POPULATE_BATCH_SIZE:
+            widget = self._pending.popleft()
+            #skip widgets removed from the rig since the reset
+            if widget.root() is not self.root:
+                continue
+            parentItem = self.itemFromWidget(widget.parent())
+            if parentItem is None or self.itemFromWidget(widget) is not None:
+                continue
+            items = self._makeRow(widget)
+            parentItem.appendRow(items)
+            self._indexes[id(widget)] = QtCore.QPersistentModelIndex(items[0].index())
+            self._pending.extend(widget.children())
+            count += 1
+
+        if self._pending:
+            QtCore.QTimer.singleShot(0, self._populateBatch)
+        else:
+            self.emit(QtCore.SIGNAL('populated()'))
+
+    def addWidgetItems(self, widget):
+        """Add rows for a widget and its children"""
+        parentItem = self.itemFromWidget(widget.parent())
+        if parentItem is None:
+            #the parent is waiting to be added by a batched reset
+            return
+        items = self._makeRows(widget)
+        parentItem.appendRow(items)
+        self._indexRows(widget, items[0])
+
+    def _addedChild(self, event):
+        parent = event.parent
+        child = event.child
+        _logger.debug("Added child %r under parent %s" % (child, parent))
+
+        self.addWidgetItems(child)
+
+
+    def _removedChild(self, event):
+        parent = event.parent
+        child = event.child
+        _logger.debug("Removed child %r from parent %s" % (child, parent))
+
+        childItem = self.itemFromWidget(child)
+        for widget in [child] + child.children(recursive=True):
+            self._indexes.pop(id(widget), None)
+        if childItem is None:
+            return
+        parentItem = childItem.parent() or self.invisibleRootItem()
+        parentItem.removeRow(childItem.row())
+
+    def mimeTypes(self):
+        types = QtCore.QStringList()
+        types.append('application/x-widgetlist')
+        types.append('application/x-widget-classname')
+        return types
+
+    def mimeData(self, indexList):
+        widgets = []
+
+        for index in indexList:
+            widget = self.widgetFromIndex(index)
+            widgets.append(widget)
+
+        self._mimeDataWidgets = list(set(widgets))
+
+        mimeData = QtCore.QMimeData()
+        mimeData.setData("application/x-widgetlist", QtCore.QByteArray())
+
+        return mimeData
+
+    def dropMimeData(self, mimedata, action, row, column, parentIndex):
+        if parentIndex.isValid():
+            newParent = self.widgetFromIndex(parentIndex)
+        else:
+            newParent = self.root
+
+        if mimedata.hasFormat('application/x-widgetlist'):
+            for widget in self._mimeDataWidgets:
+                if widget.parent() is newParent:
+                    continue
+                if widget is newParent:
+                    continue
+
+                widget.parent().rmChild(widget)
+                newParent.addChild(widget)
+
+        elif mimedata.hasFormat('application/x-widget-classname'):
+            data = mimedata.data('application/x-widget-classname')
+            stream = QtCore.QDataStream(data, QtCore.QIODevice.ReadOnly)
+            classname = QtCore.QString()
+            stream >> classname
+            widget = core.WidgetRegistry().getInstance(str(classname))
+            newParent.addChild(widget)
+        return True
+
+    def supportedDropActions(self):
+        return QtCore.Qt.MoveAction | QtCore.Qt.CopyAction
+
+
+#todo: implement delegate
+class OptionCollectionModel(QtCore.QAbstractItemModel):
+    """
+    A model of the visible options in an OptionCollection.  Option events
+    update single rows, and rows are fetched in batches as the view scrolls.
+    Use modelFor to share one model per collection.
+    """
+
+    _columns = ['Option', 'Value']
+
+    #rows added to the view per fetchMore
+    FETCH_BATCH_SIZE = 100
+
+    #{optionCollection: model}
+    _models = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def modelFor(cls, optionCollection):
+        """
+        Get the model of an option collection, creating it if needed.  Models
+        go away with their collections
+        """
+        model = cls._models.get(optionCollection, None)
+        if model is None:
+            model = cls(optionCollection)
+            cls._models[optionCollection] = model
+        return model
+
+    def __init__(self, optionCollection, parent=None):
+        super(OptionCollectionModel, self).__init__(parent=parent)
+        assert isinstance(optionCollection, options.OptionCollection)
+        #the collection's callbacks keep the model alive, so only keep a weak
+        #reference back to let modelFor's cache release both
+        self.__optionCollection = weakref.ref(optionCollection)
+        optionCollection.subscribe('optSet', self._optChanged)
+        optionCollection.subscribe('optAdded', self._optAdded)
+
+        self.__keys = sorted(optionCollection.getAllOpts(includeHidden=False).keys())
+        self.__rows = dict((k, i) for i, k in enumerate(self.__keys))
+        self.__fetched = 0
+
+    def _optAdded(self, event):
+        optionCollection = self.__optionCollection()
+        if event.optName in self.__rows or \
+               optionCollection.getRules(event.optName)['hidden']:
+            return
+        row = bisect.bisect(self.__keys, event.optName)
+        #rows after the fetched ones are left for fetchMore, unless everything
+        #was fetched - the view won't ask for more then
+        insert = row < self.__fetched or self.__fetched == len(self.__keys)
+        if insert:
+            self.beginInsertRows(QtCore.QModelIndex(), row, row)
+        self.__keys.insert(row, event.optName)
+        for i in range(row, len(self.__keys)):
+            self.__rows[self.__keys[i]] = i
+        if insert:
+            self.__fetched += 1
+            self.endInsertRows()
+
+    def _optChanged(self, event):
+        row = self.__rows.get(event.optName, None)
+        if row is None or row >= self.__fetched:
+            return
+        ind = self.index(row, self._columns.index('Value'), QtCore.QModelIndex())
+        self.emit(QtCore.SIGNAL('dataChanged(QModelIndex, QModelIndex)'), ind, ind)
+
+    def canFetchMore(self, parentIndex):
+        if parentIndex.isValid():
+            return False
+        return self.__fetched < len(self.__keys)
+
+    def fetchMore(self, parentIndex):
+        if parentIndex.isValid():
+            return
+        count = min(self.FETCH_BATCH_SIZE, len(self.__keys) - self.__fetched)
+        if count <= 0:
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), self.__fetched, self.__fetched + count - 1)
+        self.__fetched += count
+        self.endInsertRows()
+
+    def columnCount(self, parentIndex):
+
+        return len(self._columns)
+
+    def rowCount(self, parentIndex):
+        if not parentIndex.isValid():
+            return self.__fetched
+        return 0
+
+    def headerData(self, section, orientation, role):
+        if orientation == QtCore.Qt.Horizontal:
+            if role == QtCore.Qt.DisplayRole:
+                if section == 0:
+                    return "Option"
+                elif section == 1:
+                    return "Value"
+
+        return QtCore.QVariant()
+
+
+    def data(self, index, role):
+        if index.isValid() and role == QtCore.Qt.DisplayRole:
+            row = index.row()
+            col = index.column()
+            if col == (self._columns.index('Option')):
+                return self.__keys[row]
+
+            elif col == (self._columns.index('Value')):
+                pyVal = self.__optionCollection().getValue(self.__keys[row])
+
+                if type(pyVal) not in [str, int, float, bool]:
+                    _logger.warning("non-core option typing not implemented")
+                    return QtCore.QVariant()
+
+                return pyVal
+
+        return QtCore.QVariant()
+
+    def parent(self, index):
+        return QtCore.QModelIndex()
+
+    def index(self, row, col, parentIndex):
+        if not parentIndex.isValid():
+            return self.createIndex(row, col)
+        return QtCore.QModelIndex()
+
+    def setData(self, index, value, role):
+
+        if index.isValid() and role == QtCore.Qt.EditRole:
+            row = index.row()
+            col = index.column()
+
+            if col == (self._columns.index('Value')):
+                key = self.__keys[row]
+                optionCollection = self.__optionCollection()
+                rules = optionCollection.getRules(key)
+
+                optType = rules['optType']
+                if optType == str:
+                    value = str(value.toString())
+                elif optType == int:
+                    value = int(value.toDouble()[0])
+                elif optType == float:
+                    value = float(value.toDouble()[0])
+                elif optType == bool:
+                    v = value.toString()
+
+                    if v in ['false', 'False', '', '0']:
+                        value = False
+                    else:
+                        value = True
+
+                else:
+                    raise NotImplementedError("invalid type %r" % optType)
+
+                #the optSet event emits dataChanged
+                optionCollection.setValue(key, value)
+                return True
+
+        return False
+
+    def flags(self, index):
+
+        flags =  QtCore.Qt.ItemIsEnabled
+        if index.column() == self._columns.index('Value'):
+            flags = flags | QtCore.Qt.ItemIsEditable
+
+        return flags
+
+
+
+if __name__ == '__main__':
+    import beings.options as O
+    import beings.models as M
+    import PyQt4.QtGui as QTG
+
+    oc = O.OptionCollection()
+    oc.addOpt('testOpt', 20, optType=int)
+    oc.addOpt('testOpt2', 20.234, optType=float)
+    oc.addOpt('name', 'chester')
+    oc.addOpt('name2', 'chesterasdf')
+    oc.setValue('name', 'poo')
+    ocm = M.OptionCollectionModel.modelFor(oc)
+    tm = QTG.QTreeView()
+    tm.setModel(ocm)
+    tm.show()
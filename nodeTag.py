@@ -6,7 +6,9 @@ RITag_tagType: "key^value~key^value"
 '''
 import logging, copy
 import maya.cmds as MC
+import maya.OpenMaya as OM
 from beings.utils.Exceptions import * #@UnusedWildImport
+from beings.utils.Api import getHandle
 _logger = logging.getLogger(__name__)
 
 TAG_PREFIX = 'beingsTag_'
@@ -33,21 +35,26 @@ def setTag(node, tagName, dct):
     tagAttr = getTagAttr(tagName)
     MC.setAttr('%s.%s' % (node, tagAttr), repr(dct), type='string')
 
+def _tagPlug(node, tagAttr):
+    """Get the plug of a tag attribute through the node's cached function
+    set, or None if the node isn't tagged"""
+    fn = getHandle(node).fn(OM.MFnDependencyNode)
+    if not fn.hasAttribute(tagAttr):
+        return None
+    return fn.findPlug(tagAttr, False)
+
 def hasTag(node, tagName):
-    tagAttr = getTagAttr(tagName)
-    if MC.attributeQuery(tagAttr, n=node, ex=1):
-        return True
-    return False
+    return _tagPlug(node, getTagAttr(tagName)) is not None
 
 def getTag(node, tagName, noError=False):
-    node = str(node)
-    tagAttr = getTagAttr(tagName)
-
+    """
+    @param node: node name or utils.NodeHandle
+    """
     result = {}
 
-    if MC.attributeQuery(tagAttr, n=node, ex=1):
-        tagStr = MC.getAttr('%s.%s' % (node, tagAttr))
-        result = eval(tagStr)
+    plug = _tagPlug(node, getTagAttr(tagName))
+    if plug is not None:
+        result = eval(plug.asString())
 
     elif not noError:
         raise RuntimeError("%s does not have a '%s' tag" % (node, tagName))
@@ -1,10 +1,7 @@
 import logging, re, copy, os, sys
-print sys.executable
 
 from observer import Observable
 
-from PyQt4 import QtGui, QtCore
-
 _logger = logging.getLogger(__name__)
 
 
@@ -132,145 +129,3 @@ class OptionCollection(Observable):
     def setAllOpts(self, optDct):
         for optName, optVal in optDct.items():
             self.setValue(optName, optVal)
-
-
-#todo: implement delegate
-class OptionCollectionModel(QtCore.QAbstractItemModel):
-    #any method that changes options should call the refresh method
-    #to update the object's internal data
-
-    _columns = ['Option', 'Value']
-    def __init__(self, optionCollection, parent=None):
-        super(OptionCollectionModel, self).__init__(parent=parent)
-        assert isinstance(optionCollection, OptionCollection)
-        self.__optionCollection = optionCollection
-        self.__optionCollection.subscribe('optSet', self._optChanged)
-        self.__optionCollection.subscribe('optAdded', self._optAdded)
-        self.__refresh()
-
-    def _optAdded(self, event):
-        self.__refresh()
-
-    def _optChanged(self, event):
-        self.__refresh()
-
-    def __refresh(self):
-        #todo: instead of resetting, compare new data against old and modify
-        #as needed
-        opts = self.__optionCollection.getAllOpts(includeHidden=False)
-        self.__keys = sorted(opts.keys())
-        self.__values = [opts[k] for k in self.__keys]
-        self.reset()
-
-    def columnCount(self, parentIndex):
-
-        return len(self._columns)
-
-    def rowCount(self, parentIndex):
-        if not parentIndex.isValid():
-            return len(self.__keys)
-        return 0
-
-    def headerData(self, section, orientation, role):
-        if orientation == QtCore.Qt.Horizontal:
-            if role == QtCore.Qt.DisplayRole:
-                if section == 0:
-                    return "Option"
-                elif section == 1:
-                    return "Value"
-
-        return QtCore.QVariant()
-
-
-    def data(self, index, role):
-        if index.isValid() and role == QtCore.Qt.DisplayRole:
-            row = index.row()
-            col = index.column()
-            if col == (self._columns.index('Option')):
-                return self.__keys[row]
-
-            elif col == (self._columns.index('Value')):
-                pyVal = self.__values[row]
-
-                if type(pyVal) not in [str, int, float, bool]:
-                    _logger.warning("non-core option typing not implemented")
-                    return QtCore.QVariant()
-
-                return pyVal
-
-        return QtCore.QVariant()
-
-    def parent(self, index):
-        return QtCore.QModelIndex()
-
-    def index(self, row, col, parentIndex):
-        if not parentIndex.isValid():
-            return self.createIndex(row, col)
-        return QtCore.QModelIndex()
-
-    def setData(self, index, value, role):
-
-        if index.isValid() and role == QtCore.Qt.EditRole:
-            row = index.row()
-            col = index.column()
-
-            if col == (self._columns.index('Value')):
-                key = self.__keys[row]
-                rules = self.__optionCollection.getRules(key)
-
-                optType = rules['optType']
-                if optType == str:
-                    value = str(value.toString())
-                elif optType == int:
-                    value = int(value.toDouble()[0])
-                elif optType == float:
-                    value = float(value.toDouble()[0])
-                elif optType == bool:
-                    v = value.toString()
-
-                    if v in ['false', 'False', '', '0']:
-                        value = False
-                    else:
-                        value = True
-
-                else:
-                    raise NotImplementedError("invalid type %r" % optType)
-
-                self.__optionCollection.setValue(key, value)
-                self.__refresh()
-
-                ind = self.index(row, col, QtCore.QModelIndex())
-                self.emit(QtCore.SIGNAL('dataChanged(QModelIndex, QModelIndex)'),
-                                        ind,
-                                        ind)
-                return True
-
-        return False
-
-    def flags(self, index):
-
-        flags =  QtCore.Qt.ItemIsEnabled
-        if index.column() == self._columns.index('Value'):
-            flags = flags | QtCore.Qt.ItemIsEditable
-
-        return flags
-
-
-
-if __name__ == '__main__':
-    import beings.options as O
-    import PyQt4.QtGui as QTG
-    import PyQt4.QtGui as QTC
-
-    reload(O)
-
-    oc = O.OptionCollection()
-    oc.addOpt('testOpt', 20, optType=int)
-    oc.addOpt('testOpt2', 20.234, optType=float)
-    oc.addOpt('name', 'chester')
-    oc.addOpt('name2', 'chesterasdf')
-    oc.setValue('name', 'poo')
-    ocm = O.OptionCollectionModel(oc)
-    tm = QTG.QTreeView()
-    tm.setModel(ocm)
-    tm.show()
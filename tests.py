@@ -1,25 +1,51 @@
 """
+import beings.dev
+beings.dev.reloadAll()
 import beings.tests
-reload(beings.tests)
 beings.tests.runTests('TestNodeTag')
 beings.tests.runTests('TestStorableXform')
 """
 
-import unittest, sys
+import unittest, sys, os, tempfile, shutil, copy, math, cPickle, gc, weakref
 
 import maya.cmds as MC
+import maya.OpenMaya as OM
 
+import analysis
 import core
-reload(core)
 import control
-reload(control)
 import nodeTag
-reload(nodeTag)
+import options
 import utils
-reload(utils)
-
-class TestControl(unittest.TestCase):
+#the Maya-free BatchMath tests, run here too
+from utils.BatchMathTests import TestBatchMath
+
+class BeingsTestCase(unittest.TestCase):
+    """
+    Keeps the widget manifest and build timings written by tests out of the
+    home directory, and the timings tests record out of the session's
+    """
+    def setUp(self):
+        self.tmpFilesDir = tempfile.mkdtemp()
+        self.origManifestPath = core.WidgetRegistry.MANIFEST_PATH
+        core.WidgetRegistry.MANIFEST_PATH = os.path.join(self.tmpFilesDir, 'manifest.json')
+        self.origTimingsPath = core.BUILD_TIMINGS_PATH
+        core.BUILD_TIMINGS_PATH = os.path.join(self.tmpFilesDir, 'buildTimings.json')
+        self.origTimings = copy.deepcopy(core._buildTimings)
+        self.origTimingsLoaded = core._buildTimingsLoaded
+
+    def tearDown(self):
+        core.WidgetRegistry.MANIFEST_PATH = self.origManifestPath
+        core.BUILD_TIMINGS_PATH = self.origTimingsPath
+        core._buildTimings.clear()
+        core._buildTimings.update(self.origTimings)
+        core._buildTimingsLoaded = self.origTimingsLoaded
+        shutil.rmtree(self.tmpFilesDir)
+
+
+class TestControl(BeingsTestCase):
     def setUp(self):
+        super(TestControl, self).setUp()
         MC.file(newFile=1, f=1)
 
     def test_returnType(self):
@@ -76,12 +102,13 @@ class TestControl(unittest.TestCase):
         self.assertNotEqual(pp[1], ppPost[1])
         self.assertNotEqual(pp[2], ppPost[2])
 
-class TestStorableXform(unittest.TestCase):
+class TestStorableXform(BeingsTestCase):
     def __init__(self):
         TestStorableXform.__init__(self)
         self._nodetype = 'transform'
 
     def setUp(self):
+        super(TestStorableXform, self).setUp()
         MC.file(newFile=1, f=1)
 
     def test_makeStorableXform(self):
@@ -172,8 +199,9 @@ class TestStorableXform(unittest.TestCase):
             self.assertTrue(MC.getAttr('%s.r' % xform3)[0][i] - tuple(r)[i] < .0001)
             self.assertTrue(MC.getAttr('%s.s' % xform3)[0][i] - tuple(s)[i] < .0001)
 
-class TestJointStorableXform(unittest.TestCase):
+class TestJointStorableXform(BeingsTestCase):
     def setUp(self):
+        super(TestJointStorableXform, self).setUp()
         MC.file(newFile=1, f=1)
         pos = [[0,0,0], [0,3,2], [0,5,0]]
         MC.select(cl=1)
@@ -233,12 +261,14 @@ class TestJointStorableXform(unittest.TestCase):
 
 
 
-class TestControlDiffs(unittest.TestCase):
+class TestControlDiffs(BeingsTestCase):
     def setUp(self):
+        super(TestControlDiffs, self).setUp()
         MC.file(newFile=1, f=1)
 
-class TestNodeTag(unittest.TestCase):
+class TestNodeTag(BeingsTestCase):
     def setUp(self):
+        super(TestNodeTag, self).setUp()
         MC.file(newFile=1, f=1)
         self.xform = MC.createNode('transform', name='test')
 
@@ -300,9 +330,10 @@ class TestNodeTag(unittest.TestCase):
             self.assertEqual(v, gottenTag[k])
 
 
-class TestCoreJointMethods(unittest.TestCase):
+class TestCoreJointMethods(BeingsTestCase):
 
     def setUp(self):
+        super(TestCoreJointMethods, self).setUp()
         MC.file(newFile=1, f=1)
         MC.select(cl=1)
         names = ['hip', 'knee', 'ankle']
@@ -315,9 +346,1104 @@ class TestCoreJointMethods(unittest.TestCase):
         self.names = names
         self.jnts = jnts
 
-        self.namer = Namer(c='testchar', side='lf', part='leg')
+        self.namer = utils.Namer(c='testchar', side='lf', part='leg')
+
+    def test_fixInverseScale(self):
+        knee = self.jnts['knee']
+        MC.disconnectAttr('%s.scale' % self.jnts['hip'], '%s.inverseScale' % knee)
+        utils.fixInverseScale(self.jnts.values() + ['doesNotExist'])
+        self.assertEqual(MC.listConnections('%s.inverseScale' % knee, s=1, d=0, p=1),
+                         ['%s.scale' % self.jnts['hip']])
+        self.assertEqual(len(MC.listConnections('%s.inverseScale' % self.jnts['ankle'])), 1)
+
+
+class TestLocks(BeingsTestCase):
+    def setUp(self):
+        super(TestLocks, self).setUp()
+        MC.file(newFile=1, f=1)
+        self.ctl = control.makeControl('ctl')
+        control.setLockTag(self.ctl, uk=['t'], lk=['rx'])
+
+    def test_setLocks(self):
+        control.setLocks(self.ctl)
+        self.assertFalse(MC.getAttr('%s.tx' % self.ctl, l=1))
+        self.assertTrue(MC.getAttr('%s.tx' % self.ctl, k=1))
+        self.assertTrue(MC.getAttr('%s.rx' % self.ctl, l=1))
+        self.assertTrue(MC.getAttr('%s.rx' % self.ctl, k=1))
+        self.assertTrue(MC.getAttr('%s.sx' % self.ctl, l=1))
+        self.assertFalse(MC.getAttr('%s.sx' % self.ctl, k=1))
+
+    def _lockStates(self):
+        return dict((attr, (MC.getAttr('%s.%s' % (self.ctl, attr), l=1),
+                            MC.getAttr('%s.%s' % (self.ctl, attr), k=1)))
+                    for attr in ['tx', 'ty', 'tz', 'rx', 'ry', 'rz', 'sx', 'sy', 'sz', 'v'])
+
+    def test_unlockAndRelock(self):
+        control.setLocks(self.ctl)
+        locked = self._lockStates()
+        control.setLocksMany([self.ctl], unlock=True)
+        #unlocked channels stay in the channel box
+        for attr, (l, k) in self._lockStates().items():
+            self.assertFalse(l)
+            self.assertTrue(k)
+        control.setLocksMany([self.ctl])
+        self.assertEqual(self._lockStates(), locked)
+        #relocking a locked node doesn't change it
+        control.setLocks(self.ctl)
+        self.assertEqual(self._lockStates(), locked)
+
+class TestMirrorData(BeingsTestCase):
+    def test_mirrorAxis(self):
+        self.assertEqual(control.mirrorAxisFromChannels(['tx', 'ry', 'rz']), 0)
+        self.assertEqual(control.mirrorAxisFromChannels(['tz', 'ry', 'rx']), 2)
+        self.assertRaises(RuntimeError, control.mirrorAxisFromChannels, ['tx', 'rx'])
+
+    def test_matchesLiveMirror(self):
+        """Data mirroring should match a control driven by mirrored channels"""
+        MC.file(newFile=1, f=1)
+        src = MC.createNode('transform', name='src')
+        tgt = MC.createNode('transform', name='tgt')
+        MC.xform(src, t=[1, 2, 3], ro=[10, 20, 30], s=[1, 2, 1])
+        control.connectMirroredChannels(src, tgt, core.Widget.MIRROR_DIRECT,
+                                        core.Widget.MIRROR_INVERTED, 'mirror')
+        info = {'matrix': MC.xform(src, q=1, m=1, ws=1)}
+        mirrored = control.mirrorStorableXformInfo(info, axis=0)
+        for a, b in zip(mirrored['matrix'], MC.xform(tgt, q=1, m=1, ws=1)):
+            self.assertAlmostEqual(a, b, places=5)
+
+class TestBatchMathMaya(BeingsTestCase):
+    """BatchMath results compared against Maya's"""
+    def setUp(self):
+        super(TestBatchMathMaya, self).setUp()
+        MC.file(newFile=1, f=1)
+        self.bm = utils.BatchMath
+        self.backends = [False] + (self.bm.HAVE_NUMPY and [True] or [])
+
+    def test_matchesMaya(self):
+        node = MC.createNode('transform')
+        for order in range(6):
+            MC.setAttr('%s.rotateOrder' % node, order)
+            MC.xform(node, t=[1, 2, 3], ro=[10, 20, 30], s=[1, 2, 3])
+            expected = MC.xform(node, q=1, m=1)
+            for useNumpy in self.backends:
+                m = self.bm.compose([[1, 2, 3]], [[10, 20, 30]], [[1, 2, 3]],
+                                    rotateOrder=order, useNumpy=useNumpy)
+                for i in range(16):
+                    self.assertAlmostEqual(m[0][i], expected[i], places=6)
+                t, r, s = self.bm.decompose([expected], rotateOrder=order, useNumpy=useNumpy)
+                for got, value in zip(r[0], [10, 20, 30]):
+                    self.assertAlmostEqual(got, value, places=6)
+
+
+class TestOrientationConversions(BeingsTestCase):
+    """The cached batch conversions against per-item calls and OpenMaya"""
+    #(aim, up) settings
+    ORIENTS = [('posY', 'posX'), ('posX', 'negZ'), ('negZ', 'posY'), ('negX', 'negY')]
+    ANGLES = [[0, 0, 0], [90, 25, 40.2], [-30, 60, -120], [10, -89, 5], [170, 5, -95]]
+
+    def _orient(self, aim, up):
+        orient = utils.Orientation()
+        orient.setAxis('aim', aim)
+        orient.setAxis('up', up)
+        return orient
+
+    def _mayaAngles(self, orient, angles, origOrient, origRotOrder, useNewRotOrder):
+        """The OpenMaya conversion newAngle used before it was batched"""
+        def axesMatrix(o):
+            return utils.MathUtils.Matrix4x4([o.getAxis('up') + [0], o.getAxis('aim') + [0],
+                                              o.getAxis('weak') + [0], [0, 0, 0, 1]])
+        multMatrix = axesMatrix(orient) * axesMatrix(origOrient).inverse()
+        er = OM.MEulerRotation(math.radians(angles[0]), math.radians(angles[1]),
+                               math.radians(angles[2]), origRotOrder)
+        newEr = OM.MTransformationMatrix(multMatrix.mmatrix() * er.asMatrix()).eulerRotation()
+        if useNewRotOrder:
+            newEr = newEr.reorder(orient.rotOrder())
+        return [math.degrees(newEr.x), math.degrees(newEr.y), math.degrees(newEr.z)]
+
+    def assertSameRotation(self, a, b, rotateOrder):
+        """Compare euler angles as matrices, since angles can wrap"""
+        bm = utils.BatchMath
+        for x, y in zip(bm.eulerToMatrix([a], rotateOrder)[0], bm.eulerToMatrix([b], rotateOrder)[0]):
+            self.assertAlmostEqual(x, y, places=6)
+
+    def test_anglesMatchPerItemAndMaya(self):
+        for origAxes in self.ORIENTS[:2]:
+            origOrient = self._orient(*origAxes)
+            for axes in self.ORIENTS:
+                orient = self._orient(*axes)
+                for origRotOrder in range(6):
+                    for useNewRotOrder in [False, True]:
+                        rotateOrder = useNewRotOrder and orient.rotOrder() or 0
+                        batch = orient.newAngles(self.ANGLES, origOrient=origOrient,
+                                                 origRotOrder=origRotOrder,
+                                                 useNewRotOrder=useNewRotOrder)
+                        self.assertEqual(len(batch), len(self.ANGLES))
+                        for angles, result in zip(self.ANGLES, batch):
+                            single = orient.newAngle(angles, origOrient=origOrient,
+                                                     origRotOrder=origRotOrder,
+                                                     useNewRotOrder=useNewRotOrder)
+                            for x, y in zip(single, result):
+                                self.assertAlmostEqual(x, y, places=6)
+                            maya = self._mayaAngles(orient, angles, origOrient,
+                                                    origRotOrder, useNewRotOrder)
+                            self.assertSameRotation(result, maya, rotateOrder)
+
+    def test_defaultOrigOrient(self):
+        orient = self._orient('negX', 'negY')
+        for x, y in zip(orient.newAngles(self.ANGLES),
+                        orient.newAngles(self.ANGLES, origOrient=utils.Orientation())):
+            self.assertEqual(x, y)
+        self.assertEqual(orient.newAngles([]), [])
+
+    def test_vectorsWithNegativeAxes(self):
+        orient = self._orient('negX', 'posZ')
+        vectors = [[1, 2, 3], [-4, 0.5, 6]]
+        result = orient.newOrientSpaceVectors(vectors)
+        self.assertEqual(result[0][0], -2)
+        self.assertEqual(result[0][2], 1)
+        default = utils.Orientation()
+        for vector, new in zip(vectors, result):
+            self.assertEqual(orient.newOrientSpaceVector(vector), new)
+            #the component along each named axis is kept
+            for axis in ['aim', 'up', 'weak']:
+                self.assertAlmostEqual(
+                    sum([a * b for a, b in zip(new, orient.getAxis(axis))]),
+                    sum([a * b for a, b in zip(vector, default.getAxis(axis))]))
+
+    def test_cacheInvalidation(self):
+        angles = [[10, 20, 30]]
+        vectors = [[1, 2, 3]]
+        orient = utils.Orientation()
+        orient.newAngles(angles)
+        orient.newOrientSpaceVectors(vectors)
+
+        orient.setAxis('aim', 'posX')
+        expected = self._orient('posX', 'posY')
+        self.assertEqual(orient.newAngles(angles), expected.newAngles(angles))
+        self.assertEqual(orient.newOrientSpaceVectors(vectors), expected.newOrientSpaceVectors(vectors))
+        unflipped = orient.newAngles(angles)
+
+        orient.flipAim()
+        expected = self._orient('negX', 'posY')
+        self.assertEqual(orient.newAngles(angles), expected.newAngles(angles))
+        self.assertEqual(orient.newOrientSpaceVectors(vectors), expected.newOrientSpaceVectors(vectors))
+
+        orient.unflipAim()
+        self.assertEqual(orient.newAngles(angles), unflipped)
+
+    def test_cacheNotPickled(self):
+        orient = self._orient('posX', 'negZ')
+        orient.newAngles(self.ANGLES)
+        self.assertTrue(orient._conversionCache)
+        self.assertFalse(cPickle.loads(orient.data())._conversionCache)
+        loaded = utils.Orientation.objFromData(orient.data())
+        self.assertEqual(loaded.newAngles(self.ANGLES), orient.newAngles(self.ANGLES))
+
+
+class TestReorientJoints(BeingsTestCase):
+    """reorientJoints should give the same result as reparenting children"""
+    def _makeChain(self, prefix):
+        MC.select(cl=1)
+        joints = []
+        for i in range(50):
+            joints.append(MC.joint(p=[i, (i % 3) * 0.5, (i % 5) * 0.25],
+                                   name='%s_%i' % (prefix, i)))
+        MC.joint(joints[0], e=1, oj='xyz', sao='yup', ch=1, zso=1)
+        MC.setAttr('%s.rotateOrder' % joints[10], 2)
+        MC.setAttr('%s.r' % joints[20], 15, 25, 35)
+        loc = MC.spaceLocator(name='%s_loc' % prefix)[0]
+        MC.parent(loc, joints[30])
+        MC.xform(loc, t=[1, 2, 3], ro=[10, 20, 30])
+        return joints + [loc]
+
+    def test_matchesReparenting(self):
+        MC.file(newFile=1, f=1)
+        orient = utils.Orientation()
+        orient.setAxis('aim', 'posX')
+        orient.setAxis('up', 'negZ')
+
+        fast = self._makeChain('fast')
+        legacy = self._makeChain('legacy')
+        orient.reorientJoints(fast[:-1])
+        orient._reorientJointsByReparenting(legacy[:-1])
+
+        for a, b in zip(fast, legacy):
+            self.assertEqual(MC.listRelatives(a, parent=1) is None,
+                             MC.listRelatives(b, parent=1) is None)
+            for x, y in zip(MC.xform(a, q=1, m=1, ws=1), MC.xform(b, q=1, m=1, ws=1)):
+                self.assertAlmostEqual(x, y, places=4)
+
+class TestShapePoints(BeingsTestCase):
+    def setUp(self):
+        super(TestShapePoints, self).setUp()
+        MC.file(newFile=1, f=1)
+        self.crv = MC.curve(d=1, p=[(0, 0, 0), (1, 2, 3), (4, 5, 6)], name='crv')
+        self.shape = MC.listRelatives(self.crv, shapes=1, pa=1)[0]
+        MC.xform(self.crv, t=[1, 0, 0])
+
+    def test_matchesPointPosition(self):
+        points = utils.getShapePoints(self.crv, ws=True)[self.shape]
+        self.assertEqual(len(points), 9)
+        for i in range(3):
+            pp = MC.pointPosition('%s.cv[%i]' % (self.shape, i), w=1)
+            for j in range(3):
+                self.assertAlmostEqual(points[i * 3 + j], pp[j])
+
+    def test_setAndMove(self):
+        utils.setShapePoints({self.shape: [[0, 0, 0], [1, 1, 1], [2, 2, 2]]}, ws=True)
+        self.assertEqual(MC.pointPosition('%s.cv[2]' % self.shape, w=1), [2, 2, 2])
+        utils.moveShapePos(self.crv, [0, 1, 0])
+        self.assertEqual(MC.pointPosition('%s.cv[2]' % self.shape, w=1), [2, 3, 2])
+
+class TestSnap(BeingsTestCase):
+    def setUp(self):
+        super(TestSnap, self).setUp()
+        MC.file(newFile=1, f=1)
+        self.master = MC.createNode('transform', name='master')
+        MC.xform(self.master, t=[1, 2, 3], ro=[10, 20, 30], s=[1, 2, 1])
+
+    def assertSameWorld(self, a, b):
+        for x, y in zip(MC.xform(a, q=1, ws=1, m=1), MC.xform(b, q=1, ws=1, m=1)):
+            self.assertAlmostEqual(x, y, places=5)
+
+    def test_snapJointWithOrient(self):
+        parent = MC.createNode('transform', name='parent')
+        MC.xform(parent, t=[4, 0, 0], ro=[0, 45, 0])
+        MC.select(cl=1)
+        jnt = MC.joint(name='jnt')
+        MC.parent(jnt, parent)
+        MC.setAttr('%s.jointOrient' % jnt, 30, 0, 60, type='double3')
+        MC.setAttr('%s.rotateOrder' % jnt, 4)
+        numNodes = len(MC.ls())
+        utils.snap(self.master, jnt)
+        self.assertSameWorld(self.master, jnt)
+        self.assertEqual(numNodes, len(MC.ls()))
+
+    def test_snapPairsInHierarchy(self):
+        a = MC.createNode('transform', name='a')
+        b = MC.createNode('transform', name='b', parent=a)
+        other = MC.createNode('transform', name='other')
+        MC.xform(other, t=[5, 5, 5], ro=[0, 90, 0])
+        utils.snapPairs([(self.master, a), (other, b)])
+        self.assertSameWorld(self.master, a)
+        self.assertSameWorld(other, b)
+
+class TestWidgetRegistry(BeingsTestCase):
+    MODULE = """
+import beings.core as core
+class StudioWidget(core.Widget):
+    pass
+core.WidgetRegistry().register(StudioWidget, 'Studio Widget %s')
+"""
+    def setUp(self):
+        super(TestWidgetRegistry, self).setUp()
+        self.tmpDir = tempfile.mkdtemp()
+        self.registry = core.WidgetRegistry()
+        self.path = os.path.join(self.tmpDir, 'studioWidget.py')
+        with open(self.path, 'w') as f:
+            f.write(self.MODULE % 'A')
+
+    def tearDown(self):
+        self.registry._searchPaths.remove(self.tmpDir)
+        self.registry.discover(force=True)
+        shutil.rmtree(self.tmpDir)
+        super(TestWidgetRegistry, self).tearDown()
+
+    def test_searchPathAndChanges(self):
+        self.registry.addSearchPath(self.tmpDir)
+        self.assertTrue('Studio Widget A' in self.registry.widgetNames())
+        self.assertTrue(os.path.exists(self.registry.MANIFEST_PATH))
+        widget = self.registry.getInstance('Studio Widget A')
+        self.assertEqual(self.registry.widgetName(widget), 'Studio Widget A')
+
+        #unchanged modules aren't reloaded
+        module = sys.modules['beingsWidget_studioWidget']
+        module.marker = True
+        self.registry.discover(force=True)
+        self.assertTrue(getattr(sys.modules['beingsWidget_studioWidget'], 'marker', False))
+
+        with open(self.path, 'w') as f:
+            f.write(self.MODULE % 'B')
+        mtime = os.path.getmtime(self.path) + 10
+        os.utime(self.path, (mtime, mtime))
+        self.registry.discover(force=True)
+        self.assertTrue('Studio Widget B' in self.registry.widgetNames())
+        self.assertFalse('Studio Widget A' in self.registry.widgetNames())
+
+class TestGeometry(BeingsTestCase):
+    def setUp(self):
+        super(TestGeometry, self).setUp()
+        MC.file(newFile=1, f=1)
+        self.crv = MC.curve(d=1, p=[(0, 0, 0), (0, 10, 0)], k=[0, 1], name='crv')
+        MC.xform(self.crv, t=[1, 0, 0])
+        self.srf = MC.nurbsPlane(ax=[0, 0, 1], w=10, lr=1, u=1, v=1, ch=0, name='srf')[0]
+
+    def test_curveSampling(self):
+        numNodes = len(MC.ls())
+        params = utils.Geometry.closestParams(self.crv, [[1, 2.5, 0], [3, 5, 0]])
+        self.assertAlmostEqual(params[0], 0.25, places=4)
+        self.assertAlmostEqual(params[1], 0.5, places=4)
+        points = utils.Geometry.pointsAtParams(self.crv, params)
+        self.assertAlmostEqual(points[1][0], 1)
+        self.assertAlmostEqual(points[1][1], 5, places=4)
+        points = utils.Geometry.pointsAtPercentages(self.crv, [0, 1])
+        self.assertAlmostEqual(points[1][1], 10)
+        self.assertEqual(numNodes, len(MC.ls()))
+
+    def test_surfaceSampling(self):
+        u, v = utils.Geometry.closestParams(self.srf, [[0, 0, 1]])[0]
+        self.assertAlmostEqual(u, 0.5, places=4)
+        self.assertAlmostEqual(v, 0.5, places=4)
+        point = utils.Geometry.pointsAtParams(self.srf, [(u, v)])[0]
+        for got, expected in zip(point, [0, 0, 0]):
+            self.assertAlmostEqual(got, expected, places=4)
+
+    def test_createMatchesCurveCommand(self):
+        positions = [(0, 0, 0), (1, 2, 0), (2, 3.123456789, 1), (4, 4, 4)]
+        crv = utils.Geometry.createCurve(positions, name='apiCrv')
+        melCrv = MC.curve(d=2, p=positions)
+        for attr in ['spans', 'degree', 'minValue', 'maxValue']:
+            self.assertEqual(MC.getAttr('%s.%s' % (crv, attr)),
+                             MC.getAttr('%s.%s' % (melCrv, attr)))
+        self.assertAlmostEqual(MC.pointPosition('%s.cv[2]' % crv)[1], 3.123456789, places=8)
+
+    def test_createSurface(self):
+        rows = [[(i, 1, 0), (i, -1, 0)] for i in range(4)]
+        srf = utils.Geometry.createSurface(rows, name='apiSrf')
+        shape = MC.listRelatives(srf, shapes=1)[0]
+        self.assertEqual(MC.getAttr('%s.degreeU' % shape), 2)
+        self.assertEqual(MC.getAttr('%s.degreeV' % shape), 1)
+        self.assertEqual(MC.pointPosition('%s.cv[3][1]' % shape), [3, -1, 0])
+
+    def test_cacheFollowsRenames(self):
+        original = utils.Geometry.getFn(self.crv)
+        self.assertTrue(utils.Geometry.getFn(self.crv) is original)
+        MC.rename(self.crv, 'oldCrv')
+        newCrv = MC.curve(d=1, p=[(0, 0, 0), (0, 0, 5)], k=[0, 1], name='crv')
+        self.assertEqual(newCrv, 'crv')
+        point = utils.Geometry.pointAtParamPercentage('crv', 1)
+        self.assertAlmostEqual(point[2], 5)
+
+    def test_cacheFollowsParenting(self):
+        self.assertAlmostEqual(utils.Geometry.pointAtParam(self.crv, 1)[0], 1)
+        grp = MC.createNode('transform', name='grp')
+        MC.xform(grp, t=[0, 0, 3])
+        MC.parent(self.crv, grp, relative=1)
+        self.assertAlmostEqual(utils.Geometry.pointAtParam('crv', 1)[2], 3)
+
+class TestNodeHandles(BeingsTestCase):
+    def setUp(self):
+        super(TestNodeHandles, self).setUp()
+        MC.file(newFile=1, f=1)
+        self.grp = MC.createNode('transform', name='grp')
+        self.node = MC.createNode('transform', name='node', parent=self.grp)
+
+    def test_sameHandle(self):
+        handle = utils.getHandle('node')
+        self.assertTrue(utils.getHandle(handle.object()) is handle)
+        self.assertTrue(utils.getHandle('grp|node') is handle)
+        self.assertTrue(utils.getHandle(handle) is handle)
+        self.assertTrue(isinstance(handle.fn(), OM.MFnTransform))
+
+    def test_followsRenameAndParenting(self):
+        handle = utils.getHandle('node')
+        handleId = handle.id
+        MC.rename('node', 'renamed')
+        self.assertEqual(str(handle), 'renamed')
+        MC.createNode('transform', name='renamed')
+        self.assertEqual(handle.name(), 'grp|renamed')
+        self.assertFalse(utils.getHandle('|renamed') is handle)
+        MC.setAttr('%s.tx' % handle, 2)
+        self.assertEqual(MC.getAttr('grp|renamed.tx'), 2)
+        self.assertEqual(handle.id, handleId)
+
+    def test_ambiguousName(self):
+        handle = utils.getHandle('node')
+        other = MC.createNode('transform', name='other')
+        MC.createNode('transform', name='node', parent=other)
+        self.assertRaises(RuntimeError, utils.getHandle, 'node')
+        self.assertTrue(utils.getHandle('grp|node') is handle)
+
+    def test_deleted(self):
+        handle = utils.getHandle('node')
+        MC.delete('node')
+        self.assertFalse(handle.isValid())
+        self.assertRaises(RuntimeError, handle.object)
+
+    def test_widgetNodesFollowRenames(self):
+        root = core.Root()
+        cog = core.CenterOfGravity()
+        root.addChild(cog, plug='master')
+        root.buildLayout()
+        node = [n for n in cog.getNodes() if MC.nodeType(n) == 'transform'][0]
+        MC.rename(node, 'renamedByUser')
+        self.assertTrue('renamedByUser' in cog.getNodes())
+
+class TestUndoState(BeingsTestCase):
+    def setUp(self):
+        super(TestUndoState, self).setUp()
+        MC.file(newFile=1, f=1)
+        MC.undoInfo(state=1)
+
+    def test_suspendRestoresState(self):
+        with utils.UndoState('suspend'):
+            self.assertFalse(MC.undoInfo(q=1, state=1))
+            MC.createNode('transform', name='tmp')
+        self.assertTrue(MC.undoInfo(q=1, state=1))
+
+    def test_restoredOnError(self):
+        try:
+            with utils.UndoState('suspend'):
+                raise RuntimeError("build failed")
+        except RuntimeError:
+            pass
+        self.assertTrue(MC.undoInfo(q=1, state=1))
+
+    def test_chunkUndoesInOneStep(self):
+        with utils.UndoState('chunk'):
+            for i in range(5):
+                MC.createNode('transform', name='tmp_%i' % i)
+        MC.undo()
+        self.assertFalse(MC.ls('tmp_*'))
+
+class TestDeferredEvaluation(BeingsTestCase):
+    """Rigs built with deferred evaluation should match ones built with
+    forced refreshes"""
+
+    def _buildRig(self, defer):
+        MC.file(newFile=1, f=1)
+        root = core.Root()
+        cog = core.CenterOfGravity()
+        root.addChild(cog, plug='master')
+        #parented by the base childCompletedBuild of a widget that isn't the root
+        fk = core.WidgetRegistry().getInstance('Fk Chain')
+        cog.addChild(fk, plug='cog_bnd')
+        root.buildLayout(deferEvaluation=defer)
+        MC.setAttr('defaultchar_ctl_cn_cog_layout.ty', 7)
+        root.buildRig(deferEvaluation=defer)
+
+        result = {}
+        for node in MC.ls(type='transform'):
+            parent = MC.listRelatives(node, parent=1)
+            matrix = [round(x, 4) for x in MC.xform(node, q=1, ws=1, m=1)]
+            result[node] = (parent, matrix)
+        return result
+
+    def test_parentingUnchanged(self):
+        immediate = self._buildRig(defer=False)
+        deferred = self._buildRig(defer=True)
+        self.assertEqual(sorted(immediate.keys()), sorted(deferred.keys()))
+        for node, data in immediate.items():
+            self.assertEqual(data, deferred[node], "%s differs" % node)
+
+    def test_refreshRestored(self):
+        with utils.DeferredEvaluation():
+            self.assertTrue(utils.DeferredEvaluation.active())
+        self.assertFalse(utils.DeferredEvaluation.active())
+
+
+class TestBlendJointChains(BeingsTestCase):
+    def setUp(self):
+        super(TestBlendJointChains, self).setUp()
+        self._makeChains()
+
+    def _makeChains(self):
+        MC.file(newFile=1, f=1)
+        self.namer = utils.Namer(c='testchar', side='lf', part='arm')
+        self.ctl = MC.createNode('transform', name='switch')
+        MC.addAttr(self.ctl, ln='fkIk', min=0, max=1, dv=0, k=1)
+        self.chains = {}
+        for name in ['fk', 'ik', 'bind']:
+            MC.select(cl=1)
+            self.chains[name] = [MC.joint(p=(i * 2, 0, -i * 0.5), n='%s_%i' % (name, i))
+                                 for i in range(3)]
+            MC.joint(self.chains[name][0], e=1, oj='xyz', sao='yup', ch=1, zso=1)
+        MC.setAttr('%s.rz' % self.chains['fk'][1], 40)
+        MC.setAttr('%s.ry' % self.chains['ik'][0], -30)
+        MC.setAttr('%s.ry' % self.chains['ik'][1], 60)
+
+    def _blend(self, method):
+        with utils.NodeTracker() as nt:
+            utils.blendJointChains(self.chains['fk'], self.chains['ik'], self.chains['bind'],
+                                   '%s.fkIk' % self.ctl, self.namer, method=method)
+        return nt.getObjects()
+
+    def assertFollows(self, chain):
+        for jnt, bind in zip(self.chains[chain], self.chains['bind']):
+            for x, y in zip(MC.xform(jnt, q=1, ws=1, m=1), MC.xform(bind, q=1, ws=1, m=1)):
+                self.assertAlmostEqual(x, y, places=4)
+
+    def test_methodsFollowChains(self):
+        for method in utils.BLEND_METHODS:
+            self._makeChains()
+            self._blend(method)
+            self.assertFollows('fk')
+            MC.setAttr('%s.fkIk' % self.ctl, 1)
+            self.assertFollows('ik')
+
+    def _nodeTypes(self, method):
+        self._makeChains()
+        nodeTypes = {}
+        for node in self._blend(method):
+            nodeType = MC.nodeType(node)
+            nodeTypes[nodeType] = nodeTypes.get(nodeType, 0) + 1
+        return nodeTypes
+
+    def test_nodeCounts(self):
+        #root joints are constrained in every method
+        nodeTypes = self._nodeTypes('blendColors')
+        self.assertEqual(nodeTypes.get('pairBlend'), 2)
+        self.assertEqual(nodeTypes.get('blendColors'), 2 * 2)
+        self.assertFalse(nodeTypes.get('unitConversion'))
+        nodeTypes = self._nodeTypes('pairBlend')
+        self.assertEqual(nodeTypes.get('pairBlend'), 2)
+        self.assertEqual(nodeTypes.get('blendColors'), 2)
+        self.assertFalse(nodeTypes.get('unitConversion'))
+        nodeTypes = self._nodeTypes('constraint')
+        self.assertEqual(nodeTypes.get('orientConstraint'), 3)
+        self.assertFalse(nodeTypes.get('pairBlend'))
+
+    def test_invalidMethod(self):
+        self.assertRaises(utils.BeingsError, self._blend, 'matrix')
+
+
+class TestLimbBlendMethods(BeingsTestCase):
+    """Arms and legs should pose their bind joints the same with every blend
+    method"""
+    def _pose(self, widgetName, part, toks, ikCtl, method):
+        MC.file(newFile=1, f=1)
+        root = core.Root()
+        cog = core.CenterOfGravity()
+        root.addChild(cog, plug='master')
+        limb = core.WidgetRegistry().getInstance(widgetName)
+        cog.addChild(limb, plug='cog_bnd')
+        limb.options.setValue('side', 'lf')
+        limb.options.setValue('blendMethod', method)
+        root.buildLayout()
+        root.buildRig()
+
+        namer = utils.Namer('defaultchar', 'lf', part)
+        ikCtl = namer(ikCtl, r='ik')
+        for i, tok in enumerate(toks[:2]):
+            MC.setAttr('%s.rz' % namer(tok, r='fk'), 20 + 15 * i)
+        MC.setAttr('%s.t' % ikCtl, 1, -2, 0.5, type='double3')
+
+        result = []
+        for fkIk in [0, 1]:
+            MC.setAttr('%s.fkIk' % ikCtl, fkIk)
+            for tok in toks[:-1]:
+                result.extend(MC.xform(namer(tok, r='bnd'), q=1, ws=1, m=1))
+        return result
+
+    def _assertMethodsMatch(self, *args):
+        expected = self._pose(*(args + ('constraint',)))
+        for method in utils.BLEND_METHODS[1:]:
+            result = self._pose(*(args + (method,)))
+            for x, y in zip(expected, result):
+                self.assertAlmostEqual(x, y, places=3, msg="%s differs" % method)
+
+    def test_arm(self):
+        self._assertMethodsMatch('Arm', 'arm', ['uparm', 'loarm', 'hand', 'hand_tip'], 'ctl')
+
+    def test_leg(self):
+        self._assertMethodsMatch('Leg', 'leg', ['hip', 'knee', 'ankle', 'ball', 'toe', 'toetip'],
+                                 'heel_ctl')
+
+class TestLongChains(BeingsTestCase):
+    def setUp(self):
+        super(TestLongChains, self).setUp()
+        MC.file(newFile=1, f=1)
+        self.namer = utils.Namer(c='testchar', side='lf', part='tail')
 
+    def test_alphaSuffix(self):
+        suffixes = [utils.alphaSuffix(i) for i in range(1000)]
+        self.assertEqual(''.join(suffixes[:26]), 'abcdefghijklmnopqrstuvwxyz')
+        self.assertEqual(suffixes, sorted(suffixes))
+        self.assertEqual([utils.alphaIndex(s) for s in suffixes], range(1000))
 
+    def test_namedJointChain(self):
+        MC.select(cl=1)
+        jnts = [MC.joint(p=[0, i, 0], n=self.namer(r='bnd', alphaSuf=i)) for i in range(1000)]
+        self.assertEqual(len(set(jnts)), 1000)
+        for i, jnt in enumerate(jnts):
+            self.assertEqual(jnt, self.namer(r='bnd', alphaSuf=i))
+            toks = utils.Namer.getTokensFromName(jnt, alphaSuf=True)
+            self.assertEqual(toks['alphaSuf'], i)
+
+    def test_fkChainRig(self):
+        root = core.Root()
+        fk = core.WidgetRegistry().getInstance('Fk Chain')
+        root.addChild(fk, plug='master')
+        fk.options.setValue('numBones', 100)
+        self.assertEqual(len(fk.plugs()), 100)
+        root.buildLayout()
+        root.buildRig()
+        self.assertTrue(MC.ls('*_fk_*_%s' % utils.alphaSuffix(99), type='transform'))
+
+
+class TestSplineAttach(BeingsTestCase):
+    def _buildSpine(self, attachMode):
+        MC.file(newFile=1, f=1)
+        root = core.Root()
+        spine = core.WidgetRegistry().getInstance('Spine')
+        root.addChild(spine, plug='master')
+        spine.options.setValue('numJnts', 30)
+        spine.options.setValue('splineAttach', attachMode)
+        root.buildLayout()
+        with utils.NodeTracker() as nt:
+            root.buildRig()
+        return len(nt.getObjects())
+
+    def _bndMatrices(self):
+        return dict([(j, MC.xform(j, q=1, ws=1, m=1)) for j in MC.ls('*_bnd_*', type='joint')])
+
+    def _ikCtl(self):
+        return MC.ls('*_ik_*_ctl_%s' % utils.alphaSuffix(3), type='transform')[0]
+
+    def _twist(self):
+        MC.setAttr('%s.ry' % self._ikCtl(), 30)
+
+    def _translate(self):
+        master = MC.ls('*_ctl_cn_master', type='transform')[0]
+        MC.setAttr('%s.t' % master, 3, -2, 5, type='double3')
+
+    def _stretch(self):
+        MC.setAttr('%s.ty' % self._ikCtl(), 4)
+        MC.setAttr('%s.tx' % self._ikCtl(), 1.5)
+
+    def assertMatrices(self, expected, places=4, indices=range(16)):
+        result = self._bndMatrices()
+        self.assertEqual(sorted(expected.keys()), sorted(result.keys()))
+        for jnt, matrix in expected.items():
+            for i in indices:
+                self.assertAlmostEqual(matrix[i], result[jnt][i], places=places,
+                                       msg="%s differs" % jnt)
+
+    def test_fixedMatchesClosestPoint(self):
+        closestCount = self._buildSpine('closestPoint')
+        closestRest = self._bndMatrices()
+        self._twist()
+        closestTwisted = self._bndMatrices()
+        self._translate()
+        closestTranslated = self._bndMatrices()
+
+        fixedCount = self._buildSpine('fixed')
+        self.assertTrue(fixedCount < closestCount)
+        self.assertMatrices(closestRest)
+        self._twist()
+        self.assertMatrices(closestTwisted)
+        self._translate()
+        self.assertMatrices(closestTranslated)
+
+    def test_fixedStretch(self):
+        """Stretching slides the joints past their up follicles, so only the
+        positions and aim axes match"""
+        self._buildSpine('closestPoint')
+        self._stretch()
+        closestStretched = self._bndMatrices()
+
+        self._buildSpine('fixed')
+        self._stretch()
+        #y is the aim axis
+        self.assertMatrices(closestStretched, indices=[4, 5, 6, 12, 13, 14])
+
+
+class TestAnalysis(BeingsTestCase):
+    """The analysis works on plain data, so most of this runs without a scene"""
+    def setUp(self):
+        super(TestAnalysis, self).setUp()
+        nodeTypes = {'grp': 'transform', 'jnt': 'joint', 'pc': 'pointConstraint',
+                     'oc': 'orientConstraint', 'sc': 'scaleConstraint',
+                     'mdnA': 'multiplyDivide', 'mdnB': 'multiplyDivide',
+                     'a': 'transform', 'b': 'transform'}
+        connections = [('jnt.parentInverseMatrix', 'pc.constraintParentInverseMatrix'),
+                       ('grp.worldMatrix[0]', 'pc.target[0].targetParentMatrix'),
+                       ('pc.constraintTranslateX', 'jnt.translateX'),
+                       ('oc.constraintRotateX', 'jnt.rotateX'),
+                       ('sc.constraintScaleX', 'jnt.scaleX'),
+                       ('jnt.translateX', 'mdnA.input1X'),
+                       ('mdnA.outputX', 'mdnB.input1Y'),
+                       ('a.translateX', 'b.translateX'),
+                       ('b.translateY', 'a.translateY')]
+        owners = dict([(n, 'arm_lf') for n in nodeTypes])
+        owners['a'] = owners['b'] = 'spine_cn'
+        self.snapshot = analysis.SceneSnapshot(nodeTypes, connections, {'jnt': 'grp'}, owners)
+
+    def test_analyze(self):
+        report = analysis.analyze(analysis.SceneSnapshot.fromDict(self.snapshot.toDict()))
+        self.assertEqual(report['nodes'], 9)
+        self.assertEqual(report['constraints'], 3)
+        self.assertEqual(report['widgets']['spine_cn']['connections'], 2)
+        self.assertEqual(report['criticalPath'], ['grp', 'pc', 'jnt', 'mdnA', 'mdnB'])
+        self.assertEqual(report['cycles'], [['a', 'b']])
+        patterns = dict([(name, nodes) for name, msg, nodes in report['heavyPatterns']])
+        self.assertEqual(patterns['constraintTriplet'], ['jnt'])
+        self.assertEqual(patterns['singleChannelMultiplyDivide'], ['mdnA', 'mdnB'])
+        self.assertEqual(len(analysis.checkLimits(report, maxNodes=5)), 2)
+
+    def test_builtRig(self):
+        MC.file(newFile=1, f=1)
+        root = core.Root()
+        root.addChild(core.CenterOfGravity(), plug='master')
+        root.buildLayout()
+        root.buildRig()
+        report = analysis.analyzeRig(root)
+        self.assertTrue(report['nodes'] > 0)
+        self.assertFalse(report['cycles'])
+
+
+class TestBuildJob(BeingsTestCase):
+    def setUp(self):
+        super(TestBuildJob, self).setUp()
+        MC.file(newFile=1, f=1)
+        self.root = core.Root()
+        self.cog = core.CenterOfGravity()
+        self.root.addChild(self.cog, plug='master')
+
+    def test_steps(self):
+        job = core.BuildJob(self.root, 'layout')
+        self.assertEqual(job.total, 2)
+        self.assertTrue(job.step())
+        self.assertEqual(job.current, self.root)
+        self.assertEqual(self.cog.state(), 'unbuilt')
+        self.assertFalse(job.step())
+        self.assertTrue(job.isFinished())
+        self.assertEqual(self.cog.state(), 'layoutBuilt')
+
+        job = core.BuildJob(self.root, 'rig')
+        job.run()
+        self.assertEqual(self.root.state(), 'rigBuilt')
+        self.assertEqual(self.cog.state(), 'rigBuilt')
+
+    def test_cancel(self):
+        nodes = sorted(MC.ls())
+        job = core.BuildJob(self.root, 'layout')
+        job.step()
+        job.cancel()
+        self.assertTrue(job.isCancelled())
+        self.assertEqual(self.root.state(), 'unbuilt')
+        self.assertEqual(sorted(MC.ls()), nodes)
+
+    def test_failedStep(self):
+        self.cog.addChild(FailingWidget(), plug='cog_bnd')
+        nodes = sorted(MC.ls())
+        job = core.BuildJob(self.root, 'layout')
+        self.assertRaises(RuntimeError, job.run)
+        self.assertTrue(job.isFinished())
+        for widget in [self.root] + self.root.children(recursive=True):
+            self.assertEqual(widget.state(), 'unbuilt')
+        self.assertEqual(sorted(MC.ls()), nodes)
+
+    def test_deferredUntilFinished(self):
+        job = core.BuildJob(self.root, 'layout', deferEvaluation=True)
+        job.step()
+        self.assertTrue(utils.DeferredEvaluation.active())
+        job.run()
+        self.assertFalse(utils.DeferredEvaluation.active())
+
+        job = core.BuildJob(self.root, 'rig', deferEvaluation=True)
+        job.step()
+        job.cancel()
+        self.assertFalse(utils.DeferredEvaluation.active())
+
+    def test_undoChunk(self):
+        MC.undoInfo(state=1)
+        MC.flushUndo()
+        job = core.BuildJob(self.root, 'layout', undoMode='chunk')
+        job.run()
+        MC.undo()
+        self.assertFalse(MC.ls('*_cog_*'))
+        self.assertFalse(MC.ls('*_master_*'))
+
+
+class FailingWidget(core.Widget):
+    """A widget whose layout fails after creating a node"""
+    def __init__(self, part='failing', **kwargs):
+        super(FailingWidget, self).__init__(part=part, **kwargs)
+
+    def _makeLayout(self, namer):
+        MC.createNode('transform', n=namer('tmp', r='grp'))
+        raise RuntimeError("layout failed")
+
+
+class TestBuildPlan(BeingsTestCase):
+    def setUp(self):
+        super(TestBuildPlan, self).setUp()
+        MC.file(newFile=1, f=1)
+        self.root = core.Root()
+        self.cog = core.CenterOfGravity()
+        self.root.addChild(self.cog, plug='master')
+
+    def test_rigPlan(self):
+        plan = self.root.planBuild('rig')
+        self.assertEqual(plan.widgets('throwawayLayout'), [self.root])
+        self.assertEqual(plan.widgets('delete'), [self.cog])
+        self.assertEqual(plan.widgets('rig'), [self.root, self.cog])
+        self.assertEqual(plan.widgets('parent'), [self.cog])
+        self.assertTrue(plan.totalCost() > 0)
+
+    def test_noSceneAccess(self):
+        self.root.buildLayout()
+        nodes = sorted(MC.ls())
+        plan = self.root.planBuild('rig')
+        self.assertEqual(sorted(MC.ls()), nodes)
+        self.assertFalse(plan.widgets('throwawayLayout'))
+        self.assertEqual(plan.widgets('delete'), [self.root, self.cog])
+
+    def test_timings(self):
+        core.recordBuildTime('TestBuildPlanWidget', 'rig', 2.0)
+        core.recordBuildTime('TestBuildPlanWidget', 'rig', 4.0)
+        self.assertAlmostEqual(core.estimateBuildTime('TestBuildPlanWidget', 'rig'), 3.0)
+        core.saveBuildTimings()
+        self.assertTrue(os.path.exists(os.path.join(self.tmpFilesDir, 'buildTimings.json')))
+
+
+class TestRigModel(BeingsTestCase):
+    def setUp(self):
+        super(TestRigModel, self).setUp()
+        #imported here to keep PyQt out of the other tests
+        from PyQt4 import QtCore
+        import models
+        self.QtCore = QtCore
+        self.models = models
+        self.model = models.RigModel()
+        self.root = self.model.root
+
+    def _widget(self, part, parent):
+        widget = core.Widget(part=part, plugs=['child'])
+        parent.addChild(widget)
+        return widget
+
+    def _chain(self, parent, *parts):
+        widgets = []
+        for part in parts:
+            parent = self._widget(part, parent)
+            widgets.append(parent)
+        return widgets
+
+    def _tree(self, model, item=None):
+        """The text of every row, nested under their parent rows"""
+        if item is None:
+            item = model.invisibleRootItem()
+        result = []
+        for row in range(item.rowCount()):
+            texts = [str(item.child(row, col).text()) for col in range(len(model.headers))]
+            result.append((texts, self._tree(model, item.child(row, 0))))
+        return result
+
+    def assertIndexed(self, model, widget, parent):
+        item = model.itemFromWidget(widget)
+        self.assertTrue(item is not None)
+        self.assertTrue(model.widgetFromIndex(item.index()) is widget)
+        parentItem = item.parent() or model.invisibleRootItem()
+        self.assertEqual(parentItem.index(), model.itemFromWidget(parent).index())
+
+    def _processEvents(self, until):
+        for i in range(1000):
+            if until():
+                return
+            self.QtCore.QCoreApplication.processEvents()
+        self.fail("events didn't finish")
+
+    def test_itemFromWidget(self):
+        a, b, c = self._chain(self.root, 'a', 'b', 'c')
+        d = self._widget('d', self.root)
+        for widget, parent in [(a, self.root), (b, a), (c, b), (d, self.root)]:
+            self.assertIndexed(self.model, widget, parent)
+
+        a.rmChild(b)
+        self.assertTrue(self.model.itemFromWidget(b) is None)
+        self.assertTrue(self.model.itemFromWidget(c) is None)
+        self.assertIndexed(self.model, a, self.root)
+        d.addChild(b)
+        self.assertIndexed(self.model, b, d)
+        self.assertIndexed(self.model, c, b)
+
+        #drag d's subtree under a
+        mimeData = self.model.mimeData([self.model.itemFromWidget(d).index()])
+        self.model.dropMimeData(mimeData, self.QtCore.Qt.MoveAction, -1, -1,
+                                self.model.itemFromWidget(a).index())
+        for widget, parent in [(a, self.root), (d, a), (b, d), (c, b)]:
+            self.assertIndexed(self.model, widget, parent)
+        self.assertEqual(self.model.rowCount(), 1)
+
+    def test_removeSubtree(self):
+        a, b, c = self._chain(self.root, 'a', 'b', 'c')
+        self._widget('b2', b)
+        d = self._widget('d', self.root)
+        self.root.rmChild(a)
+        self.assertEqual(self.model._indexes.keys(), [id(d)])
+        self.assertEqual(self.model.rowCount(), 1)
+        self.assertIndexed(self.model, d, self.root)
+
+    def test_optionChangeUpdatesRow(self):
+        a, b = self._chain(self.root, 'a', 'b')
+        c = self._widget('c', self.root)
+        changed = []
+        self.model.connect(self.model,
+                           self.QtCore.SIGNAL('dataChanged(QModelIndex, QModelIndex)'),
+                           lambda topLeft, bottomRight: changed.append((topLeft, bottomRight)))
+        before = self._tree(self.model)
+
+        b.options.setValue('side', 'lf')
+        b.options.setValue('part', 'renamed')
+        self.assertTrue(changed)
+        for topLeft, bottomRight in changed:
+            self.assertTrue(self.model.widgetFromIndex(topLeft) is b)
+            self.assertTrue(self.model.widgetFromIndex(bottomRight) is b)
+
+        after = self._tree(self.model)
+        self.assertEqual(after[0][1][0][0][:2], ['renamed', 'lf'])
+        after[0][1][0][0][:2] = before[0][1][0][0][:2]
+        self.assertEqual(after, before)
+
+    def test_batchedReset(self):
+        root = core.Root()
+        size = self.models.RigModel.POPULATE_BATCH_SIZE
+        tops = [self._widget('top%i' % i, root) for i in range(size)]
+        for i, top in enumerate(tops):
+            self._chain(top, 'mid%i' % i, 'low%i' % i)
+            self._widget('side%i' % i, top)
+        self.assertTrue(len(root.children(recursive=True)) > size)
+
+        populated = []
+        self.model.connect(self.model, self.QtCore.SIGNAL('populated()'),
+                           lambda: populated.append(True))
+        self.model.reset(root, batched=True)
+        self.assertTrue(self.model.isPopulating())
+        #removed before its row is added
+        root.rmChild(tops[-1])
+        #removed after its row is added, but not its children's
+        self._processEvents(lambda: self.model.itemFromWidget(tops[0]) is not None)
+        self.assertTrue(self.model.isPopulating())
+        root.rmChild(tops[0])
+        self._processEvents(lambda: populated)
+        self._processEvents(lambda: not self.model.isPopulating())
+        self.assertEqual(populated, [True])
+
+        unbatched = self.models.RigModel()
+        unbatched.reset(root)
+        self.assertEqual(self._tree(self.model), self._tree(unbatched))
+        for widget in root.children(recursive=True):
+            self.assertIndexed(self.model, widget, widget.parent())
+        for widget in [tops[0], tops[-1]] + tops[0].children(recursive=True):
+            self.assertTrue(self.model.itemFromWidget(widget) is None)
+
+
+class TestOptionCollectionModel(BeingsTestCase):
+    def setUp(self):
+        super(TestOptionCollectionModel, self).setUp()
+        #imported here to keep PyQt out of the other tests
+        from PyQt4 import QtCore
+        import models
+        self.QtCore = QtCore
+        self.models = models
+        self.options = options.OptionCollection()
+        self.options.addOpt('a', 1, optType=int)
+        self.options.addOpt('b', 2, optType=int)
+        self.model = models.OptionCollectionModel.modelFor(self.options)
+        self.assertTrue(models.OptionCollectionModel.modelFor(self.options) is self.model)
+        root = QtCore.QModelIndex()
+        while self.model.canFetchMore(root):
+            self.model.fetchMore(root)
+
+    def test_addLastOption(self):
+        inserted = []
+        self.model.connect(self.model,
+                           self.QtCore.SIGNAL('rowsInserted(QModelIndex, int, int)'),
+                           lambda parent, first, last: inserted.append((first, last)))
+        self.options.addOpt('z', 3, optType=int)
+        self.assertEqual(inserted, [(2, 2)])
+        self.assertEqual(self.model.rowCount(self.QtCore.QModelIndex()), 3)
+        self.assertFalse(self.model.canFetchMore(self.QtCore.QModelIndex()))
+
+    def _record(self, model, signal):
+        """Record the arguments of a model signal"""
+        emitted = []
+        model.connect(model, self.QtCore.SIGNAL(signal), lambda *args: emitted.append(args))
+        return emitted
+
+    def _bigModel(self, count):
+        optionCollection = options.OptionCollection()
+        for i in range(count):
+            optionCollection.addOpt('opt%03i' % i, i, optType=int)
+        return optionCollection, self.models.OptionCollectionModel(optionCollection)
+
+    def test_insertPartlyFetched(self):
+        root = self.QtCore.QModelIndex()
+        batch = self.models.OptionCollectionModel.FETCH_BATCH_SIZE
+        optionCollection, model = self._bigModel(batch + batch / 2)
+        model.fetchMore(root)
+        self.assertEqual(model.rowCount(root), batch)
+        inserted = self._record(model, 'rowsInserted(QModelIndex, int, int)')
+
+        #rows after the fetched ones are left for fetchMore
+        optionCollection.addOpt('opt%03ia' % (batch + 10), 0, optType=int)
+        self.assertEqual(inserted, [])
+        self.assertEqual(model.rowCount(root), batch)
+        #rows among the fetched ones are inserted
+        optionCollection.addOpt('opt%03ia' % (batch / 2), 0, optType=int)
+        self.assertEqual([(first, last) for parent, first, last in inserted],
+                         [(batch / 2 + 1, batch / 2 + 1)])
+        self.assertEqual(model.rowCount(root), batch + 1)
+
+        while model.canFetchMore(root):
+            model.fetchMore(root)
+        names = [str(model.data(model.index(row, 0, root), self.QtCore.Qt.DisplayRole))
+                 for row in range(model.rowCount(root))]
+        self.assertEqual(names, sorted(optionCollection.getAllOpts().keys()))
+
+    def test_fetchBatches(self):
+        root = self.QtCore.QModelIndex()
+        batch = self.models.OptionCollectionModel.FETCH_BATCH_SIZE
+        optionCollection, model = self._bigModel(batch * 2 + 5)
+        self.assertEqual(model.rowCount(root), 0)
+        inserted = self._record(model, 'rowsInserted(QModelIndex, int, int)')
+        while model.canFetchMore(root):
+            model.fetchMore(root)
+        self.assertEqual([(first, last) for parent, first, last in inserted],
+                         [(0, batch - 1), (batch, batch * 2 - 1), (batch * 2, batch * 2 + 4)])
+        self.assertEqual(model.rowCount(root), batch * 2 + 5)
+        model.fetchMore(root)
+        self.assertEqual(len(inserted), 3)
+
+    def test_optSetDataChanged(self):
+        changed = self._record(self.model, 'dataChanged(QModelIndex, QModelIndex)')
+        self.options.setValue('b', 5)
+        self.assertEqual(len(changed), 1)
+        for index in changed[0]:
+            self.assertEqual((index.row(), index.column()), (1, 1))
+        self.assertEqual(self.model.data(changed[0][0], self.QtCore.Qt.DisplayRole), 5)
+
+    def test_hiddenOptions(self):
+        root = self.QtCore.QModelIndex()
+        inserted = self._record(self.model, 'rowsInserted(QModelIndex, int, int)')
+        changed = self._record(self.model, 'dataChanged(QModelIndex, QModelIndex)')
+        self.options.addOpt('aa', 1, optType=int, hidden=True)
+        self.options.setValue('aa', 2)
+        self.assertEqual(inserted, [])
+        self.assertEqual(changed, [])
+        self.assertEqual(self.model.rowCount(root), 2)
+
+        optionCollection = options.OptionCollection()
+        optionCollection.addOpt('hidden', 1, hidden=True)
+        optionCollection.addOpt('shown', 1)
+        model = self.models.OptionCollectionModel(optionCollection)
+        while model.canFetchMore(root):
+            model.fetchMore(root)
+        self.assertEqual(model.rowCount(root), 1)
+        self.assertEqual(str(model.data(model.index(0, 0, root), self.QtCore.Qt.DisplayRole)),
+                         'shown')
+
+    def test_modelForReleased(self):
+        optionCollection = options.OptionCollection()
+        optionCollection.addOpt('a', 1, optType=int)
+        modelRef = weakref.ref(self.models.OptionCollectionModel.modelFor(optionCollection))
+        count = len(self.models.OptionCollectionModel._models)
+        del optionCollection
+        gc.collect()
+        self.assertTrue(modelRef() is None)
+        self.assertEqual(len(self.models.OptionCollectionModel._models), count - 1)
 
 
 def runTests(*args):
@@ -100,7 +100,7 @@ class TreeItem(Observable):
             self.notify('aboutToRemoveChild', parent=self, child=child)
             parent = self.parent()
             while parent:
-                parent.notify('aboutToRemovehild', parent=self, child=child)
+                parent.notify('aboutToRemoveChild', parent=self, child=child)
                 parent = parent.parent()
 
         index = self.childIndex(child)
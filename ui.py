@@ -10,10 +10,10 @@ from PyQt4 import uic
 import core
 import utils
 import options
+import models
 #seems like importing pyqt changes root logger level to 0
 logging.getLogger().setLevel(__rootLevel)
 
-core._importAllWidgets(reloadThem=True)
 
 def getResource(fileName):
     basedir = os.path.dirname(sys.modules[__name__].__file__)
@@ -47,7 +47,7 @@ class PopupError():
 class WidgetTree(QTreeView):
     def __init__(self, parent=None):
         super(WidgetTree, self).__init__(parent)
-        self.rig = core.RigModel()
+        self.rig = models.RigModel()
         self.setModel(self.rig)
         self.rig.reset()
         self.setAnimated(True)
@@ -234,6 +234,11 @@ class RigWidget(QWidget):
         uic.loadUi(getResource('rigwidget.ui'), self)
         self.__fileName = None
         self.__registry = core.WidgetRegistry()
+        #the core.BuildJob being run from the event loop, its progress dialog
+        #and its estimated seconds
+        self._buildJob = None
+        self._buildProgress = None
+        self._buildEstimate = 0.0
         #populate the widget list
         for wdg in self.__registry.widgetNames():
             self.widgetList.addItem(wdg)
@@ -241,7 +246,7 @@ class RigWidget(QWidget):
 
         self.options = options.OptionCollection()
         self.options.addOpt('lock', True, optType=bool)
-        self.rigOptionsView.setModel(options.OptionCollectionModel(self.options))
+        self.rigOptionsView.setModel(models.OptionCollectionModel.modelFor(self.options))
         self.options.addOpt('character name', 'char', optType=str)
 
         fileMenu = self.menuBar.addMenu('&File')
@@ -269,7 +274,7 @@ class RigWidget(QWidget):
         return action
 
     def onWidgetSelected(self, widget):
-        model = options.OptionCollectionModel(widget.options)
+        model = models.OptionCollectionModel.modelFor(widget.options)
         self.widgetOptionsView.setModel(model)
 
     def fileOpen(self):
@@ -306,7 +311,7 @@ class RigWidget(QWidget):
         """Load the rig data
         @param data:  a rig dictionary"""
         root = core.rigFromData(data)
-        self.rigView.model().reset(root=root)
+        self.rigView.model().reset(root=root, batched=True)
 
     def _root(self):
         return self.rigView.model().root
@@ -314,29 +319,79 @@ class RigWidget(QWidget):
     @pyqtSlot()
     @PopupError()
     def on_buildLayoutBtn_released(self):
-        root = self._root()
-        charName = self.options.getValue('character name')
-        root.options.setValue('char', charName)
-        for child in root.children(recursive=True):
-            child.options.setValue('char', charName)
-
-        root.buildLayout()
-        if self.options.getValue('lock'):
-            root.lockNodes()
-
+        self._startBuild('layout')
 
     @pyqtSlot()
     @PopupError()
     def on_buildRigBtn_released(self):
+        self._startBuild('rig')
+
+    def _startBuild(self, buildType):
+        """Start building the rig a widget at a time from the event loop, with
+        a progress dialog that can cancel it"""
+        if self._buildJob is not None:
+            raise RuntimeError("A build is already running")
+
         root = self._root()
         charName = self.options.getValue('character name')
         root.options.setValue('char', charName)
         for child in root.children(recursive=True):
             child.options.setValue('char', charName)
 
-        root.buildRig()
+        plan = root.planBuild(buildType)
+        _logger.info(plan.format())
+        job = core.BuildJob(root, buildType)
+        self._buildEstimate = plan.totalCost()
+        progress = QProgressDialog("Building %s..." % buildType, "Cancel", 0, job.total, self)
+        progress.setWindowTitle("Beings")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        self.connect(progress, SIGNAL('canceled()'), self._cancelBuild)
+
+        self._buildJob = job
+        self._buildProgress = progress
+        QTimer.singleShot(0, self._buildStep)
+
+    @PopupError()
+    def _buildStep(self):
+        job = self._buildJob
+        if job is None:
+            return
+        try:
+            more = job.step()
+        except Exception:
+            #the job has deleted what it built
+            self._endBuild()
+            raise
+
+        self._buildProgress.setValue(job.done)
+        self._buildProgress.setLabelText("Building %s: %s (%i of %i)\n%.1f of about %.0f seconds" % \
+                                         (job.buildType, job.current.name(), job.done,
+                                          job.total, job.elapsed(), self._buildEstimate))
+        if more:
+            QTimer.singleShot(0, self._buildStep)
+            return
+
+        self._endBuild()
         if self.options.getValue('lock'):
-            root.lockNodes()
+            job.widget.lockNodes()
+        _logger.info("Built %s in %.1f seconds" % (job.buildType, job.elapsed()))
+        core.saveBuildTimings()
+
+    def _cancelBuild(self):
+        job = self._buildJob
+        if job is None:
+            return
+        self._endBuild()
+        job.cancel()
+
+    def _endBuild(self):
+        self._buildJob = None
+        progress = self._buildProgress
+        self._buildProgress = None
+        if progress is not None:
+            self.disconnect(progress, SIGNAL('canceled()'), self._cancelBuild)
+            progress.close()
 
 
     @pyqtSlot()
@@ -1,8 +1,16 @@
 '''
-API Utils
+API Utils, and a registry of node handles.  Handles are stable references
+to nodes that cache their name, dag path and function sets:
+
+    handle = utils.getHandle('pCube1')
+    MC.rename(handle.name(), 'box')
+    MC.setAttr('%s.tx' % handle, 1)
+    fn = handle.fn()
 '''
 import maya.OpenMaya as OM
-import pymel.core as PM
+import maya.OpenMayaAnim as OMA
+from PyUtils import LazyModule
+PM = LazyModule('pymel.core')
 
 def getShadingGroupMembership():
     '''
@@ -14,43 +22,256 @@ def getShadingGroupMembership():
     for sg in sgs:
         result[sg.name()] = sg.members(flatten=True)
     return result
-        
+
+#function set classes for getMFn, most specific first
+_fnClasses = [(OM.MFn.kJoint, OMA.MFnIkJoint),
+              (OM.MFn.kTransform, OM.MFnTransform),
+              (OM.MFn.kNurbsCurve, OM.MFnNurbsCurve),
+              (OM.MFn.kNurbsSurface, OM.MFnNurbsSurface),
+              (OM.MFn.kMesh, OM.MFnMesh),
+              (OM.MFn.kDagNode, OM.MFnDagNode)]
+
+#{MObjectHandle hash code: [NodeHandle]}
+_handlesByHash = {}
+#{name: NodeHandle}, and the names in it of dag nodes.  Dag names can go
+#stale or become ambiguous with any dag change, so they're forgotten then
+_handlesByName = {}
+_pathNames = set()
+#incremented whenever dag paths may have changed
+_dagGeneration = [0]
+
+#remove callbacks left by a previous version of this module
+for _id in globals().get('_callbackIds', []):
+    OM.MMessage.removeCallback(_id)
+_callbackIds = []
+
+class NodeHandle(object):
+    """
+    A stable reference to a node.  getHandle returns the same handle for a
+    node however it is named, and the handle's id doesn't change when the
+    node is renamed or reparented.  str() gives the current name, so handles
+    can be used where node names are expected
+    """
+    _nextId = 0
+
+    def __init__(self, obj):
+        self._handle = OM.MObjectHandle(obj)
+        self._isDag = obj.hasFn(OM.MFn.kDagNode)
+        self._names = set()
+        self._name = None
+        self._dagPath = None
+        self._fns = {}
+        self._generation = _dagGeneration[0]
+        self.id = NodeHandle._nextId
+        NodeHandle._nextId += 1
+
+    def __str__(self):
+        return self.name()
+
+    def __repr__(self):
+        if self.isValid():
+            return "NodeHandle(%i, '%s')" % (self.id, self.name())
+        return "NodeHandle(%i, <deleted>)" % self.id
+
+    def _checkGeneration(self):
+        if self._isDag and self._generation != _dagGeneration[0]:
+            self._name = None
+            self._dagPath = None
+            self._fns = {}
+            self._generation = _dagGeneration[0]
+
+    def isValid(self):
+        return self._handle.isValid()
+
+    def isDag(self):
+        return self._isDag
+
+    def object(self):
+        """
+        @rtype: MObject
+        @raise RuntimeError: if the node was deleted
+        """
+        if not self._handle.isValid():
+            raise RuntimeError("Node %i no longer exists" % self.id)
+        return self._handle.object()
+
+    def dagPath(self):
+        """
+        @return: a copy of the cached path, so callers may extend it
+        @rtype: MDagPath
+        @raise RuntimeError: if the node is not a dag node
+        """
+        if not self._isDag:
+            raise RuntimeError("%s is not a dag node" % self.name())
+        self._checkGeneration()
+        if self._dagPath is None:
+            self._dagPath = OM.MDagPath()
+            OM.MDagPath.getAPathTo(self.object(), self._dagPath)
+        return OM.MDagPath(self._dagPath)
+
+    def name(self):
+        """The shortest unique name of the node"""
+        self._checkGeneration()
+        if self._name is None:
+            if self._isDag:
+                self._name = self.dagPath().partialPathName()
+            else:
+                self._name = OM.MFnDependencyNode(self.object()).name()
+        return self._name
+
+    def fn(self, fnClass=None):
+        """
+        Get a cached function set.  Dag function sets are attached to the
+        node's dag path
+        @param fnClass=None: the function set class.  By default use the most
+        specific of a few common classes, or MFnDependencyNode
+        """
+        self._checkGeneration()
+        fn = self._fns.get(fnClass, None)
+        if fn is not None:
+            return fn
+
+        cls = fnClass
+        if cls is None:
+            cls = OM.MFnDependencyNode
+            obj = self.object()
+            for apiType, fnType in _fnClasses:
+                if obj.hasFn(apiType):
+                    cls = fnType
+                    break
+
+        if self._isDag and issubclass(cls, OM.MFnDagNode):
+            fn = cls(self.dagPath())
+        else:
+            fn = cls(self.object())
+        self._fns[fnClass] = fn
+        return fn
+
+def _existingHandle(obj):
+    """Get the registered handle for an MObject, or None"""
+    for handle in _handlesByHash.get(OM.MObjectHandle(obj).hashCode(), ()):
+        if handle.isValid() and handle._handle.object() == obj:
+            return handle
+    return None
+
+def _forgetNames(handle):
+    for name in handle._names:
+        if _handlesByName.get(name, None) is handle:
+            del _handlesByName[name]
+        _pathNames.discard(name)
+    handle._names.clear()
+
+def _forgetPaths():
+    _dagGeneration[0] += 1
+    for name in _pathNames:
+        handle = _handlesByName.pop(name, None)
+        if handle is not None:
+            handle._names.discard(name)
+    _pathNames.clear()
+
+def _nameChanged(node, prevName, *args):
+    handle = _existingHandle(node)
+    if handle is not None:
+        _forgetNames(handle)
+        handle._name = None
+    #other nodes' paths may include this one
+    if node.hasFn(OM.MFn.kDagNode):
+        _forgetPaths()
+
+def _nodeRemoved(node, *args):
+    #the handle stays registered; if the deletion is undone it is valid again
+    handle = _existingHandle(node)
+    if handle is not None:
+        _forgetNames(handle)
+
+def _dagChanged(*args):
+    _forgetPaths()
+
+def _addCallbacks():
+    if _callbackIds:
+        return
+    _callbackIds.append(OM.MNodeMessage.addNameChangedCallback(OM.MObject(), _nameChanged))
+    _callbackIds.append(OM.MDGMessage.addNodeRemovedCallback(_nodeRemoved, 'dependNode'))
+    _callbackIds.append(OM.MDagMessage.addAllDagChangesCallback(_dagChanged))
+    _callbackIds.append(OM.MDGMessage.addNodeAddedCallback(_dagChanged, 'dagNode'))
+
+def clearHandles():
+    """
+    Stop tracking scene changes and forget all handles.  Existing handles
+    keep working, but getHandle will make new ones
+    """
+    for callbackId in _callbackIds:
+        OM.MMessage.removeCallback(callbackId)
+    del _callbackIds[:]
+    _handlesByHash.clear()
+    _handlesByName.clear()
+    _pathNames.clear()
+
+def _handleForObject(obj):
+    _addCallbacks()
+    hashCode = OM.MObjectHandle(obj).hashCode()
+    handles = [h for h in _handlesByHash.get(hashCode, []) if h._handle.isAlive()]
+    _handlesByHash[hashCode] = handles
+    for handle in handles:
+        if handle.isValid() and handle._handle.object() == obj:
+            return handle
+    handle = NodeHandle(obj)
+    handles.append(handle)
+    return handle
+
+def getHandle(node):
+    """
+    Get the handle for a node
+    @param node: a NodeHandle, MObject, MObjectHandle, MDagPath, PyNode or
+    node name
+    @rtype: NodeHandle
+    """
+    if isinstance(node, NodeHandle):
+        return node
+    if isinstance(node, OM.MObjectHandle):
+        node = node.object()
+    elif isinstance(node, OM.MDagPath):
+        node = node.node()
+    if isinstance(node, OM.MObject):
+        return _handleForObject(node)
+
+    name = str(node)
+    handle = _handlesByName.get(name, None)
+    if handle is not None and handle.isValid():
+        return handle
+
+    sl = OM.MSelectionList()
+    sl.add(name)
+    if sl.length() > 1:
+        raise RuntimeError("More than one object matches name: %s" % name)
+    obj = OM.MObject()
+    sl.getDependNode(0, obj)
+    handle = _handleForObject(obj)
+
+    _handlesByName[name] = handle
+    handle._names.add(name)
+    #short names too - a new node with the same name makes them ambiguous
+    if handle._isDag:
+        _pathNames.add(name)
+    return handle
 
 def strToObj(strObj, handle=False, dagPath=False):
     '''
-    convert a string rep of an object into an MObject
+    convert a string rep of an object into an MObject.  Lookups go through
+    the handle registry, so repeated names aren't re-resolved
     @param handle=False: return an MObjectHandle
     @param dagPath=False: return and MDagPath
     '''
-    if isinstance(strObj, PM.PyNode):
-        strObj = strObj.name()
-    sl = OM.MSelectionList()
-    sl.add(strObj)
-    
+    nodeHandle = getHandle(strObj)
     if dagPath:
-        obj = OM.MDagPath()
-        sl.getDagPath(0, obj)
-    else:
-        obj = OM.MObject()
-        sl.getDependNode(0, obj)
-    
-    if handle and not dagPath:
-        obj = OM.MObjectHandle(obj)
-    return obj
-
+        return nodeHandle.dagPath()
+    if handle:
+        return OM.MObjectHandle(nodeHandle.object())
+    return nodeHandle.object()
 
 def getMFn(node):
     '''
-    convert an MObject, MDagPath, string, or PyNode to an MFn obj
+    convert an MObject, MDagPath, string, PyNode or NodeHandle to an MFn obj.
+    The function set is cached on the node's handle
     '''
-    try:
-        n = PM.PyNode(node)
-        return n.__apimfn__()
-    except:
-        if isinstance(node, OM.MDagPath):
-            name = node.fullPathName()
-        else:
-            nodeFn = OM.MFnDependencyNode(node)
-            name = nodeFn.name()
-        return PM.PyNode(name).__apimfn__()
-
+    return getHandle(node).fn()
@@ -0,0 +1,385 @@
+"""
+Batch transform math for stacks of matrices and vectors.
+
+Matrices are flat 16-item row-major lists, the same layout MC.xform returns,
+and follow Maya's row-vector conventions - points are transformed with
+p * M, and a node's matrix is S * R * T.  Every function takes a sequence of
+matrices (or vectors) and works on all of them at once.
+
+NumPy is used when it is available, and results are then (N, 16) or (N, 3)
+arrays.  Without NumPy results are lists of lists.  This module doesn't
+import Maya, so it can be tested and benchmarked outside of it:
+
+    python BatchMath.py
+"""
+import math
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:
+    np = None
+    HAVE_NUMPY = False
+
+#Maya's rotateOrder enum values
+ROTATE_ORDERS = ['xyz', 'yzx', 'zxy', 'xzy', 'yxz', 'zyx']
+
+_EPSILON = 1e-10
+
+def _useNumpy(useNumpy):
+    if useNumpy is None:
+        return HAVE_NUMPY
+    if useNumpy and not HAVE_NUMPY:
+        raise RuntimeError("NumPy is not available")
+    return useNumpy
+
+def _axisIndices(rotateOrder):
+    if not isinstance(rotateOrder, basestring):
+        rotateOrder = ROTATE_ORDERS[rotateOrder]
+    return ['xyz'.index(a) for a in rotateOrder.lower()]
+
+def _isEvenPermutation(indices):
+    return tuple(indices) in [(0, 1, 2), (1, 2, 0), (2, 0, 1)]
+
+#---------------------------- pure python helpers ----------------------------
+
+def _to4x4(m):
+    return [list(m[r * 4:r * 4 + 4]) for r in range(4)]
+
+def _flat(m):
+    return [v for row in m for v in row]
+
+def _mult4x4(a, b):
+    return [[a[r][0] * b[0][c] + a[r][1] * b[1][c] + a[r][2] * b[2][c] + a[r][3] * b[3][c]
+             for c in range(4)] for r in range(4)]
+
+def _inverse4x4(m):
+    """Gauss-Jordan inverse with partial pivoting"""
+    a = [list(row) + [1.0 if r == c else 0.0 for c in range(4)] for r, row in enumerate(m)]
+    for col in range(4):
+        pivot = max(range(col, 4), key=lambda r: abs(a[r][col]))
+        if abs(a[pivot][col]) < _EPSILON:
+            raise ZeroDivisionError("matrix is singular")
+        a[col], a[pivot] = a[pivot], a[col]
+        p = float(a[col][col])
+        a[col] = [v / p for v in a[col]]
+        for r in range(4):
+            if r != col and a[r][col]:
+                f = a[r][col]
+                a[r] = [v - f * pv for v, pv in zip(a[r], a[col])]
+    return [row[4:] for row in a]
+
+def _axisRotation(axis, angle):
+    """Row-vector rotation matrix around a single axis, angle in radians"""
+    c = math.cos(angle)
+    s = math.sin(angle)
+    if axis == 0:
+        return [[1, 0, 0], [0, c, s], [0, -s, c]]
+    elif axis == 1:
+        return [[c, 0, -s], [0, 1, 0], [s, 0, c]]
+    return [[c, s, 0], [-s, c, 0], [0, 0, 1]]
+
+def _mult3x3(a, b):
+    return [[sum(a[r][k] * b[k][c] for k in range(3)) for c in range(3)] for r in range(3)]
+
+def _eulerToRotation(rotation, indices):
+    result = None
+    for axis in indices:
+        m = _axisRotation(axis, math.radians(rotation[axis]))
+        result = m if result is None else _mult3x3(result, m)
+    return result
+
+def _rotationToEuler(r, indices):
+    i, j, k = indices
+    e = 1.0 if _isEvenPermutation(indices) else -1.0
+    sinB = max(-1.0, min(1.0, -e * r[i][k]))
+    result = [0.0, 0.0, 0.0]
+    result[j] = math.asin(sinB)
+    if abs(sinB) < 1.0 - _EPSILON:
+        result[i] = math.atan2(e * r[j][k], r[k][k])
+        result[k] = math.atan2(e * r[i][j], r[i][i])
+    else:
+        #gimbal lock - put all of the rotation in the first axis
+        result[i] = math.atan2(-e * r[k][j], r[j][j])
+        result[k] = 0.0
+    return [math.degrees(a) for a in result]
+
+def _det3x3(m):
+    return (m[0][0] * (m[1][1] * m[2][2] - m[1][2] * m[2][1]) -
+            m[0][1] * (m[1][0] * m[2][2] - m[1][2] * m[2][0]) +
+            m[0][2] * (m[1][0] * m[2][1] - m[1][1] * m[2][0]))
+
+#------------------------------- numpy helpers -------------------------------
+
+def _npStack(matrices):
+    return np.asarray(matrices, dtype=float).reshape(-1, 4, 4)
+
+def _npVectors(vectors):
+    return np.asarray(vectors, dtype=float).reshape(-1, 3)
+
+def _npAxisRotations(axis, angles):
+    c = np.cos(angles)
+    s = np.sin(angles)
+    result = np.zeros((len(angles), 3, 3))
+    a, b = [x for x in range(3) if x != axis]
+    result[:, axis, axis] = 1.0
+    #the sign pattern matches _axisRotation
+    sign = -1.0 if axis == 1 else 1.0
+    result[:, a, a] = c
+    result[:, b, b] = c
+    result[:, a, b] = sign * s
+    result[:, b, a] = -sign * s
+    return result
+
+def _npEulerToRotations(rotations, indices):
+    rads = np.radians(_npVectors(rotations))
+    result = None
+    for axis in indices:
+        m = _npAxisRotations(axis, rads[:, axis])
+        result = m if result is None else np.einsum('nij,njk->nik', result, m)
+    return result
+
+def _npRotationsToEuler(r, indices):
+    i, j, k = indices
+    e = 1.0 if _isEvenPermutation(indices) else -1.0
+    sinB = np.clip(-e * r[:, i, k], -1.0, 1.0)
+    result = np.zeros((len(r), 3))
+    result[:, j] = np.arcsin(sinB)
+    locked = np.abs(sinB) >= 1.0 - _EPSILON
+    result[:, i] = np.where(locked,
+                            np.arctan2(-e * r[:, k, j], r[:, j, j]),
+                            np.arctan2(e * r[:, j, k], r[:, k, k]))
+    result[:, k] = np.where(locked, 0.0, np.arctan2(e * r[:, i, j], r[:, i, i]))
+    return np.degrees(result)
+
+#-------------------------------- matrices --------------------------------
+
+def identity(count=1, useNumpy=None):
+    """
+    Get a stack of identity matrices
+    """
+    if _useNumpy(useNumpy):
+        return np.tile(np.eye(4).reshape(1, 16), (count, 1))
+    return [[1.0 if r == c else 0.0 for r in range(4) for c in range(4)] for i in range(count)]
+
+def multiply(a, b, useNumpy=None):
+    """
+    Multiply two stacks of matrices pairwise, a[i] * b[i].  If either stack
+    has a single matrix it is used for every item of the other
+    """
+    if _useNumpy(useNumpy):
+        a = _npStack(a)
+        b = _npStack(b)
+        return np.einsum('nij,njk->nik', a, b).reshape(-1, 16)
+
+    a = [_to4x4(m) for m in a]
+    b = [_to4x4(m) for m in b]
+    if len(a) == 1:
+        a = a * len(b)
+    elif len(b) == 1:
+        b = b * len(a)
+    if len(a) != len(b):
+        raise RuntimeError("Cannot multiply %i matrices by %i matrices" % (len(a), len(b)))
+    return [_flat(_mult4x4(x, y)) for x, y in zip(a, b)]
+
+def inverse(matrices, useNumpy=None):
+    """
+    Invert a stack of matrices
+    """
+    if _useNumpy(useNumpy):
+        return np.linalg.inv(_npStack(matrices)).reshape(-1, 16)
+    return [_flat(_inverse4x4(_to4x4(m))) for m in matrices]
+
+def eulerToMatrix(rotations, rotateOrder=0, useNumpy=None):
+    """
+    Get rotation matrices from euler rotations in degrees
+    @param rotateOrder=0: a Maya rotateOrder index or a string like 'xyz'
+    """
+    indices = _axisIndices(rotateOrder)
+    if _useNumpy(useNumpy):
+        r = _npEulerToRotations(rotations, indices)
+        result = np.tile(np.eye(4), (len(r), 1, 1))
+        result[:, :3, :3] = r
+        return result.reshape(-1, 16)
+
+    result = []
+    for rotation in rotations:
+        r = _eulerToRotation(rotation, indices)
+        result.append(r[0] + [0.0] + r[1] + [0.0] + r[2] + [0.0] + [0.0, 0.0, 0.0, 1.0])
+    return result
+
+def matrixToEuler(matrices, rotateOrder=0, useNumpy=None):
+    """
+    Get euler rotations in degrees from the rotation of a stack of matrices.
+    Any scale in the matrices is removed first
+    @param rotateOrder=0: a Maya rotateOrder index or a string like 'xyz'
+    """
+    return decompose(matrices, rotateOrder=rotateOrder, useNumpy=useNumpy)[1]
+
+def compose(translates, rotates, scales=None, rotateOrder=0, useNumpy=None):
+    """
+    Build matrices from translations, euler rotations in degrees and scales,
+    as Maya does for a transform with no pivots or shear
+    """
+    if _useNumpy(useNumpy):
+        r = _npEulerToRotations(rotates, _axisIndices(rotateOrder))
+        result = np.tile(np.eye(4), (len(r), 1, 1))
+        if scales is not None:
+            r = r * _npVectors(scales)[:, :, np.newaxis]
+        result[:, :3, :3] = r
+        result[:, 3, :3] = _npVectors(translates)
+        return result.reshape(-1, 16)
+
+    if scales is None:
+        scales = [[1, 1, 1]] * len(rotates)
+    indices = _axisIndices(rotateOrder)
+    result = []
+    for t, rotation, s in zip(translates, rotates, scales):
+        r = _eulerToRotation(rotation, indices)
+        m = []
+        for row in range(3):
+            m.extend([v * s[row] for v in r[row]] + [0.0])
+        m.extend(list(t) + [1.0])
+        result.append(m)
+    return result
+
+def decompose(matrices, rotateOrder=0, useNumpy=None):
+    """
+    Split a stack of matrices into translations, euler rotations in degrees
+    and scales.  Shear is ignored; a negative determinant is put in the x scale
+    @return: (translates, rotates, scales)
+    """
+    indices = _axisIndices(rotateOrder)
+    if _useNumpy(useNumpy):
+        m = _npStack(matrices)
+        t = m[:, 3, :3].copy()
+        s = np.sqrt((m[:, :3, :3] ** 2).sum(axis=2))
+        s[:, 0] *= np.sign(np.linalg.det(m[:, :3, :3])) + (np.linalg.det(m[:, :3, :3]) == 0)
+        r = m[:, :3, :3] / np.where(s == 0, 1.0, s)[:, :, np.newaxis]
+        return t, _npRotationsToEuler(r, indices), s
+
+    translates, rotates, scales = [], [], []
+    for m in matrices:
+        m = _to4x4(m)
+        rows = [m[i][:3] for i in range(3)]
+        s = [math.sqrt(sum(v * v for v in row)) for row in rows]
+        if _det3x3(rows) < 0:
+            s[0] = -s[0]
+        r = [[v / s[i] if s[i] else v for v in rows[i]] for i in range(3)]
+        translates.append(m[3][:3])
+        rotates.append(_rotationToEuler(r, indices))
+        scales.append(s)
+    return translates, rotates, scales
+
+def mirror(matrices, axis=0, useNumpy=None):
+    """
+    Mirror a stack of matrices across the plane normal to an axis, so that
+    each result behaves like a mirrored control: translation along the axis
+    and rotations around the other two axes are negated
+    @param axis=0: 0, 1 or 2 for x, y or z
+    """
+    signs = [1.0, 1.0, 1.0, 1.0]
+    signs[axis] = -1.0
+    if _useNumpy(useNumpy):
+        signs = np.array(signs)
+        return (_npStack(matrices) * np.outer(signs, signs)).reshape(-1, 16)
+    flips = [signs[i // 4] * signs[i % 4] for i in range(16)]
+    return [[v * f for v, f in zip(m, flips)] for m in matrices]
+
+def mirrorEuler(rotations, axis=0, useNumpy=None):
+    """
+    Mirror euler rotations across the plane normal to an axis.  Rotations
+    around the other two axes are negated, regardless of rotate order
+    """
+    signs = [-1.0, -1.0, -1.0]
+    signs[axis] = 1.0
+    if _useNumpy(useNumpy):
+        return _npVectors(rotations) * np.array(signs)
+    return [[v * f for v, f in zip(r, signs)] for r in rotations]
+
+#-------------------------------- vectors --------------------------------
+
+def transformPoints(points, matrices, useNumpy=None):
+    """
+    Transform points by matrices.  If there is a single matrix it is used
+    for every point; otherwise points and matrices are paired
+    """
+    if _useNumpy(useNumpy):
+        p = _npVectors(points)
+        m = _npStack(matrices)
+        homogeneous = np.hstack([p, np.ones((len(p), 1))])
+        if len(m) == 1:
+            return homogeneous.dot(m[0])[:, :3]
+        return np.einsum('ni,nij->nj', homogeneous, m)[:, :3]
+
+    matrices = [_to4x4(m) for m in matrices]
+    if len(matrices) == 1:
+        matrices = matrices * len(points)
+    result = []
+    for p, m in zip(points, matrices):
+        result.append([p[0] * m[0][c] + p[1] * m[1][c] + p[2] * m[2][c] + m[3][c]
+                       for c in range(3)])
+    return result
+
+def dot(a, b, useNumpy=None):
+    """
+    Pairwise dot products of two stacks of vectors
+    """
+    if _useNumpy(useNumpy):
+        return (np.asarray(a, dtype=float) * np.asarray(b, dtype=float)).sum(axis=-1)
+    return [sum(x * y for x, y in zip(u, v)) for u, v in zip(a, b)]
+
+def project(hVecs, nVecs, useNumpy=None):
+    """
+    Project stacks of vectors pairwise - see MathUtils.projectedVector
+    @return: (pVecs, oVecs) where pVecs are parallel to nVecs and
+    pVecs + oVecs == hVecs
+    """
+    if _useNumpy(useNumpy):
+        h = np.asarray(hVecs, dtype=float)
+        n = np.asarray(nVecs, dtype=float)
+        mult = (h * n).sum(axis=-1) / (n * n).sum(axis=-1)
+        p = n * mult[:, np.newaxis]
+        return p, h - p
+
+    pVecs, oVecs = [], []
+    for h, n in zip(hVecs, nVecs):
+        mult = sum(x * y for x, y in zip(h, n)) / float(sum(x * x for x in n))
+        p = [x * mult for x in n]
+        pVecs.append(p)
+        oVecs.append([x - y for x, y in zip(h, p)])
+    return pVecs, oVecs
+
+
+def benchmark(count=10000, repeat=3):
+    """
+    Time the main operations on a stack of matrices with each available
+    backend
+    @return: dict of {(backend, operation): seconds}
+    """
+    import random, timeit
+    random.seed(0)
+    translates = [[random.uniform(-10, 10) for i in range(3)] for j in range(count)]
+    rotates = [[random.uniform(-180, 180) for i in range(3)] for j in range(count)]
+    backends = [False]
+    if HAVE_NUMPY:
+        backends.append(True)
+
+    result = {}
+    for useNumpy in backends:
+        name = useNumpy and 'numpy' or 'python'
+        matrices = compose(translates, rotates, rotateOrder=0, useNumpy=useNumpy)
+        ops = {'compose': lambda: compose(translates, rotates, rotateOrder=2, useNumpy=useNumpy),
+               'multiply': lambda: multiply(matrices, matrices, useNumpy=useNumpy),
+               'inverse': lambda: inverse(matrices, useNumpy=useNumpy),
+               'decompose': lambda: decompose(matrices, rotateOrder=4, useNumpy=useNumpy),
+               'mirror': lambda: mirror(matrices, useNumpy=useNumpy)}
+        for opName, op in ops.items():
+            result[(name, opName)] = min(timeit.repeat(op, number=1, repeat=repeat))
+    return result
+
+
+if __name__ == "__main__":
+    count = 10000
+    for (backend, op), seconds in sorted(benchmark(count).items()):
+        print("%-8s %-10s %8.2f ms for %i matrices" % (backend, op, seconds * 1000, count))
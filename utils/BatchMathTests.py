@@ -0,0 +1,160 @@
+"""
+Tests for BatchMath.  They don't import Maya, so they run with any python:
+
+    cd utils; python BatchMathTests.py
+
+Every test runs with the pure python backend, and with NumPy when it is
+available.  beings.tests also runs them inside Maya.
+"""
+import unittest, sys, random
+
+import BatchMath
+
+class TestBatchMath(unittest.TestCase):
+    def setUp(self):
+        self.bm = BatchMath
+        self.backends = [False] + (self.bm.HAVE_NUMPY and [True] or [])
+
+    def assertMatricesEqual(self, a, b, places=6):
+        self.assertEqual(len(a), len(b))
+        for x, y in zip(a, b):
+            for i in range(16):
+                self.assertAlmostEqual(x[i], y[i], places=places)
+
+    def assertVectorsEqual(self, a, b, places=6):
+        self.assertEqual(len(a), len(b))
+        for x, y in zip(a, b):
+            for i in range(len(y)):
+                self.assertAlmostEqual(x[i], y[i], places=places)
+
+    def test_composeDecompose(self):
+        for useNumpy in self.backends:
+            for order in range(6):
+                m = self.bm.compose([[1, 2, 3]], [[10, 20, 30]], [[1, 2, 3]],
+                                    rotateOrder=order, useNumpy=useNumpy)
+                t, r, s = self.bm.decompose(m, rotateOrder=order, useNumpy=useNumpy)
+                for got, expected in zip(list(t[0]) + list(r[0]) + list(s[0]),
+                                         [1, 2, 3, 10, 20, 30, 1, 2, 3]):
+                    self.assertAlmostEqual(got, expected, places=6)
+
+    def test_inverse(self):
+        for useNumpy in self.backends:
+            m = self.bm.compose([[1, 2, 3]], [[10, 20, 30]], [[1, 2, 3]], useNumpy=useNumpy)
+            result = self.bm.multiply(m, self.bm.inverse(m, useNumpy=useNumpy),
+                                      useNumpy=useNumpy)
+            self.assertMatricesEqual(result, self.bm.identity(useNumpy=False))
+
+    def test_mirror(self):
+        t, r, s = [[1, 2, 3]], [[10, 20, 30]], [[1, 2, 3]]
+        for useNumpy in self.backends:
+            for order in range(6):
+                m = self.bm.compose(t, r, s, rotateOrder=order, useNumpy=useNumpy)
+                for axis in range(3):
+                    mirroredT = [list(t[0])]
+                    mirroredT[0][axis] *= -1
+                    mirroredR = self.bm.mirrorEuler(r, axis=axis, useNumpy=useNumpy)
+                    expected = self.bm.compose(mirroredT, mirroredR, s, rotateOrder=order,
+                                               useNumpy=useNumpy)
+                    mirrored = self.bm.mirror(m, axis=axis, useNumpy=useNumpy)
+                    self.assertMatricesEqual(mirrored, expected)
+                    self.assertMatricesEqual(self.bm.mirror(mirrored, axis=axis, useNumpy=useNumpy), m)
+
+    def test_mirrorEuler(self):
+        for useNumpy in self.backends:
+            result = self.bm.mirrorEuler([[10, 20, 30], [-1, 2, -3]], axis=1, useNumpy=useNumpy)
+            self.assertVectorsEqual(result, [[-10, 20, -30], [1, 2, 3]])
+
+    def test_transformPoints(self):
+        for useNumpy in self.backends:
+            #a single matrix is used for every point
+            m = self.bm.compose([[1, 2, 3]], [[0, 0, 0]], [[2, 3, 4]], useNumpy=useNumpy)
+            result = self.bm.transformPoints([[1, 1, 1], [0, -1, 2]], m, useNumpy=useNumpy)
+            self.assertVectorsEqual(result, [[3, 5, 7], [1, -1, 11]])
+
+            #otherwise points and matrices are paired
+            m = self.bm.compose([[0, 0, 0], [1, 2, 3]], [[0, 0, 90], [90, 0, 0]], useNumpy=useNumpy)
+            result = self.bm.transformPoints([[1, 0, 0], [0, 1, 0]], m, useNumpy=useNumpy)
+            self.assertVectorsEqual(result, [[0, 1, 0], [1, 2, 4]])
+
+    def test_dot(self):
+        for useNumpy in self.backends:
+            result = self.bm.dot([[1, 2, 3], [0, 1, 0]], [[4, 5, 6], [2, 0, 0]], useNumpy=useNumpy)
+            self.assertEqual([float(v) for v in result], [32.0, 0.0])
+
+    def test_project(self):
+        for useNumpy in self.backends:
+            hVecs = [[1, 2, 3], [4, -5, 6]]
+            nVecs = [[0, 2, 0], [1, 1, 1]]
+            pVecs, oVecs = self.bm.project(hVecs, nVecs, useNumpy=useNumpy)
+            self.assertVectorsEqual(pVecs[:1], [[0, 2, 0]])
+            self.assertVectorsEqual(oVecs[:1], [[1, 0, 3]])
+            self.assertVectorsEqual([[p + o for p, o in zip(pVec, oVec)]
+                                     for pVec, oVec in zip(pVecs, oVecs)], hVecs)
+            for value in self.bm.dot(oVecs, nVecs, useNumpy=useNumpy):
+                self.assertAlmostEqual(value, 0)
+
+    def test_gimbalLock(self):
+        for useNumpy in self.backends:
+            for order in range(6):
+                middle = 'xyz'.index(self.bm.ROTATE_ORDERS[order][1])
+                last = 'xyz'.index(self.bm.ROTATE_ORDERS[order][2])
+                for angle in [90, -90]:
+                    rotation = [30, 40, 50]
+                    rotation[middle] = angle
+                    m = self.bm.eulerToMatrix([rotation], rotateOrder=order, useNumpy=useNumpy)
+                    result = self.bm.matrixToEuler(m, rotateOrder=order, useNumpy=useNumpy)
+                    #all of the rotation goes into the first axis
+                    self.assertAlmostEqual(result[0][middle], angle, places=4)
+                    self.assertAlmostEqual(result[0][last], 0)
+                    self.assertMatricesEqual(
+                        self.bm.eulerToMatrix(result, rotateOrder=order, useNumpy=useNumpy), m)
+
+    def test_negativeDeterminant(self):
+        for useNumpy in self.backends:
+            for order in range(6):
+                for scale in [[-2, 3, 4], [2, -3, 4], [1, 1, -1]]:
+                    m = self.bm.compose([[1, 2, 3]], [[10, 20, 30]], [scale],
+                                        rotateOrder=order, useNumpy=useNumpy)
+                    t, r, s = self.bm.decompose(m, rotateOrder=order, useNumpy=useNumpy)
+                    #the flip is put in the x scale
+                    self.assertTrue(s[0][0] < 0)
+                    self.assertTrue(s[0][1] > 0 and s[0][2] > 0)
+                    self.assertMatricesEqual(self.bm.compose(t, r, s, rotateOrder=order,
+                                                             useNumpy=useNumpy), m)
+
+    def test_backendsAgree(self):
+        if not self.bm.HAVE_NUMPY:
+            return
+        random.seed(0)
+        count = 20
+        translates = [[random.uniform(-10, 10) for i in range(3)] for j in range(count)]
+        rotates = [[random.uniform(-180, 180) for i in range(3)] for j in range(count)]
+        scales = [[random.uniform(-2, 2) or 1 for i in range(3)] for j in range(count)]
+        points = [[random.uniform(-10, 10) for i in range(3)] for j in range(count)]
+
+        def results(useNumpy):
+            bm = self.bm
+            m = bm.compose(translates, rotates, scales, rotateOrder=3, useNumpy=useNumpy)
+            t, r, s = bm.decompose(m, rotateOrder=5, useNumpy=useNumpy)
+            return [m,
+                    bm.multiply(m, m[:1], useNumpy=useNumpy),
+                    bm.inverse(m, useNumpy=useNumpy),
+                    bm.eulerToMatrix(rotates, rotateOrder=2, useNumpy=useNumpy),
+                    t, r, s,
+                    bm.mirror(m, axis=2, useNumpy=useNumpy),
+                    bm.mirrorEuler(rotates, axis=1, useNumpy=useNumpy),
+                    bm.transformPoints(points, m, useNumpy=useNumpy),
+                    bm.transformPoints(points, m[:1], useNumpy=useNumpy),
+                    [bm.dot(points, translates, useNumpy=useNumpy)],
+                    bm.project(points, translates, useNumpy=useNumpy)[1]]
+
+        for pure, fast in zip(results(False), results(True)):
+            self.assertVectorsEqual(fast, pure, places=5)
+
+
+def runTests(*args):
+    suite = unittest.TestLoader().loadTestsFromNames(args, module=sys.modules[__name__])
+    unittest.TextTestRunner(verbosity=2).run(suite)
+
+if __name__ == "__main__":
+    unittest.main()
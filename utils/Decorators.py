@@ -1,7 +1,9 @@
 '''
 Decorators and context managers
 '''
-import pymel.core as pm
+import maya.cmds as MC
+from PyUtils import LazyModule
+pm = LazyModule('pymel.core')
 import logging
 import NodeTracking as NT
 
@@ -93,3 +95,106 @@ class KeepShape(object):
             for node, shapeList in self._nDict.items():
                 for shape in shapeList:
                     pm.parent(shape, self._tmpGrp, s=1)
+
+
+class UndoState(object):
+    """
+    A context manager that controls how the undo queue records a block of
+    commands.  Modes are:
+        - 'chunk': record everything in a single undo chunk
+        - 'suspend': turn off undo recording without flushing the queue
+        - 'none': leave the undo queue alone
+
+    Nested UndoStates do nothing - only the outermost one changes the queue,
+    and the previous state is always restored on exit, even on errors.
+    """
+    MODES = ['chunk', 'suspend', 'none']
+    _depth = 0
+
+    def __init__(self, mode='chunk'):
+        if mode not in self.MODES:
+            raise RuntimeError("Invalid undo mode '%s'" % mode)
+        self._mode = mode
+        self._openedChunk = False
+        self._suspended = False
+
+    def __enter__(self):
+        UndoState._depth += 1
+        if UndoState._depth > 1 or self._mode == 'none':
+            return self
+
+        if MC.undoInfo(q=1, state=1):
+            if self._mode == 'chunk':
+                MC.undoInfo(openChunk=1)
+                self._openedChunk = True
+            else:
+                logger.debug("suspending undo queue")
+                MC.undoInfo(stateWithoutFlush=False)
+                self._suspended = True
+        return self
+
+    def __exit__(self, exctype, excval, exctb):
+        UndoState._depth -= 1
+        if self._openedChunk:
+            MC.undoInfo(closeChunk=1)
+            self._openedChunk = False
+        if self._suspended:
+            logger.debug("restoring undo queue")
+            MC.undoInfo(stateWithoutFlush=True)
+            self._suspended = False
+
+
+class DeferredEvaluation(object):
+    """
+    A context manager that suspends viewport refreshes for a block.  Code
+    inside the block should call syncEvaluation on the nodes it needs to be
+    up to date rather than forcing a full refresh.  A single refresh is done
+    when the outermost block exits.
+    """
+    _depth = 0
+
+    def __init__(self, enabled=True):
+        self._enabled = enabled
+        self._entered = False
+
+    @classmethod
+    def active(cls):
+        return cls._depth > 0
+
+    def __enter__(self):
+        if not self._enabled:
+            return self
+        self._entered = True
+        DeferredEvaluation._depth += 1
+        if DeferredEvaluation._depth == 1:
+            logger.debug("suspending refresh")
+            MC.refresh(suspend=True)
+        return self
+
+    def __exit__(self, exctype, excval, exctb):
+        if not self._entered:
+            return
+        self._entered = False
+        DeferredEvaluation._depth -= 1
+        if DeferredEvaluation._depth == 0:
+            logger.debug("resuming refresh")
+            MC.refresh(suspend=False)
+            MC.refresh()
+
+def syncEvaluation(nodes=None):
+    """
+    Make sure nodes are evaluated before they are read from or reparented.
+    Inside a DeferredEvaluation block only the given nodes are dirtied and
+    their world matrices pulled; outside of one, the scene is refreshed.
+    @param nodes=None: the nodes that must be up to date
+    @type nodes: list of str
+    """
+    if not DeferredEvaluation.active():
+        MC.refresh()
+        return
+    if not nodes:
+        return
+    nodes = [str(n) for n in nodes]
+    MC.dgdirty(nodes)
+    for node in MC.ls(nodes, type='dagNode'):
+        MC.xform(node, q=1, ws=1, m=1)
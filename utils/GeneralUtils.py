@@ -4,9 +4,12 @@ utilities, it should be defined here.
 '''
 
 #TODO:  rm unused function
-import logging, inspect, sys, re, string
-import pymel.core as pm
+import logging, inspect, sys, re, string, array
 import maya.cmds as MC
+import maya.OpenMaya as OM
+import BatchMath
+from PyUtils import LazyModule
+pm = LazyModule('pymel.core')
 from beings.utils.Exceptions import * #@UnusedWildImport
 _logger = logging.getLogger(__name__)
 _logger.setLevel(logging.DEBUG)
@@ -193,18 +196,37 @@ def createStretch(distNode1, distNode2, stretchJnt, namer, stretchAttr='sy'):
 def safeParent(self, **nodes):pass
 
 
-def blendJointChains(fkChain, ikChain, bindChain, fkIkAttr, namer):
+#ways blendJointChains can blend chains
+BLEND_METHODS = ['constraint', 'blendColors', 'pairBlend']
+
+def blendJointChains(fkChain, ikChain, bindChain, fkIkAttr, namer, method='constraint'):
     """
     Blend an ik and fk joint chain into a bind joint chain.
     @params fkChain, ikChain, bindChain: list of jnts
     @param fkIkAttr: an attr that is in fk when set to 0 and ik when at 1
-    @param directChannelBlend=True:  use blend color nodes instead of constraints
+    @param method='constraint': one of BLEND_METHODS.
+      - constraint: point, orient and scale constraints per joint
+      - blendColors: a pairBlend for rotate and a blendColors each for
+        translate and scale
+      - pairBlend: a pairBlend for translate and rotate and a blendColors for
+        scale
+      Both local methods interpolate rotate as quaternions in the pairBlend,
+      which avoids the unitConversion nodes a blendColors on rotate would
+      need.  Mid-blend poses can differ slightly from the orient constraint's
+      average.  They blend local channels, so the fk and ik chains must be
+      joints with the bind chain's translates and joint orients, as
+      dupJntList chains are.  The root joints are constrained as in the
+      constraint method.  Fk controls from control.setupFkCtls sit under
+      zero nodes; blend them through fkBlendChain.
 
     @return: the reverse node created
     """
-    fkIkAttr = pm.PyNode(fkIkAttr)
-    reverse = pm.createNode('reverse', n=namer.name(d='fkik_rev'))
-    fkIkAttr.connect(reverse.inputX)
+    if method not in BLEND_METHODS:
+        raise BeingsError("Invalid blend method '%s'" % method)
+
+    fkIkAttr = str(fkIkAttr)
+    reverse = MC.createNode('reverse', n=namer.name(d='fkik_rev'))
+    MC.connectAttr(fkIkAttr, '%s.inputX' % reverse)
 
     fkJntList = fkChain
     ikJntList = ikChain
@@ -224,20 +246,69 @@ def blendJointChains(fkChain, ikChain, bindChain, fkIkAttr, namer):
             ikJntList.append(ikChain[tok])
 
     for i in range(len(bindJntList)):
+        fk, ik, bind = str(fkJntList[i]), str(ikJntList[i]), str(bindJntList[i])
+
+        #chain roots are parented into the rig separately, so they don't
+        #share a parent space - constrain them
+        if method == 'constraint' or i == 0:
+            for cstType in ['point', 'orient', 'scale']:
+                fnc = getattr(MC, '%sConstraint' % cstType)
+                cst = fnc(fk, ik, bind)[0]
+                weights = fnc(cst, q=1, weightAliasList=1)
+                MC.connectAttr('%s.outputX' % reverse, '%s.%s' % (cst, weights[0]))
+                MC.connectAttr(fkIkAttr, '%s.%s' % (cst, weights[1]))
+            fixJointConstraints(bind)
+            continue
 
-        for cstType in ['point', 'orient', 'scale']:
-
-            fnc = getattr(pm, '%sConstraint' % cstType)
-            cst = fnc(fkJntList[i], ikJntList[i], bindJntList[i])
-            fkAttr = getattr(cst, '%sW0' % fkJntList[i])
-            ikAttr = getattr(cst, '%sW1' % ikJntList[i])
-            reverse.outputX.connect(fkAttr)
-            fkIkAttr.connect(ikAttr)
-
-            fixJointConstraints(bindJntList[i])
+        pb = MC.createNode('pairBlend', n='%s_fkik_pb' % bind)
+        MC.setAttr('%s.rotInterpolation' % pb, 1)
+        MC.setAttr('%s.rotateOrder' % pb, MC.getAttr('%s.rotateOrder' % bind))
+        MC.connectAttr(fkIkAttr, '%s.weight' % pb)
+        if method == 'blendColors':
+            pbChannels = [('r', 'Rotate')]
+            channels = ['t', 's']
+        else:
+            pbChannels = [('t', 'Translate'), ('r', 'Rotate')]
+            channels = ['s']
+        for attr, pbAttr in pbChannels:
+            MC.connectAttr('%s.%s' % (fk, attr), '%s.in%s1' % (pb, pbAttr))
+            MC.connectAttr('%s.%s' % (ik, attr), '%s.in%s2' % (pb, pbAttr))
+            MC.connectAttr('%s.out%s' % (pb, pbAttr), '%s.%s' % (bind, attr), f=1)
+
+        for attr in channels:
+            #blender at 1 gives color1, the ik value
+            blc = MC.createNode('blendColors', n='%s_fkik_%s_blc' % (bind, attr))
+            MC.connectAttr(fkIkAttr, '%s.blender' % blc)
+            MC.connectAttr('%s.%s' % (ik, attr), '%s.color1' % blc)
+            MC.connectAttr('%s.%s' % (fk, attr), '%s.color2' % blc)
+            MC.connectAttr('%s.output' % blc, '%s.%s' % (bind, attr), f=1)
 
     return reverse
 
+def fkBlendChain(fkCtls, bindJnts, descriptions, namer):
+    """
+    Duplicate bind joints as a hidden chain posed by fk controls, for the local
+    blendJointChains methods.  The controls from control.setupFkCtls have
+    identity matrices under zero nodes, so their translates don't hold the
+    bone offsets the bind joints need; the duplicates keep the bind joints'
+    translates and orients and take the controls' rotate and scale
+    @param fkCtls: controls made by control.setupFkCtls from bindJnts
+    @param bindJnts: the joints the controls were made from
+    @param descriptions: names for the new joints
+    @param namer: names the new joints, see dupJntList
+    @return: the new joints
+    """
+    if len(fkCtls) != len(bindJnts):
+        raise RuntimeError("fk control list length must equal joint list length")
+    jnts = dupJntList(bindJnts, descriptions, namer)
+    #follow the fk chain when it's parented into the rig
+    MC.parent(jnts[0], MC.listRelatives(fkCtls[0], parent=1)[0])
+    for ctl, jnt in zip(fkCtls, jnts):
+        for attr in ['r', 's']:
+            MC.connectAttr('%s.%s' % (ctl, attr), '%s.%s' % (jnt, attr))
+    MC.setAttr('%s.v' % jnts[0], 0)
+    return jnts
+
 def freeze(*args):
     """
     freeze every provided node.  Don't freeze joint orients
@@ -327,24 +398,128 @@ def filterShapes(*nodes):
     return [vertObjs, cvObjs, surfObjs]
 
 
-def moveShapePos(node, vector=[0, 0, 0]):
+_shapeFnTypes = {'nurbsCurve': OM.MFnNurbsCurve,
+                 'nurbsSurface': OM.MFnNurbsSurface,
+                 'mesh': OM.MFnMesh}
+
+def _getPointShapes(nodes):
     """
-    Move a shape.  Node can be a shape node or a transform above shape nodes
+    Get the curve, surface and mesh shapes of transforms or shape nodes
+    @return: list of (shapeName, nodeType) tuples, in the order given
     """
+    result = []
+    seen = set()
+    for node in nodes:
+        node = str(node)
+        if MC.objectType(node) in _shapeFnTypes:
+            shapes = [node]
+        else:
+            shapes = MC.listRelatives(node, shapes=True, pa=True) or []
+        for shape in shapes:
+            nodeType = MC.objectType(shape)
+            if nodeType in _shapeFnTypes and shape not in seen:
+                seen.add(shape)
+                result.append((shape, nodeType))
+    return result
 
-    vertObjs, cvObjs, surfObjs = filterShapes(node)
+def _getShapeFn(shape, nodeType):
+    sl = OM.MSelectionList()
+    sl.add(shape)
+    dagPath = OM.MDagPath()
+    sl.getDagPath(0, dagPath)
+    return _shapeFnTypes[nodeType](dagPath)
+
+def _flattenPoints(points):
+    """Flatten numpy arrays or lists of points to a flat sequence of floats"""
+    if BatchMath.HAVE_NUMPY and isinstance(points, BatchMath.np.ndarray):
+        return points.ravel().tolist()
+    if len(points) and not isinstance(points[0], (int, float)):
+        return [c for p in points for c in list(p)[:3]]
+    return points
+
+def getShapePoints(*nodes, **kwargs):
+    """
+    Get the CV or vertex positions of many shapes, using one API call per
+    shape.  Surface CVs are ordered like getShapePos (u, then v).
+    @param ws=False: get world space positions
+    @param asNumpy=False: return (n, 3) numpy arrays instead of flat arrays
+    @return: dictionary of {shapeName: array('d', [x0, y0, z0, x1, ...]),...}.
+    The arrays support the buffer protocol, so numpy.frombuffer can wrap them
+    without copying
+    """
+    ws = kwargs.get('ws', False)
+    asNumpy = kwargs.get('asNumpy', False)
+    if asNumpy and not BatchMath.HAVE_NUMPY:
+        raise RuntimeError("NumPy is not available")
+    space = ws and OM.MSpace.kWorld or OM.MSpace.kObject
 
-    for obj in vertObjs:
-        hi = len(obj.getPoints()) - 1
-        pm.xform(obj.name() + ".vtx[0:%s]" % str(hi), t=vector, r=True)
+    result = {}
+    for shape, nodeType in _getPointShapes(nodes):
+        fn = _getShapeFn(shape, nodeType)
+        points = OM.MPointArray()
+        if nodeType == 'mesh':
+            fn.getPoints(points, space)
+        else:
+            fn.getCVs(points, space)
+
+        flat = array.array('d')
+        for i in xrange(points.length()):
+            p = points[i]
+            flat.extend((p.x, p.y, p.z))
+        if asNumpy:
+            flat = BatchMath.np.frombuffer(flat, dtype=float).reshape(-1, 3)
+        result[shape] = flat
+    return result
 
-    for obj in surfObjs:
-        hi = len(obj.getCVs()) - 1
-        pm.xform(obj.name() + ".controlPoints[0:%s]" % str(hi), t=vector, r=True)
+def setShapePoints(shapePoints, ws=False):
+    """
+    Set the CV or vertex positions of many shapes, using one API call per
+    shape.  This is not undoable.
+    @param shapePoints: dictionary of {shape: points}, where points is a flat
+    sequence of floats, a list of points or an (n, 3) numpy array
+    @param ws=False: the points are in world space
+    """
+    space = ws and OM.MSpace.kWorld or OM.MSpace.kObject
+    for shape, points in shapePoints.items():
+        shape = str(shape)
+        nodeType = MC.objectType(shape)
+        if nodeType not in _shapeFnTypes:
+            raise RuntimeError("%s is not a curve, surface or mesh" % shape)
+        fn = _getShapeFn(shape, nodeType)
+
+        flat = _flattenPoints(points)
+        num = len(flat) // 3
+        pointArray = OM.MPointArray()
+        pointArray.setLength(num)
+        for i in xrange(num):
+            pointArray.set(i, flat[i * 3], flat[i * 3 + 1], flat[i * 3 + 2])
+
+        if nodeType == 'mesh':
+            fn.setPoints(pointArray, space)
+        else:
+            if nodeType == 'nurbsCurve':
+                numCVs = fn.numCVs()
+            else:
+                numCVs = fn.numCVsInU() * fn.numCVsInV()
+            if num != numCVs:
+                raise RuntimeError("%s has %i CVs, got %i points" % (shape, numCVs, num))
+            fn.setCVs(pointArray, space)
+            if nodeType == 'nurbsCurve':
+                fn.updateCurve()
+            else:
+                fn.updateSurface()
 
-    for obj in cvObjs:
-        hi = obj.numCVs() - 1
-        pm.xform(obj.name() + ".cv[0:%s]" % str(hi), t=vector, r=True)
+def moveShapePos(node, vector=[0, 0, 0]):
+    """
+    Move a shape.  Node can be a shape node or a transform above shape nodes
+    """
+    shapePoints = getShapePoints(node)
+    for points in shapePoints.values():
+        for i in xrange(0, len(points), 3):
+            points[i] += vector[0]
+            points[i + 1] += vector[1]
+            points[i + 2] += vector[2]
+    setShapePoints(shapePoints)
 
 
 def getShapePos(*nodes, **kwargs):
@@ -352,32 +527,9 @@ def getShapePos(*nodes, **kwargs):
     @return: dictionary of {shapePyNode: [pointPositionList],...}
     """
     ws = kwargs.get('ws', False)
-    if ws:
-        space = 'world'
-    else:
-        space = 'preTransform'
-
-    vertObjs, crvObjs, surfObjs = filterShapes(*nodes)
     result = {}
-
-    for obj in vertObjs:
-        assert isinstance(obj, pm.nodetypes.Mesh)
-        result[obj] = obj.getPoints(space=space)
-
-    for obj in crvObjs:
-        assert (isinstance(obj, pm.nodetypes.NurbsCurve))
-        result[obj] = []
-        for i in range(obj.numCVs()):
-            result[obj].append(pm.xform(obj.cv[i], q=True, ws=ws, t=True))
-        #this might have a bug?
-        #result[obj] = obj.getCVs(space='world')
-        #result[obj].append(.getPosition(space='world'))
-    for obj in surfObjs:
-        assert(isinstance(obj, pm.nodetypes.NurbsSurface))
-        result[obj] = []
-        for u in range(obj.numCVsInU()):
-            for v in range(obj.numCVsInV()):
-                result[obj].append(pm.xform(obj.cv[u][v], q=True, ws=ws, t=True))
+    for shape, points in getShapePoints(*nodes, ws=ws).items():
+        result[pm.PyNode(shape)] = [list(points[i:i + 3]) for i in xrange(0, len(points), 3)]
     return result
 
 def getShapePosList(*nodes, **kwargs):
@@ -385,26 +537,7 @@ def getShapePosList(*nodes, **kwargs):
     return d.values()
 
 def setShapePos(shapeDict, ws=False):
-    if ws:
-        space = 'world'
-    else:
-        space = 'preTransform'
-
-    for node, pointList in shapeDict.items():
-        if (isinstance(node, pm.nodetypes.NurbsCurve)):
-            #this also seems to have a bug
-            for i, point in enumerate(pointList):
-                pm.xform(node.cv[i], ws=ws, t=point)
-
-        elif isinstance(node, pm.nodetypes.NurbsSurface):
-            i = 0
-            for u in range(node.numCVsInU()):
-                for v in range(node.numCVsInV()):
-                    pm.xform(node.cv[u][v], ws=ws, t=pointList[i])
-                    i += 1
-
-        elif isinstance(node, pm.nodetypes.Mesh):
-            node.setPoints(pointList, space=space)
+    setShapePoints(shapeDict, ws=ws)
 
 def setShapePosList(shapePosList, nodeList):
     if len(shapePosList) != len(nodeList):
@@ -526,12 +659,14 @@ def mirrorCrv(shapeXf, shapeMirrorXf):
     for i in range(len(oShapes)):
         if oShapes[i].numCVs() != mShapes[i].numCVs():
             raise Exception("CV counts must mach for each shape node under the transforms")
+    points = getShapePoints(*oShapes, ws=True)
+    mirrored = {}
     for i in range(len(oShapes)):
-        nCVs = oShapes[i].numCVs()
-        p = []
-        for j in range(0, nCVs):
-            p = pm.xform(oShapes[i].cv[j], q=1, a=1, translation=1, ws=1)
-            pm.xform(mShapes[i].cv[j], a=1, translation=((0 - p[0]), p[1], p[2]), ws=1)
+        p = points[oShapes[i].name()]
+        for j in xrange(0, len(p), 3):
+            p[j] = 0 - p[j]
+        mirrored[mShapes[i].name()] = p
+    setShapePoints(mirrored, ws=True)
 
 def scaleCrv(ctl, amt):
     """Scale a control by resizing it's CVs.  This does not affect the
@@ -625,54 +760,95 @@ def unparentNodesFromTree(tree):
                 child.setParent(world=True)
 
 def snap(master, slave, point=True, orient=True, scale=True, ignoreOrient=False):
-    """snap the slave to the position and orientation of the master's rotate pivot
+    """snap the slave to the position and orientation of the master
     @param master: the driver
     @param slave: the node being moved
     @param point=True: snap position
     @param orient=True: snap rotations
     @param scale=True: match scale
-    @param ignoreOrient: if the master is a joint, add the inverse of its orientation to the
-      slave's rotations"""
-    master = str(master)
-    slave = str(slave)
-
-    tmp = MC.createNode('transform', n='SNAP_TMP')
-    MC.parent(tmp, master)
-    MC.makeIdentity(tmp, t=1, r=1, s=1)
-
-    slaveParent = MC.listRelatives(slave, parent=1)
-    if not slaveParent:
-        MC.parent(tmp, world=1)
-    else:
-        MC.parent(tmp, slaveParent[0])
+    @param ignoreOrient: not implemented"""
+    snapPairs([(master, slave)], point=point, orient=orient, scale=scale)
 
+def snapMany(master, slaveList, point=True, orient=True, scale=False):
+    """snap a list of slaves to a master"""
+    if not isinstance(slaveList, (list, tuple)):
+        raise BeingsError("snapMany accepts a list of objects")
+    snapPairs([(master, slave) for slave in slaveList],
+              point=point, orient=orient, scale=scale)
 
-    t = MC.getAttr('%s.t' % tmp)[0]
-    r = MC.getAttr('%s.r' % tmp)[0]
-    s = MC.getAttr('%s.s' % tmp)[0]
-    MC.delete(tmp)
+def _isSameOrBelow(longName, longParents):
+    for parent in longParents:
+        if longName == parent or longName.startswith(parent + '|'):
+            return True
+    return False
 
-    if point:
-        MC.setAttr('%s.t' % slave, *t, type='double3')
-    if orient:
-        MC.setAttr('%s.r' % slave, *r, type='double3')
-    if scale:
-        MC.setAttr('%s.s' % slave, *s, type='double3')
-
-    if ignoreOrient:
-        if isinstance(master, pm.nt.Joint):
-            raise NotImplementedError
-            # addlRot = master.jo.get()
-            # slave.rx.set(slave.rx.get() + -1*(addlRot[0]))
-            # slave.ry.set(slave.ry.get() + -1*(addlRot[1]))
-            # slave.rz.set(slave.rz.get() + -1*(addlRot[2]))
+def snapPairs(pairs, point=True, orient=True, scale=True):
+    """
+    Snap many slaves to their masters without creating any nodes.  The slave's
+    local transform is computed from the master's world matrix and the
+    inverse world matrix of the slave's parent, honoring the slave's rotate
+    order and joint orient.  Pivots, rotate axis and shear are ignored.
+    Pairs are snapped in order; a pair whose master or slave is below an
+    earlier slave is computed after that slave has moved
+    @param pairs: list of (master, slave) tuples
+    """
+    batch = []
+    batchSlaves = []
+    for master, slave in pairs:
+        master, slave = str(master), str(slave)
+        longMaster = MC.ls(master, l=1)[0]
+        longSlave = MC.ls(slave, l=1)[0]
+        if _isSameOrBelow(longMaster, batchSlaves) or \
+                _isSameOrBelow(longSlave.rsplit('|', 1)[0], batchSlaves):
+            _snapBatch(batch, point, orient, scale)
+            batch = []
+            batchSlaves = []
+        batch.append((master, slave))
+        batchSlaves.append(longSlave)
+    _snapBatch(batch, point, orient, scale)
+
+def _snapBatch(pairs, point, orient, scale):
+    """Snap pairs which don't depend on each other"""
+    if not pairs:
+        return
+    bm = BatchMath
 
-def snapMany(master, slaveList, point=True, orient=True, scale=False):
-    """snap a list of slvaes to a master's rotate pivot"""
-    if type(slaveList) != type([]) or type(slaveList) != type(()):
-        raise BeingsError("snapMany accepts a list of objects")
-    for slave in slaveList:
-        snap(master, slave, point=point, orient=orient, scale=scale)
+    masterWorlds = [MC.xform(m, q=1, ws=1, m=1) for m, s in pairs]
+    parentInverses = []
+    for m, slave in pairs:
+        parent = MC.listRelatives(slave, parent=1, pa=1)
+        if parent:
+            parentInverses.append(MC.getAttr('%s.worldInverseMatrix' % parent[0]))
+        else:
+            parentInverses.append(bm.identity(useNumpy=False)[0])
+    localMatrices = bm.multiply(masterWorlds, parentInverses)
+
+    #remove inverse scale and joint orient from joint slaves, leaving scale * rotate,
+    #and group the slaves by rotate order
+    zero = [[0, 0, 0]]
+    byRotateOrder = {}
+    for i, (m, slave) in enumerate(pairs):
+        local = localMatrices[i]
+        if MC.objectType(slave, isAType='joint'):
+            invScale = MC.getAttr('%s.inverseScale' % slave)[0]
+            jo = MC.getAttr('%s.jointOrient' % slave)[0]
+            post = bm.multiply(bm.compose(zero, zero, [invScale]),
+                               bm.inverse(bm.eulerToMatrix([jo])))
+            local = bm.multiply([local], post)[0]
+        ro = MC.getAttr('%s.rotateOrder' % slave)
+        byRotateOrder.setdefault(ro, []).append((i, local))
+
+    for ro, items in byRotateOrder.items():
+        r, s = bm.decompose([local for i, local in items], rotateOrder=ro)[1:]
+        for j, (i, local) in enumerate(items):
+            slave = pairs[i][1]
+            if point:
+                t = [float(v) for v in localMatrices[i][12:15]]
+                MC.setAttr('%s.t' % slave, *t, type='double3')
+            if orient:
+                MC.setAttr('%s.r' % slave, *[float(v) for v in r[j]], type='double3')
+            if scale:
+                MC.setAttr('%s.s' % slave, *[float(v) for v in s[j]], type='double3')
 
 
 #===============================================================================
@@ -720,30 +896,56 @@ def makeDuplicateJointTree(topJoint, toReplace=None, replaceWith=None, freeze=Tr
     return result
 
 
+def _plugAttrName(plug):
+    return OM.MFnAttribute(plug.attribute()).name()
+
 def fixInverseScale(jointList):
     """
     For all the joints in the list, ensure that their parent's scale is
-    connected to the child's inverseScale attribute
+    connected to the child's inverseScale attribute.  Connections are queried
+    through the API and only missing ones are made
+    @param jointList: joint names, or a single joint name
     """
+    if isinstance(jointList, basestring):
+        jointList = [jointList]
+
+    sl = OM.MSelectionList()
     for jnt in jointList:
-        if not pm.objExists(jnt):
+        try:
+            sl.add(str(jnt))
+        except RuntimeError:
             _logger.warning("%s does not exist!" % jnt)
+
+    toConnect = []
+    dagPath = OM.MDagPath()
+    plugs = OM.MPlugArray()
+    for i in range(sl.length()):
+        obj = OM.MObject()
+        sl.getDependNode(i, obj)
+        if not obj.hasFn(OM.MFn.kJoint):
+            continue
+        sl.getDagPath(i, dagPath)
+        fn = OM.MFnDagNode(dagPath)
+        parent = fn.parent(0)
+        if not parent.hasFn(OM.MFn.kJoint):
             continue
 
-        jnt = pm.PyNode(jnt)
-        if not isinstance(jnt, pm.nodetypes.Joint):
+        #scale comp joints should not be fixed
+        fn.findPlug('message').connectedTo(plugs, False, True)
+        if [j for j in range(plugs.length()) if _plugAttrName(plugs[j]) == 'scaleCompJnt']:
             continue
-        parent = jnt.getParent()
-        if isinstance(parent, pm.nodetypes.Joint):
 
-            #scale comp joints should not be fixed
-            if isScaleCompJnt(jnt):
-                continue
+        fn.findPlug('inverseScale').connectedTo(plugs, True, False)
+        if plugs.length() == 1 and plugs[0].node() == parent and \
+                _plugAttrName(plugs[0]) == 'scale':
+            continue
+        parentPath = OM.MDagPath()
+        OM.MFnDagNode(parent).getPath(parentPath)
+        toConnect.append((parentPath.partialPathName(), dagPath.partialPathName()))
 
-            #check if there's a connection
-            elif len(jnt.inverseScale.inputs()) != 1 or jnt.inverseScale.inputs(plugs=True)[0] != parent.scale:
-                parent.scale >> jnt.inverseScale
-                _logger.debug("connected %s's scale to %s's inverse scale" % (parent.name(), jnt.name()))
+    for parent, jnt in toConnect:
+        MC.connectAttr('%s.scale' % parent, '%s.inverseScale' % jnt, f=1)
+        _logger.debug("connected %s's scale to %s's inverse scale" % (parent, jnt))
 
 
 def getJointDict(jointList):
@@ -823,7 +1025,7 @@ def createJointsFromDict(jointDict, deleteExisting=False):
         pm.xform(noParentJnt, matrix=m, worldSpace=True)
 
     #fix any inverse scale issues
-    fixInverseScale([pm.nodetypes.Joint(jnt) for jnt in jointDict.keys()])
+    fixInverseScale(jointDict.keys())
     return result
 
 def dupJntList(jnts, descriptions, namer):
@@ -0,0 +1,487 @@
+'''
+Construction and sampling of nurbs curves and surfaces through the API.
+Names are resolved through the node handle registry in Api, and function
+sets are cached on the handles, so repeated queries create no DG nodes and
+don't rebuild selection lists:
+
+    crv = utils.Geometry.createCurve([[0, 0, 0], [0, 1, 0], [0, 2, 0]])
+    params = utils.Geometry.closestParams(crv, [[0, 1, 0], [0, 2, 0]])
+    points = utils.Geometry.pointsAtParams(crv, params)
+'''
+import logging
+import maya.OpenMaya as OM
+import maya.cmds as MC
+
+from Api import getHandle, NodeHandle
+
+_logger = logging.getLogger(__name__)
+
+#Maya's kMFnNurbsEpsilon
+_TOLERANCE = 1e-3
+
+def strToObj(node, asHandle=False):
+    """
+    Return an MObject from a string node
+    @param node: the node name
+    @type node: str
+    @param asHandle: Return an MObjectHandle
+    @type asHandle: True
+    @return: the api object
+    @rtype: MObject or MObjectHandle
+    """
+    obj = getHandle(node).object()
+    if asHandle:
+        return OM.MObjectHandle(obj)
+    return obj
+
+def strToDagPath(node):
+    """
+    Return an MDagPath instance form a string node
+    @param node: the node name
+    @type node: str
+    @return: MDagPath instace
+    @rtype: MDagPath
+    @raise RuntimeError: if the node is not a dag node
+    """
+    return getHandle(node).dagPath()
+
+def nodeToStr(node):
+    """Get a string node name from an api object
+    @param node: the node object
+    @type node: MObject, MObjectHandle, MDagPath or NodeHandle
+    @return: node name
+    @rtype: str
+    """
+    if isinstance(node, NodeHandle):
+        return node.name()
+
+    if isinstance(node, OM.MDagPath):
+        return node.partialPathName()
+
+    if isinstance(node, OM.MObjectHandle):
+        if not node.isValid():
+            raise RuntimeError("object no longer exists")
+        node = node.object()
+
+    if not isinstance(node, OM.MObject):
+        raise RuntimeError("Invalid arg - %r" % node)
+
+    if node.hasFn(OM.MFn.kDagNode):
+        pathArray = OM.MDagPathArray()
+
+        OM.MDagPath.getAllPathsTo(node, pathArray)
+        if pathArray.length() > 1:
+            _logger.warning("Multiple paths for node, returning first")
+
+        return pathArray[0].partialPathName()
+
+    return OM.MFnDependencyNode(node).name()
+
+def getShape(crv):
+    """If crv is a shape node, return it.  If it is
+    a transform with a single shape parent, return the shape.
+
+    @param crv: the shape or transform node
+    @raise RuntimeError: if node is not a shape and has multiple
+      or no shape children
+    """
+    crv = str(crv)
+    if MC.objectType(crv, isAType='geometryShape'):
+        return crv
+
+    result = None
+    shapes = MC.listRelatives(crv) or []
+    for shape in shapes:
+        #ni flag broken?
+        if MC.getAttr('%s.intermediateObject' % shape):
+            continue
+
+        if MC.objectType(shape, isAType='geometryShape'):
+            if result is not None:
+                raise RuntimeError("Multiple shapes under '%s'" % crv)
+            result = shape
+
+    if result is None:
+        raise RuntimeError("No shapes under '%s'" % crv)
+    return result
+
+def getFn(node):
+    """
+    Get a cached function set for a nurbs curve or surface
+    @param node: the shape, or a transform with a single shape
+    @return: function set attached to the shape's dag path
+    @rtype: MFnNurbsCurve or MFnNurbsSurface
+    @raise RuntimeError: if the shape is not a nurbs curve or surface
+    """
+    dagPath = getHandle(node).dagPath()
+    dagPath.extendToShape()
+
+    if dagPath.hasFn(OM.MFn.kNurbsCurve):
+        return getHandle(dagPath).fn(OM.MFnNurbsCurve)
+    elif dagPath.hasFn(OM.MFn.kNurbsSurface):
+        return getHandle(dagPath).fn(OM.MFnNurbsSurface)
+    raise RuntimeError("%s is not a nurbs curve or surface" % node)
+
+def _space(ws):
+    if ws:
+        return OM.MSpace.kWorld
+    return OM.MSpace.kObject
+
+def pointsAtParams(node, params, ws=True):
+    """
+    Get the positions at parameters along a curve or surface
+    @param node: the curve or surface
+    @param params: curve parameters, or (u, v) pairs for surfaces
+    @param ws=True: return world space positions
+    @return: list of [x, y, z] positions
+    """
+    fn = getFn(node)
+    space = _space(ws)
+    point = OM.MPoint()
+    result = []
+    if isinstance(fn, OM.MFnNurbsCurve):
+        for param in params:
+            fn.getPointAtParam(param, point, space)
+            result.append([point.x, point.y, point.z])
+    else:
+        for u, v in params:
+            fn.getPointAtParam(u, v, point, space)
+            result.append([point.x, point.y, point.z])
+    return result
+
+def _doublePtrs(count):
+    """Get MScriptUtils and double pointers.  Keep the utils alive while
+    the pointers are used"""
+    utils = [OM.MScriptUtil() for i in range(count)]
+    return utils, [su.asDoublePtr() for su in utils]
+
+def paramRange(node):
+    """
+    Get the parameter range of a curve or surface
+    @return: (min, max) for curves, ((minU, maxU), (minV, maxV)) for surfaces
+    """
+    fn = getFn(node)
+    if isinstance(fn, OM.MFnNurbsCurve):
+        utils, ptrs = _doublePtrs(2)
+    else:
+        utils, ptrs = _doublePtrs(4)
+    fn.getKnotDomain(*ptrs)
+    values = [OM.MScriptUtil.getDouble(ptr) for ptr in ptrs]
+    if len(values) == 2:
+        return tuple(values)
+    return ((values[0], values[1]), (values[2], values[3]))
+
+def pointsAtPercentages(node, percentages, ws=True):
+    """
+    Get the positions at percentages of the parameter range of a curve
+    or surface
+    @param percentages: values between 0 and 1, or (u, v) pairs for surfaces
+    @param ws=True: return world space positions
+    @return: list of [x, y, z] positions
+    """
+    clamp = lambda pct: min(max(pct, 0.0), 1.0)
+    rng = paramRange(node)
+    if isinstance(getFn(node), OM.MFnNurbsCurve):
+        params = [rng[0] + (rng[1] - rng[0]) * clamp(p) for p in percentages]
+    else:
+        (minU, maxU), (minV, maxV) = rng
+        params = [(minU + (maxU - minU) * clamp(u), minV + (maxV - minV) * clamp(v))
+                  for u, v in percentages]
+    return pointsAtParams(node, params, ws=ws)
+
+def closestParams(node, points, ws=True):
+    """
+    Get the parameters of the closest points on a curve or surface
+    @param node: the curve or surface
+    @param points: list of [x, y, z] positions
+    @param ws=True: the positions are in world space
+    @return: list of curve parameters, or (u, v) tuples for surfaces
+    """
+    fn = getFn(node)
+    space = _space(ws)
+    utils, (uPtr, vPtr) = _doublePtrs(2)
+    getDouble = OM.MScriptUtil.getDouble
+
+    result = []
+    if isinstance(fn, OM.MFnNurbsCurve):
+        for p in points:
+            fn.closestPoint(OM.MPoint(p[0], p[1], p[2]), uPtr, _TOLERANCE, space)
+            result.append(getDouble(uPtr))
+    else:
+        for p in points:
+            fn.closestPoint(OM.MPoint(p[0], p[1], p[2]), uPtr, vPtr, False, _TOLERANCE, space)
+            result.append((getDouble(uPtr), getDouble(vPtr)))
+    return result
+
+def clampedKnots(numCVs, degree):
+    """
+    Get a uniform knot sequence with clamped ends, like the curve command
+    makes when no knots are given
+    @raise RuntimeError: if there are too few CVs for the degree
+    """
+    spans = numCVs - degree
+    if spans < 1:
+        raise RuntimeError("A degree %i curve needs at least %i CVs" % (degree, degree + 1))
+    return [0.0] * (degree - 1) + [float(i) for i in range(spans + 1)] + [float(spans)] * (degree - 1)
+
+def _pointArray(positions):
+    points = OM.MPointArray()
+    points.setLength(len(positions))
+    for i, p in enumerate(positions):
+        points.set(i, p[0], p[1], p[2])
+    return points
+
+def _doubleArray(values):
+    result = OM.MDoubleArray()
+    for value in values:
+        result.append(value)
+    return result
+
+def _nameCreated(xformObj, name):
+    """Name a new transform and its shape like Maya does, return the transform"""
+    xformFn = OM.MFnDagNode(xformObj)
+    shapeFn = OM.MFnDagNode(xformFn.child(0))
+    xformFn.setName(name)
+    shapeFn.setName('%sShape' % xformFn.name())
+    return xformFn.partialPathName(), shapeFn.partialPathName()
+
+def createCurve(positions, name='crv', degree=2):
+    """
+    Create an open nurbs curve with CVs at world-space positions.  The
+    knots are the same as the curve command uses.
+    @param positions: list of [x, y, z] positions
+    @param name='crv': name of the curve transform
+    @param degree=2: curve degree
+    @return: the curve transform
+    """
+    fn = OM.MFnNurbsCurve()
+    xformObj = fn.create(_pointArray(positions),
+                         _doubleArray(clampedKnots(len(positions), degree)),
+                         degree, OM.MFnNurbsCurve.kOpen, False, False)
+    return _nameCreated(xformObj, name)[0]
+
+def createSurface(positions, name='srf', degreeU=2, degreeV=1):
+    """
+    Create an open nurbs surface with CVs at world-space positions
+    @param positions: rows of CV positions, positions[u][v]
+    @param name='srf': name of the surface transform
+    @param degreeU=2: degree along the rows
+    @param degreeV=1: degree within each row
+    @return: the surface transform
+    """
+    numU = len(positions)
+    numV = len(positions[0])
+    flat = [p for row in positions for p in row]
+    fn = OM.MFnNurbsSurface()
+    xformObj = fn.create(_pointArray(flat),
+                         _doubleArray(clampedKnots(numU, degreeU)),
+                         _doubleArray(clampedKnots(numV, degreeV)),
+                         degreeU, degreeV,
+                         OM.MFnNurbsSurface.kOpen, OM.MFnNurbsSurface.kOpen, False)
+    xform, shape = _nameCreated(xformObj, name)
+    #surfaces created through the api aren't shaded
+    MC.sets(shape, e=1, forceElement='initialShadingGroup')
+    return xform
+
+def closestPointOnNurbsObj(xformNode, nurbsObj, worldSpace=False):
+    """Get closest point to a nurbs surface or curve in the curve's
+    object space
+
+    @param xformNode: a transform node
+    @type xformNode: str
+    @param nurbsObj: the curve xform or shape node
+    @type nurbsObj: str
+    @param: return the point in worldspace
+    @return: closest world-space position on the nurbs object
+    @rtype: 3-float list, ie [3.4, 2.3, 4.4]
+    """
+
+    shape = getShape(nurbsObj)
+    shapeXform = MC.listRelatives(shape, parent=1)[0]
+    fn = getFn(shape)
+
+    crvParentMatrix = strToDagPath(shapeXform).inclusiveMatrix()
+
+    #get the position in objet space of the curve
+    nodePos = OM.MPoint(*MC.xform(xformNode, q=1, rp=1, ws=1))
+    if worldSpace:
+        nodePos *= crvParentMatrix.inverse()
+
+    pnt = fn.closestPoint(nodePos)
+
+    if worldSpace:
+        #back to world space
+        pnt *= crvParentMatrix
+
+    return [pnt.x, pnt.y, pnt.z]
+
+def rotatePivots(nodes):
+    """Get the world-space rotate pivots of nodes"""
+    return [MC.xform(node, q=1, rp=1, ws=1) for node in nodes]
+
+def closestParamOnCurve(node, crv):
+    """Get the closest parameter on the curve to the node"""
+    return closestParams(getShape(crv), rotatePivots([node]))[0]
+
+def pointAtParam(crv, param):
+    """
+    Get the world-space position of a point along a nurbs curv
+    """
+    return pointsAtParams(getShape(crv), [param])[0]
+
+def pointAtParamPercentage(crv, pct):
+    """
+    Get the world-space position of a point at a certain
+    percentage value along the curves parameterization
+    @param crv: the curve
+    @type crv: str
+    @param pct: the percentage value along the curve, between 0 and 1
+    @type pct: float
+    """
+    return pointsAtPercentages(getShape(crv), [pct])[0]
+
+def closestParamOnSurface(node, surf):
+    return closestParams(getShape(surf), rotatePivots([node]))[0]
+
+def _curvePositions(nodes, doubleEndPoints=False):
+    positions = rotatePivots(nodes)
+    if doubleEndPoints:
+        positions.append(positions[-1])
+    return positions
+
+def curveFromNodes(nodes, name='crv', doubleEndPoints=False):
+    """
+    Create a 2-degree nurbs curve with a CV at each node
+    @param doubleEndPoints: add a second CV at the last node
+    """
+    return createCurve(_curvePositions(nodes, doubleEndPoints=doubleEndPoints),
+                                      name=name, degree=2)
+
+def surfaceFromNodes(nodes, name='jntsSrf', upAxis=0, doubleEndPoints=False):
+    """
+    Create a 2-degree nurbs surface from the position of a list of
+    node (generally, the IK controls)
+    @param nodes: controls that will dictate the CV positions
+    @type nodes: list of strings
+    @param name: the name of the surface
+    @type name: str
+    @param upAxis: the direction of the width of the surface
+    @type upAxis: int representing x(0), y(1) or z(2)
+    """
+    positions = _curvePositions(nodes, doubleEndPoints=doubleEndPoints)
+
+    #u runs along the nodes, v across the width from +upAxis to -upAxis
+    rows = []
+    for p in positions:
+        outPos = list(p)
+        inPos = list(p)
+        outPos[upAxis] += 1
+        inPos[upAxis] -= 1
+        rows.append([outPos, inPos])
+
+    return createSurface(rows, name=name, degreeU=2, degreeV=1)
+
+def bindControlsToShape(ctls, shape, doubleEndPoints=False):
+    """
+    Cluster bind the controls to a curve.  Curve must have same num of points in u
+    as num ctls
+
+
+    """
+    _logger.debug('binding %s' % shape)
+    shape = getShape(shape)
+    if MC.objectType(shape, isAType='nurbsSurface'):
+        dv = MC.getAttr('%s.degreeV' % shape)
+        suff = '[0:%i]' % dv
+
+    elif MC.objectType(shape, isAType='nurbsCurve'):
+        suff = ""
+    else:
+        raise RuntimeError("Bad input shape %s" % shape)
+
+    for i, ctl in enumerate(ctls):
+
+        if doubleEndPoints:
+            if i == len(ctls)-1:
+                cmpts = '%s.cv[%i:%i]%s' % (shape, i, i+1, suff)
+            else:
+                cmpts = '%s.cv[%i]%s' % (shape, i, suff)
+
+        else:
+            cmpts = '%s.cv[%i]%s' % (shape, i, suff)
+
+        cls, handle = MC.cluster(cmpts)
+        handleShape  = MC.listRelatives(handle)[0]
+
+        MC.disconnectAttr('%s.worldMatrix[0]' % handle, '%s.matrix' % cls)
+        MC.disconnectAttr('%s.clusterTransforms[0]' % handleShape, '%s.clusterXforms' % cls)
+
+        MC.delete(handle)
+
+        MC.setAttr('%s.bindPreMatrix' % cls, MC.getAttr('%s.worldInverseMatrix[0]' % ctl), type='matrix')
+        MC.connectAttr('%s.worldMatrix[0]' % ctl, '%s.matrix' % cls)
+
+def bindNodesToSurface(nodes, surface, skipTipOrient=False):
+    """Bind a node to the closest point on a surface
+    @param node: the dag node to bind
+    @param surface: the surface to bind to
+    @param skipTipOrient: do not constrain orientation of the last node"""
+    surface = str(surface)
+
+    xforms = []
+    xformUps = []
+    cposes = []
+    nodes = [str(node) for node in nodes]
+    params = closestParams(surface, rotatePivots(nodes))
+    for i, node in enumerate(nodes):
+
+        u, v = params[i]
+        cpos = MC.createNode('pointOnSurfaceInfo', name='%s_surfacebind' % node)
+        cposUp = MC.createNode('pointOnSurfaceInfo', name='%s_surfacebind_up' % node)
+        cposes.append(cpos)
+        MC.setAttr("%s.u" % cpos, u)
+        MC.setAttr("%s.v" % cpos, v)
+
+        MC.setAttr("%s.u" % cposUp, u)
+        MC.setAttr("%s.v" % cposUp, v-.1)
+
+        MC.connectAttr("%s.worldSpace[0]" % surface, "%s.inputSurface" % cpos)
+        MC.connectAttr("%s.worldSpace[0]" % surface, "%s.inputSurface" % cposUp)
+        worldSpaceXform = MC.createNode('transform', n='%s_surfacebind_dnt' % node)
+        worldSpaceXformUp = MC.createNode('transform', n='%s_surfacebind_up_dnt' % node)
+        xforms.append(worldSpaceXform)
+        xformUps.append(worldSpaceXformUp)
+
+        MC.connectAttr("%s.p" % cpos, "%s.t" % worldSpaceXform)
+        MC.connectAttr("%s.p" % cposUp, "%s.t" % worldSpaceXformUp)
+
+
+
+    for i in range(len(nodes)):
+        if i == len(nodes)-1:
+            this = xforms[i]
+            if skipTipOrient:
+                MC.pointConstraint(this, nodes[i])
+                return
+
+
+            tgt = xformUps[i]
+            up = xformUps[i-1]
+            aimVec = [1,0,0]
+            upVec = [0,-1,0]
+        else:
+            this = xforms[i]
+            tgt = xforms[i+1]
+            up = xformUps[i]
+            aimVec = [0,1,0]
+            upVec = [1,0,0]
+
+
+        MC.aimConstraint(tgt, this,
+                         upVector=upVec,
+                         aimVector=aimVec,
+                         worldUpType='object',
+                         worldUpObject=up)
+
+        MC.parentConstraint(this, nodes[i])
+        #utils.fixJointConstraints(nodes[i])
@@ -3,10 +3,10 @@ Various functions, classes, etc supporing vector and matrix math used
 in rigging
 """
 import math, copy
-import pymel.core as pm
 import maya.OpenMaya as OM
 import PyUtils
-reload(PyUtils)
+import BatchMath
+pm = PyUtils.LazyModule('pymel.core')
 
 class _VecCheck(object):
     """
@@ -21,7 +21,6 @@ class _VecCheck(object):
                 if len(v) != forceLen:
                     raise Exception("Vector dimensions must be equal")
 
-            print vectors
             return f(*vectors)
 
         docMsg = '\n<Using Vector Check dectorator>'
@@ -118,6 +117,25 @@ def to4x4(l):
             [l[8], l[9], l[10], l[11]],
             [l[12], l[13], l[14], l[15]]]
 
+def mirrorMatrix(matrix, axis=0):
+    """
+    Mirror a flat 16-item matrix across the plane normal to an axis, so that
+    the result behaves like a mirrored control: translation along the axis and
+    rotations around the other two axes are negated.  See BatchMath.mirror to
+    mirror many matrices at once
+    @param axis=0: 0, 1 or 2 for x, y or z
+    @return: flat list
+    """
+    return [float(v) for v in BatchMath.mirror([matrix], axis=axis)[0]]
+
+def mirrorEuler(rotation, axis=0):
+    """
+    Mirror euler rotations across the plane normal to an axis.  Rotations
+    around the other two axes are negated, regardless of rotate order
+    @return: list
+    """
+    return [float(v) for v in BatchMath.mirrorEuler([rotation], axis=axis)[0]]
+
 def mMatrixToList(mMatrix):
     result = []
     m = mMatrix.matrix
@@ -1,9 +1,75 @@
 import logging, re, copy, os, sys, __builtin__, string
-import pymel.core as pm
+from PyUtils import LazyModule
+pm = LazyModule('pymel.core')
 
 _logger = logging.getLogger(__name__)
 _logger.setLevel(logging.DEBUG)
 
+def alphaSuffix(index):
+    """
+    Get an alphabetic suffix for an integer index.  Indices 0-25 are 'a'-'z';
+    after that each block adds a leading 'z': 'zaa'-'zyz' for the next 650,
+    'zzaaa'-'zzyzz' for the next 16900, and so on.  Suffixes sort in the same
+    order as their indices and only use lowercase letters, so they are valid
+    name tokens.
+    @param index: a non-negative integer
+    @rtype: str
+    """
+    if index < 0:
+        raise ValueError("Invalid index %r" % index)
+    if index < 26:
+        return string.ascii_lowercase[index]
+
+    index -= 26
+    block = 1
+    while index >= 25 * 26 ** block:
+        index -= 25 * 26 ** block
+        block += 1
+
+    letters = []
+    for i in range(block):
+        index, rem = divmod(index, 26)
+        letters.append(string.ascii_lowercase[rem])
+    letters.append(string.ascii_lowercase[index])
+    letters.reverse()
+    return 'z' * block + ''.join(letters)
+
+def alphaIndex(suffix):
+    """
+    Get the integer index of a suffix made by alphaSuffix
+    @raise ValueError: if the suffix could not have come from alphaSuffix
+    """
+    if not re.match('^[a-z]+$', suffix):
+        raise ValueError("Invalid suffix '%s'" % suffix)
+    if len(suffix) == 1:
+        return string.ascii_lowercase.index(suffix)
+
+    block = len(suffix) - len(suffix.lstrip('z'))
+    digits = suffix[block:]
+    if len(digits) != block + 1 or digits[0] == 'z':
+        raise ValueError("Invalid suffix '%s'" % suffix)
+
+    index = 26 + sum([25 * 26 ** b for b in range(1, block)])
+    value = 0
+    for letter in digits:
+        value = value * 26 + string.ascii_lowercase.index(letter)
+    return index + value
+
+def splitAlphaSuffix(description):
+    """
+    Split the alphaSuffix off the end of a description
+    @return: (description without the suffix, index), or (description, None)
+    if it doesn't end in a suffix
+    """
+    parts = description.rsplit('_', 1)
+    try:
+        index = alphaIndex(parts[-1])
+    except ValueError:
+        return description, None
+    if len(parts) == 1:
+        return '', index
+    return parts[0], index
+
 class Namer(object):
     """
     Store name information, and help name nodes.
@@ -48,15 +114,17 @@ class Namer(object):
             raise Exception("Invalid token '%s'" % token)
 
     @classmethod
-    def getTokensFromName(cls, name):
+    def getTokensFromName(cls, name, alphaSuf=False):
         """Get a dictionary of tokens from a string name.
         @param name: the name
         @type name: str
+        @param alphaSuf=False: split an alphaSuffix off the description, and
+        return its index as 'alphaSuf' (None if there is no suffix)
         @return: dictionary of {fullToken: name}
         """
         match = cls._patternRX.match(name)
         if not match:
-            raise RuntimeError("Invalid name '%s'" % match)
+            raise RuntimeError("Invalid name '%s'" % name)
         groups = match.groups()
 
         result = {}
@@ -64,6 +132,9 @@ class Namer(object):
             index = cls._patternRX.groupindex[tok] - 1
             result[tok] = groups[index] or ''
 
+        if alphaSuf:
+            result['description'], result['alphaSuf'] = \
+                splitAlphaSuffix(result['description'])
         return result
 
 
@@ -133,7 +204,8 @@ class Namer(object):
         """Get a string name
         @param force=False:  force overrides on locked tokens
         @type force: bool
-        @param alphaSuf=None: add an alphabetic suffix based on an integer index
+        @param alphaSuf=None: add an alphabetic suffix based on an integer index.
+        See alphaSuffix
         @type alphaSuf: int
         """
         alphaSuf = kwargs.pop('alphaSuf', None)
@@ -150,7 +222,7 @@ class Namer(object):
         if d:
             dparts.extend(d.split('_'))
         if alphaSuf is not None:
-            dparts.append(string.ascii_lowercase[alphaSuf])
+            dparts.append(alphaSuffix(alphaSuf))
 
         if dparts:
             kwargs[key] = '_'.join(dparts)
@@ -3,7 +3,9 @@ A class that will track node creation
 '''
 import logging
 import maya.OpenMaya as OM
-import pymel.core as PM
+from PyUtils import LazyModule
+from Api import getHandle
+PM = LazyModule('pymel.core')
 logger = logging.getLogger(__name__)
 
 def pathFromMObj(mObj):
@@ -79,6 +81,19 @@ class NodeTracker(object):
 
         return result
 
+    def getHandles(self):
+        """
+        Return NodeHandles for the tracked objects that still exist.  Unlike
+        names, the handles stay valid when the nodes are renamed
+        """
+        result = []
+        for objHandle in self._objects:
+            if objHandle.isValid():
+                handle = getHandle(objHandle.object())
+                if handle.name() != '__pymelUndoNode':
+                    result.append(handle)
+        return result
+
     def isTracking(self):
         """
         Return True/False
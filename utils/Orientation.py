@@ -3,12 +3,13 @@ Created on Jan 30, 2011
 
 @author: john
 '''
-import logging, copy, math, cPickle
+import logging, copy, cPickle
 
 import maya.OpenMaya as OM
-import pymel.core as pm
+import maya.cmds as MC
 
-import PyUtils, MathUtils
+import PyUtils, BatchMath
+pm = PyUtils.LazyModule('pymel.core')
 logger = logging.getLogger(__name__)
 
 ATTTR_MAP = {'translateX': ['translateX', 'tx'],
@@ -115,6 +116,8 @@ class Orientation(object):
         self._orientWeakAxis = "posZ"
         self._rotOrder = 'xyz'
         self._aimFlipped = False
+        #{origOrient axes: conversion data}.  Cleared when axes are set
+        self._conversionCache = {}
 
     @classmethod
     def defaultOrientation(cls):
@@ -128,6 +131,12 @@ class Orientation(object):
     def data(self):
         return cPickle.dumps(self)
 
+    def __getstate__(self):
+        #cached conversions may be numpy arrays, and are rebuilt when needed
+        state = self.__dict__.copy()
+        state['_conversionCache'] = {}
+        return state
+
     def isAimFlipped(self):
         """
         Has the orientation's aim axis been temporarily flipped from positive to negative? (or visa versa)
@@ -320,6 +329,7 @@ class Orientation(object):
                     self._setOrientAxis(axis.lower(), k)
 
         self._correctWeak()
+        self._conversionCache = {}
         return self
 
     def defaultRotOrder(self):
@@ -358,87 +368,112 @@ class Orientation(object):
             return self._rotOrderDict[newOrient]
 
 
-    def newOrientSpaceVector(self, vector, origOrient=None):
-        """
-        Given an original vector, return the vector for an object in current Orientation space.
-        If our axes are at their defaults, this will be the same as the arg.
+    def _cacheKey(self, origOrient):
+        if origOrient is None:
+            return None
+        assert isinstance(origOrient, Orientation)
+        return tuple([origOrient.getAxis(a, asString=True) for a in ['aim', 'up', 'weak']])
 
-        @param vector: a 3-element list, ie [1, 5, 3.2]
-        @param origOrient=None: The original orientation the vector was in.  Uses default orientation by default
+    def _getConversion(self, origOrient):
+        """
+        Get the cached data used to convert from origOrient to this
+        orientation: a dict with the 'matrix' that converts rotations and the
+        'vectorMap' of (newIndex, origIndex, multiplier) that converts vectors
         """
+        cache = self.__dict__.setdefault('_conversionCache', {})
+        key = self._cacheKey(origOrient)
+        if key in cache:
+            return cache[key]
+
         if not origOrient:
             origOrient = self.defaultOrientation()
-        assert isinstance(origOrient, Orientation)
 
-        result = [None, None, None]
-        axes = ['up', 'aim', 'weak']
-        for axis in axes:
-            #get the position of the axis in the original list
+        startMatrix = [origOrient.getAxis('up') + [0],
+                       origOrient.getAxis('aim') + [0],
+                       origOrient.getAxis('weak') + [0],
+                       [0, 0, 0, 1]]
+        endMatrix = [self.getAxis('up') + [0],
+                     self.getAxis('aim') + [0],
+                     self.getAxis('weak') + [0],
+                     [0, 0, 0, 1]]
+        startInverse = BatchMath.inverse([sum(startMatrix, [])])
+        matrix = BatchMath.multiply([sum(endMatrix, [])], startInverse)
+
+        vectorMap = []
+        for axis in ['up', 'aim', 'weak']:
             origAxisVec = origOrient.getAxis(axis)
-            origListPos = None
-            origMult = 1
-            for i, n in enumerate(origAxisVec):
-                if n:
-                    origListPos = i
-                    if n < 0:
-                        #was the axis negative?
-                        origMult = -1
-                    break
-
-            #get the position in the new list
             newAxisVec = self.getAxis(axis)
-            newListPos = None
-            newMult = 1
-            for i, n in enumerate(newAxisVec):
-                if n:
-                    newListPos = i
-                    if n < 0:
-                        #is the new axis negative?
-                        newMult = -1
-                    break
-            result[newListPos] = vector[origListPos] * origMult * newMult
-
-        #if this is the right side, all values should be inverted to get mirrored vectors
-#        if useSide and self._side == 'rt':
-#            result = [result[0] * -1, result[1] * -1, result[2] * -1]
+            origListPos = indexFromVector(origAxisVec)
+            newListPos = indexFromVector(newAxisVec)
+            mult = (origAxisVec[origListPos] < 0 and -1 or 1) * \
+                   (newAxisVec[newListPos] < 0 and -1 or 1)
+            vectorMap.append((newListPos, origListPos, mult))
+
+        cache[key] = {'matrix': matrix, 'vectorMap': vectorMap}
+        return cache[key]
 
+    def newOrientSpaceVectors(self, vectors, origOrient=None):
+        """
+        Given original vectors, return the vectors for objects in current Orientation space.
+        If our axes are at their defaults, these will be the same as the arg.
+
+        @param vectors: a list of 3-element lists, ie [[1, 5, 3.2], [0, 1, 0]]
+        @param origOrient=None: The original orientation the vectors were in.  Uses default orientation by default
+        @return: list of 3-element lists
+        """
+        vectorMap = self._getConversion(origOrient)['vectorMap']
+        result = []
+        for vector in vectors:
+            new = [None, None, None]
+            for newListPos, origListPos, mult in vectorMap:
+                new[newListPos] = vector[origListPos] * mult
+            result.append(new)
         return result
 
-    def newAngle(self, origAngles, origOrient=None, origRotOrder=0, useNewRotOrder=False):
+    def newOrientSpaceVector(self, vector, origOrient=None):
         """
-        Given an original set of Euler angles, return the angles for the current Orientation and rotation order
+        Given an original vector, return the vector for an object in current Orientation space.
         If our axes are at their defaults, this will be the same as the arg.
 
-        @param origAngles: a 3-element list, ie [90, 25, 40.2]
+        @param vector: a 3-element list, ie [1, 5, 3.2]
         @param origOrient=None: The original orientation the vector was in.  Uses default orientation by default
         """
-        # just get the new vector and adjust for rotation order
-        if not origOrient:
-            origOrient = self.defaultOrientation()
-
-        startMatrix = MathUtils.Matrix4x4([origOrient.getAxis('up') + [0],
-                                    origOrient.getAxis('aim') + [0],
-                                    origOrient.getAxis('weak') + [0],
-                                    [0, 0, 0, 1]])
-
-        endMatrix = MathUtils.Matrix4x4([self.getAxis('up') + [0],
-                                  self.getAxis('aim') + [0],
-                                  self.getAxis('weak') + [0],
-                                  [0, 0, 0, 1]])
+        return self.newOrientSpaceVectors([vector], origOrient=origOrient)[0]
 
-        multMatrix = endMatrix * startMatrix.inverse()
+    def newAngles(self, anglesArray, origOrient=None, origRotOrder=0, useNewRotOrder=False):
+        """
+        Given many sets of original Euler angles, return the angles for the current
+        Orientation and rotation order.  The conversion is cached per origOrient, so
+        this is a single vectorized call for a whole chain.
+
+        @param anglesArray: a list of 3-element lists, ie [[90, 25, 40.2], [0, 0, 10]]
+        @param origOrient=None: The original orientation the angles were in.  Uses default orientation by default
+        @param origRotOrder=0: the rotation order of the original angles
+        @param useNewRotOrder=False: return angles in this orientation's rotation order
+        rather than xyz
+        @return: list of 3-element lists
+        """
+        if not len(anglesArray):
+            return []
+        matrix = self._getConversion(origOrient)['matrix']
+        rotations = BatchMath.eulerToMatrix(anglesArray, rotateOrder=origRotOrder)
+        rotations = BatchMath.multiply(matrix, rotations)
+        rotOrder = 0
+        if useNewRotOrder:
+            rotOrder = self.rotOrder()
+        result = BatchMath.matrixToEuler(rotations, rotateOrder=rotOrder)
+        return [[float(a) for a in angles] for angles in result]
 
-        er = OM.MEulerRotation(math.radians(origAngles[0]),
-                               math.radians(origAngles[1]),
-                               math.radians(origAngles[2]),
-                               origRotOrder)
+    def newAngle(self, origAngles, origOrient=None, origRotOrder=0, useNewRotOrder=False):
+        """
+        Given an original set of Euler angles, return the angles for the current Orientation and rotation order
+        If our axes are at their defaults, this will be the same as the arg.
 
-        finalM = multMatrix.mmatrix() * er.asMatrix()
-        newEr = OM.MTransformationMatrix(finalM).eulerRotation()
-        if useNewRotOrder:
-            newEr = newEr.reorder(self.rotOrder())
-        newAngles = [math.degrees(newEr.x), math.degrees(newEr.y), math.degrees(newEr.z)]
-        return newAngles
+        @param origAngles: a 3-element list, ie [90, 25, 40.2]
+        @param origOrient=None: The original orientation the vector was in.  Uses default orientation by default
+        """
+        return self.newAngles([origAngles], origOrient=origOrient, origRotOrder=origRotOrder,
+                              useNewRotOrder=useNewRotOrder)[0]
 
 
     def rotateToSpace(self, obj, origOrient=None):
@@ -454,7 +489,98 @@ class Orientation(object):
 
     def reorientJoints(self, joints, origOrient=None):
         '''
-        Change the relative orientation joints
+        Change the relative orientation joints.  Children keep their world
+        transforms: their local transforms are compensated mathematically, so
+        the hierarchy is never changed.  Joints are assumed to have no
+        rotateAxis or shear.
+        '''
+        joints = [str(j) for j in joints]
+        bm = BatchMath
+
+        world = {}
+        def getWorld(node):
+            if node not in world:
+                world[node] = MC.xform(node, q=1, ws=1, m=1)
+            return world[node]
+
+        def getParent(node):
+            parent = MC.listRelatives(node, parent=1, pa=1)
+            return parent and parent[0] or None
+
+        def scaleMatrix(s):
+            return [s[0], 0, 0, 0, 0, s[1], 0, 0, 0, 0, s[2], 0, 0, 0, 0, 1]
+
+        #{node: current local channels}.  Everything is applied at the end
+        pending = {}
+        def getState(node):
+            if node not in pending:
+                state = {'joint': MC.objectType(node, isAType='joint'),
+                         't': list(MC.getAttr('%s.t' % node)[0]),
+                         'r': list(MC.getAttr('%s.r' % node)[0]),
+                         's': list(MC.getAttr('%s.s' % node)[0]),
+                         'ro': MC.getAttr('%s.rotateOrder' % node)}
+                if state['joint']:
+                    state['jo'] = list(MC.getAttr('%s.jointOrient' % node)[0])
+                    state['is'] = list(MC.getAttr('%s.inverseScale' % node)[0])
+                pending[node] = state
+            return pending[node]
+
+        def compensate(node, parentWorld):
+            """set node's local channels so its world matrix doesn't change"""
+            state = getState(node)
+            local = bm.multiply([getWorld(node)], bm.inverse([parentWorld]))[0]
+            state['t'] = [float(v) for v in local[12:15]]
+            if state['joint']:
+                #remove scale and inverse scale, then the rotation, leaving the orient
+                invS = [1.0 / v for v in state['s']]
+                m = bm.multiply(bm.multiply([scaleMatrix(invS)], [local]), [scaleMatrix(state['is'])])
+                m = bm.multiply(bm.inverse(bm.eulerToMatrix([state['r']], state['ro'])), m)
+                state['jo'] = [float(v) for v in bm.matrixToEuler(m)[0]]
+            else:
+                t, r, s = bm.decompose([local], rotateOrder=state['ro'])
+                state['r'] = [float(v) for v in r[0]]
+                state['s'] = [float(v) for v in s[0]]
+
+        #a reoriented joint keeps its position, and its rotation is
+        #pre-multiplied by scale * rotate * conversion * inverse rotate * inverse
+        #scale, so every joint's new world can be found without walking the chain
+        conversion = self._getConversion(origOrient)['matrix']
+        newWorld = {}
+        for j in joints:
+            state = getState(j)
+            r = bm.eulerToMatrix([state['r']], state['ro'])
+            m = bm.multiply(bm.multiply([scaleMatrix(state['s'])], r), conversion)
+            m = bm.multiply(bm.multiply(m, bm.inverse(r)), [scaleMatrix([1.0 / v for v in state['s']])])
+            newWorld[j] = bm.multiply(m, [getWorld(j)])[0]
+
+        #compensate joints under reoriented parents, then convert all the
+        #orients at once
+        for j in joints:
+            parent = getParent(j)
+            if parent in newWorld:
+                compensate(j, newWorld[parent])
+        states = [getState(j) for j in joints]
+        newOrients = self.newAngles([state['jo'] for state in states], origOrient=origOrient)
+        for state, jo in zip(states, newOrients):
+            state['jo'] = jo
+
+        for j in joints:
+            for child in MC.listRelatives(j, children=1, type='transform', pa=1) or []:
+                if child not in newWorld:
+                    compensate(child, newWorld[j])
+
+        for node, state in pending.items():
+            MC.setAttr('%s.t' % node, *state['t'], type='double3')
+            if state['joint']:
+                MC.setAttr('%s.jointOrient' % node, *state['jo'], type='double3')
+            else:
+                MC.setAttr('%s.r' % node, *state['r'], type='double3')
+                MC.setAttr('%s.s' % node, *state['s'], type='double3')
+
+    def _reorientJointsByReparenting(self, joints, origOrient=None):
+        '''
+        The original reorientJoints, which unparents and reparents children.
+        Kept to verify reorientJoints against
         '''
         for j in joints:
             j = pm.PyNode(j)
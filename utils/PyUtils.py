@@ -3,6 +3,31 @@ Python Utilities
 '''
 import sys, inspect, json
 
+class LazyModule(object):
+    '''
+    Stand in for a module that is only imported the first time one of its
+    attributes is used, so heavy modules like pymel aren't loaded just by
+    importing beings:
+
+        pm = LazyModule('pymel.core')
+    '''
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+
+    def _load(self):
+        if self._name not in sys.modules:
+            __import__(self._name)
+        return sys.modules[self._name]
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        return '<LazyModule %r>' % self._name
+
 def isIterable(obj, strings=False):
     '''
     Is the object iterable?
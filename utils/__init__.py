@@ -1,33 +1,15 @@
 import GeneralUtils
-reload(GeneralUtils)
-
 import Exceptions
-reload(Exceptions)
-
 import Types
-reload(Types)
-
+import BatchMath
 import MathUtils
-reload(MathUtils)
-
 import PyUtils
-reload(PyUtils)
-
 import Api
-reload(Api)
-
 import Decorators
-reload(Decorators)
-
 import NodeTracking
-reload(NodeTracking)
-
-
 import Orientation
-reload(Orientation)
-
+import Geometry
 import Naming
-reload(Naming)
 
 from GeneralUtils import *
 from Exceptions import *
@@ -1,7 +1,7 @@
 import beings.core as core
 import beings.control as control
 import beings.utils as utils
-import pymel.core as pm
+pm = utils.LazyModule('pymel.core')
 import maya.cmds as MC
 
 import logging
@@ -17,6 +17,7 @@ class Arm(core.Widget):
         self.addPlug('bnd_uparm')
         self.addPlug('bnd_loarm')
         self.addPlug('bnd_hand')
+        self.options.addOpt('blendMethod', 'constraint', presets=utils.BLEND_METHODS)
 
         self.__toks = ['uparm', 'loarm', 'hand', 'hand_tip']
 
@@ -183,34 +184,11 @@ class Arm(core.Widget):
         return namer
 
 
-    def _preMirror(self, thisCtl, otherCtl, thisNamer, otherNamer):
-        """do ik control mirroring"""
-        direct = ['tx', 'ty', 'sx', 'sy', 'sz', 'rz']
-        inverted = ['tz', 'ry', 'rx']
-
+    def _mirrorChannels(self, thisCtl, thisNamer):
+        """ik control editors mirror across z"""
         if thisCtl == thisNamer('ctl_editor', r='ik'):
-
-            for attr in direct:
-
-                MC.connectAttr('%s.%s' % (thisCtl, attr),
-                               '%s.%s' % (otherCtl, attr))
-
-            for attr in inverted:
-                fromAttr = '%s.%s' % (thisCtl, attr)
-                toAttr = '%s.%s' % (otherCtl, attr)
-                mdn = MC.createNode('multiplyDivide',
-                                    n=thisNamer.name(d='%s%sTo%s%s' % (thisCtl,attr,otherCtl,attr)))
-
-                MC.setAttr('%s.input2X' % mdn, -1)
-                MC.setAttr('%s.operation' % mdn, 1)
-
-                MC.connectAttr(fromAttr, '%s.input1X' % mdn)
-                MC.connectAttr('%s.outputX' % mdn, toAttr)
-
-            return True
-
-
-        return False
+            return (['tx', 'ty', 'sx', 'sy', 'sz', 'rz'], ['tz', 'ry', 'rx'])
+        return super(Arm, self)._mirrorChannels(thisCtl, thisNamer)
 
     def _makeRig(self, namer):
 
@@ -287,8 +265,14 @@ class Arm(core.Widget):
         self.setNodeCateogry(par, 'ik')
 
         MC.addAttr(ikCtl, ln='fkIk', min=0, max=1, dv=1, k=1)
-        fkIkRev = utils.blendJointChains(fkCtls, ikJnts[:-1], bndJnts[:-1],
-                                         '%s.fkIk' % ikCtl, namer)
+        fkJnts = fkCtls
+        if self.options.getValue('blendMethod') != 'constraint':
+            namer.setTokens(r='fkblend')
+            fkJnts = utils.fkBlendChain(fkCtls, bndJnts[:-1], self.__toks[:-1], namer)
+            namer.setTokens(r='ik')
+        fkIkRev = utils.blendJointChains(fkJnts, ikJnts[:-1], bndJnts[:-1],
+                                         '%s.fkIk' % ikCtl, namer,
+                                         method=self.options.getValue('blendMethod'))
         control.setLockTag(ikCtl, uk=['t', 'r', 'fkIk'])
 
         for ctl in fkCtls:
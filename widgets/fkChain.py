@@ -7,7 +7,6 @@ reload(FKC)
 fkc = FKC.FkChain()
 fkc.buildLayout()
 """
-from string import ascii_lowercase
 import maya.cmds as MC
 import beings.core as core
 import logging
@@ -25,7 +24,7 @@ class FkChain(core.Widget):
         self.__setPlugs(1)
 
     def __setPlugs(self, newNumBones):
-        newPlugs = set(['fk_%s' % ascii_lowercase[i] for i in range(newNumBones)])
+        newPlugs = set(['fk_%s' % utils.alphaSuffix(i) for i in range(newNumBones)])
         currentPlugs = set(self.plugs())
         toRemove = currentPlugs.difference(newPlugs)
         toAdd = newPlugs.difference(currentPlugs)
@@ -131,7 +130,7 @@ class FkChain(core.Widget):
 
     def _makeRig(self, namer):
         jntCnt =  self.options.getValue('numBones') + 1
-        toks = ascii_lowercase[:jntCnt]
+        toks = [utils.alphaSuffix(i) for i in range(jntCnt)]
         bndJnts = [namer(r='bnd', alphaSuf=i) for i in range(jntCnt)]
         for jnt in bndJnts:
             MC.makeIdentity(jnt, apply=True, r=1, s=1, t=1)
@@ -152,6 +151,6 @@ class FkChain(core.Widget):
 
         MC.delete(bndJnts[0])
         for i, ctl in enumerate(fkCtls):
-            self.setPlugNode('fk_%s' % ascii_lowercase[i], ctl)
+            self.setPlugNode('fk_%s' % utils.alphaSuffix(i), ctl)
 
 core.WidgetRegistry().register(FkChain, "Fk Chain", "An Fk joint chain")
@@ -1,7 +1,7 @@
 import beings.core as core
 import beings.control as control
 import beings.utils as utils
-import pymel.core as pm
+pm = utils.LazyModule('pymel.core')
 import maya.cmds as MC
 
 import logging
@@ -16,6 +16,7 @@ class Leg(core.Widget):
         self.addPlug('bnd_hip')
         self.addPlug('bnd_knee')
         self.addPlug('bnd_ankle')
+        self.options.addOpt('blendMethod', 'constraint', presets=utils.BLEND_METHODS)
 
         self.__toks = ['hip', 'knee', 'ankle', 'ball', 'toe', 'toetip']
 
@@ -253,8 +254,14 @@ class Leg(core.Widget):
 
         MC.addAttr(ikCtl, ln='fkIk', min=0, max=1, dv=1, k=1)
 
-        fkIkRev = utils.blendJointChains(fkCtls, ikJnts[:-1], bndJnts[:-1],
-                                         '%s.fkIk' % ikCtl, namer)
+        fkJnts = fkCtls
+        if self.options.getValue('blendMethod') != 'constraint':
+            namer.setTokens(r='fkblend')
+            fkJnts = utils.fkBlendChain(fkCtls, bndJnts[:-1], self.__toks[:-1], namer)
+            namer.setTokens(r='ik')
+        fkIkRev = utils.blendJointChains(fkJnts, ikJnts[:-1], bndJnts[:-1],
+                                         '%s.fkIk' % ikCtl, namer,
+                                         method=self.options.getValue('blendMethod'))
 
         for ctl in fkCtls:
             MC.connectAttr('%s.outputX' % fkIkRev, '%s.v' % ctl)
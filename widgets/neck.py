@@ -7,7 +7,6 @@ reload(FKC)
 fkc = FKC.Neck()
 fkc.buildLayout()
 """
-from string import ascii_lowercase
 import maya.cmds as MC
 import maya.mel as MM
 import maya.OpenMaya as OM
@@ -53,7 +52,7 @@ class HeadNeck(core.Widget):
     def __getToks(self):
         toks = []
         for i in range(self.options.getValue('numNeckBones')):
-            toks.append('neck_%s' % ascii_lowercase[i])
+            toks.append('neck_%s' % utils.alphaSuffix(i))
         toks.extend(['head', 'head_tip'])
         return toks
 
@@ -7,7 +7,6 @@ reload(FKC)
 fkc = FKC.Neck()
 fkc.buildLayout()
 """
-from string import ascii_lowercase
 import maya.cmds as MC
 import maya.mel as MM
 import maya.OpenMaya as OM
@@ -16,297 +15,14 @@ import beings.core as core
 import logging
 from beings import control
 from beings import utils
+from beings.utils.Geometry import strToObj, strToDagPath, nodeToStr, getShape, \
+     closestPointOnNurbsObj, closestParamOnCurve, pointAtParam, pointAtParamPercentage, \
+     closestParamOnSurface, curveFromNodes, surfaceFromNodes, bindControlsToShape, \
+     bindNodesToSurface
 
 _logger = logging.getLogger(__name__)
 _logger.setLevel(logging.DEBUG)
 
-def strToObj(node, asHandle=False):
-    """
-    Return an MObject from a string node
-    @param node: the node name
-    @type node: str
-    @param asHandle: Return an MObjectHandle
-    @type asHandle: True
-    @return: the api object
-    @rtype: MObject or MObjectHandle
-    """
-    sl = OM.MSelectionList()
-    sl.add(node)
-    obj = OM.MObject()
-    sl.getDependNode(0, obj)
-    if asHandle:
-        obj = OM.MObjectHandle(obj)
-
-    return obj
-
-
-def strToDagPath(node):
-    """
-    Return an MDagPath instance form a string node
-    @param node: the node name
-    @type node: str
-    @return: MDagPath instace
-    @rtype: MDagPath
-    """
-    sl = OM.MSelectionList()
-    sl.add(node)
-    dp = OM.MDagPath()
-    sl.getDagPath(0, dp)
-    return dp
-
-
-def nodeToStr(node):
-    """Get a string node name from an api object
-    @param node: the node object
-    @type node: MObject, MObjectHandle, or MDagPath
-    @return: node name
-    @rtype: str
-    """
-    if isinstance(node, OM.MDagPath):
-        return node.partialPathName()
-
-    if isinstance(node, OM.MObjectHandle):
-        if not node.isValid:
-            raise RuntimeError("object no longer exists")
-        node = node.object()
-
-    if not isinstance(node, OM.MObject):
-        raise RuntimeError("Invalid arg - %r" % node)
-
-    if node.hasFn(OM.MFn.kDagNode):
-        pathArray = OM.MDagPathArray()
-
-        OM.MDagPath.getAllPathsTo(node, pathArray)
-        if pathArray.length() > 1:
-            _logger.warning("Multiple paths for node, returning first")
-
-        return pathArray[0].partialPathName()
-
-    return OM.MFnDependencyNode(node).name()
-
-
-def getShape(crv):
-    """If crv is a shape node, return it.  If it is
-    a transform with a single shape parent, return the shape.
-
-    @param crv: the shape or transform node
-    @raise RuntimeError: if node is not a shape and has multiple
-      or no shape children
-    """
-
-    if MC.objectType(crv, isAType='geometryShape'):
-        return crv
-
-    result = None
-    shapes = MC.listRelatives(crv) or []
-    for shape in shapes:
-        #ni flag broken?
-        if MC.getAttr('%s.intermediateObject' % shape):
-            continue
-
-        if MC.objectType(shape, isAType='geometryShape'):
-            if result is not None:
-                raise RuntimeError("Multiple shapes under '%s'" % crv)
-            result = shape
-
-    if result is None:
-        raise RuntimeError("No shapes under '%s'" % crv)
-    return result
-
-
-def closestPointOnNurbsObj(xformNode, nurbsObj, worldSpace=False):
-    """Get closest point to a nurbs surface or curve in the curve's
-    object space
-
-    @param xformNode: a transform node
-    @type xformNode: str
-    @param nurbsObj: the curve xform or shape node
-    @type nurbsObj: str
-    @param: return the point in worldspace
-    @return: closest world-space position on the nurbs object
-    @rtype: 3-float list, ie [3.4, 2.3, 4.4]
-    """
-
-    shape = getShape(nurbsObj)
-    shapeXform = MC.listRelatives(shape, parent=1)[0]
-    dp = strToDagPath(shape)
-    node = dp.node()
-    if node.hasFn(OM.MFn.kNurbsCurve):
-        fn = OM.MFnNurbsCurve(dp)
-    elif node.hasFn(OM.MFn.kNurbsSurface):
-        fn = OM.MFnNurbsSurface(dp)
-
-    crvParentMatrix = strToDagPath(shapeXform).inclusiveMatrix()
-
-    #get the position in objet space of the curve
-    nodePos = OM.MPoint(*MC.xform(xformNode, q=1, rp=1, ws=1))
-    if worldSpace:
-        nodePos *= crvParentMatrix.inverse()
-
-    pnt = fn.closestPoint(nodePos)
-
-    if worldSpace:
-        #back to world space
-        pnt *= crvParentMatrix
-
-    return [pnt.x, pnt.y, pnt.z]
-
-
-def closestParamOnCurve(node, crv):
-    """Get the closest parameter on the curve to the node"""
-    pnt = closestPointOnNurbsObj(node, crv)
-    crv = getShape(crv)
-    crvFn = OM.MFnNurbsCurve(strToDagPath(crv))
-    su = OM.MScriptUtil()
-    pDouble = su.asDoublePtr()
-
-    crvFn.getParamAtPoint(OM.MPoint(*pnt), pDouble)
-
-    return su.getDouble(pDouble)
-
-
-def pointAtParam(crv, param):
-    """
-    Get the world-space position of a point along a nurbs curv
-    """
-    crv = getShape(crv)
-    poci = MC.createNode('pointOnCurveInfo')
-    MC.connectAttr('%s.worldSpace[0]' % crv, '%s.inputCurve' % poci)
-    MC.setAttr('%s.pr' % poci, param)
-    v = MC.getAttr("%s.p" % poci)[0]
-    MC.delete(poci)
-    return v
-
-def pointAtParamPercentage(crv, pct):
-    """
-    Get the world-space position of a point at a certain
-    percentage value along the curves parameterization
-    @param crv: the curve
-    @type crv: str
-    @param pct: the percentage value along the curve, between 0 and 1
-    @type pct: float
-    """
-    crv = getShape(crv)
-    pct = min(max(pct, 0.0), 1.0)
-    max_ = MC.getAttr('%s.maxValue' % crv)
-    min_ = MC.getAttr('%s.minValue' % crv)
-
-    return pointAtParam(crv, (min_ + max_ * pct))
-
-
-def closestParamOnSurface(node, surf):
-    surf = getShape(surf)
-
-    pnt = closestPointOnNurbsObj(node, surf)
-    srfFn = OM.MFnNurbsSurface(strToDagPath(surf))
-    suU = OM.MScriptUtil()
-    suV = OM.MScriptUtil()
-    pDoubleU = suU.asDoublePtr()
-    pDoubleV = suV.asDoublePtr()
-
-    srfFn.getParamAtPoint(OM.MPoint(*pnt), pDoubleU, pDoubleV)
-
-    return (suU.getDouble(pDoubleU), suV.getDouble(pDoubleV))
-
-
-def curveFromNodes(nodes, name='crv', doubleEndPoints=False):
-    #cmd = ['curve -d 2 -k 0 -name "%s"' % name]
-    cmd = ['curve -d 2 -name "%s"' % name]
-
-    # for i in range(len(nodes)-1):
-    #     if not doubleEndPoints:
-    #         cmd.append('-k %i' % i)
-    # if not doubleEndPoints:
-    #     cmd.append('-k %i' % (len(nodes)-2))
-    positions = []
-
-    for i, node in enumerate(nodes):
-        positions.append(MC.xform(node, q=1, ws=1, rp=1))
-
-    for i, p in enumerate(positions):
-        if doubleEndPoints and i == len(nodes)-1:
-
-            cmd.append('-p %f %f %f' % (p[0], p[1], p[2]))
-            cmd.append('-p %f %f %f' % (p[0], p[1], p[2]))
-
-        else:
-            cmd.append('-p %f %f %f' % (p[0], p[1], p[2]))
-
-    cmd = ' '.join(cmd)
-    _logger.debug(cmd)
-    return MM.eval(cmd)
-
-
-def surfaceFromNodes(nodes, name='jntsSrf', upAxis=0, doubleEndPoints=False):
-    """
-    Create a 2-degree nurbs surface from the position of a list of
-    node (generally, the IK controls)
-    @param nodes: controls that will dictate the CV positions
-    @type nodes: list of strings
-    @param name: the name of the surface
-    @type name: str
-    @param upAxis: the direction of the width of the surface
-    @type upAxis: int representing x(0), y(1) or z(2)
-    """
-    inPos = [0,0,0]
-    outPos = [0,0,0]
-    inPos[upAxis] = -1
-    outPos[upAxis] = 1
-
-    crv1 = curveFromNodes(nodes, doubleEndPoints=doubleEndPoints)
-    crv2 = curveFromNodes(nodes, doubleEndPoints=doubleEndPoints)
-
-    MC.xform(crv1, t=outPos)
-    MC.xform(crv2, t=inPos)
-
-    srf = MC.loft(crv1, crv2, u=1, c=0, ch=0, ar=1, d=1, ss=1, rn=0, po=0, rsn=True)[0]
-    srf = MC.rename(srf, name)
-    MC.delete(crv1, crv2)
-
-    return srf
-
-
-def bindControlsToShape(ctls, shape, doubleEndPoints=False):
-    """
-    Cluster bind the controls to a curve.  Curve must have same num of points in u
-    as num ctls
-
-
-    """
-    _logger.debug('binding %s' % shape)
-    shape = getShape(shape)
-    if MC.objectType(shape, isAType='nurbsSurface'):
-        dv = MC.getAttr('%s.degreeV' % shape)
-        suff = '[0:%i]' % dv
-
-    elif MC.objectType(shape, isAType='nurbsCurve'):
-        suff = ""
-    else:
-        raise RuntimeError("Bad input shape %s" % shape)
-
-    for i, ctl in enumerate(ctls):
-
-        if doubleEndPoints:
-            if i == len(ctls)-1:
-                cmpts = '%s.cv[%i:%i]%s' % (shape, i, i+1, suff)
-            else:
-                cmpts = '%s.cv[%i]%s' % (shape, i, suff)
-
-        else:
-            cmpts = '%s.cv[%i]%s' % (shape, i, suff)
-
-        cls, handle = MC.cluster(cmpts)
-        handleShape  = MC.listRelatives(handle)[0]
-
-        MC.disconnectAttr('%s.worldMatrix[0]' % handle, '%s.matrix' % cls)
-        MC.disconnectAttr('%s.clusterTransforms[0]' % handleShape, '%s.clusterXforms' % cls)
-
-        MC.delete(handle)
-
-        MC.setAttr('%s.bindPreMatrix' % cls, MC.getAttr('%s.worldInverseMatrix[0]' % ctl), type='matrix')
-        MC.connectAttr('%s.worldMatrix[0]' % ctl, '%s.matrix' % cls)
-
-
 def createBeingsSplineObjs(numIkCtls, numBndJnts, ctlSep=2, namer=None, ctlKwargs=None, doubleEndPoints=False):
     """
     Create the components needed for a spline setup - ik controls, joints,
@@ -364,9 +80,12 @@ def createBeingsSplineObjs(numIkCtls, numBndJnts, ctlSep=2, namer=None, ctlKwarg
 
 
 
+#ways setupIkSplineJnts can orient joints to the surface
+SPLINE_ATTACH_MODES = ['closestPoint', 'fixed']
+
 def setupIkSplineJnts(jntList, crv, surf, ikNode,
                          nodeName='beings_splineik', namer=None,
-                         tipCtl=None):
+                         tipCtl=None, attachMode='closestPoint'):
 
     """
     Setup a splineIk system, but use a nurbs surface to control orientation.
@@ -378,22 +97,62 @@ def setupIkSplineJnts(jntList, crv, surf, ikNode,
     @param namer: the namer to use for naming; a generic will be assigned if none provided
     @param tipCtl: a control to use for orienting the last joint.  If none provided,
     it will be oriented to the plane
+    @param attachMode='closestPoint': one of SPLINE_ATTACH_MODES.
+      - closestPoint: find the closest surface point to each joint every
+        evaluation, and aim each joint at the next one
+      - fixed: aim each joint at the next one, with the up vector towards a
+        follicle on the v=0 edge of the surface at the u parameter the joint
+        had at build time.  Uses half the nodes, and no closest point solves.
+        Positions and aim directions match closestPoint mode.  Joints slide
+        along the curve when the spine stretches or compresses, but their up
+        follicles don't, so the twist around the aim axis is sampled slightly
+        off from where closestPoint mode samples it
+    @return: (splineJnts, splinePosJnts, up transforms or follicles, ikHandle)
     """
+    if attachMode not in SPLINE_ATTACH_MODES:
+        raise utils.BeingsError("Invalid attach mode '%s'" % attachMode)
     if not namer:
         namer = utils.Namer('char', 'cn', 'spine')
 
+    with utils.NodeTracker() as nt:
+        result = _setupIkSplineJnts(jntList, crv, surf, ikNode, nodeName, namer,
+                                    tipCtl, attachMode)
+    _logger.info("%s: created %i nodes for %i joints (%s attach)" % \
+                 (nodeName, len(nt.getObjects()), len(jntList), attachMode))
+    return result
+
+def _followSurface(surf, params, names, parent):
+    """
+    Create follicles at fixed surface parameters.  Only their positions
+    follow the surface
+    @return: list of follicle transforms
+    """
+    (minU, maxU), (minV, maxV) = utils.Geometry.paramRange(surf)
+    xforms = []
+    for (u, v), name in zip(params, names):
+        xform = MC.createNode('transform', n=name, parent=parent)
+        MC.setAttr('%s.inheritsTransform' % xform, 0)
+        fol = MC.createNode('follicle', n='%sShape' % xform, parent=xform)
+        MC.setAttr('%s.parameterU' % fol, (u - minU) / (maxU - minU))
+        MC.setAttr('%s.parameterV' % fol, (v - minV) / (maxV - minV))
+        MC.connectAttr('%s.local' % surf, '%s.inputSurface' % fol)
+        MC.connectAttr('%s.worldMatrix[0]' % surf, '%s.inputWorldMatrix' % fol)
+        MC.connectAttr('%s.outTranslate' % fol, '%s.t' % xform)
+        xforms.append(xform)
+    return xforms
 
+def _setupIkSplineJnts(jntList, crv, surf, ikNode, nodeName, namer, tipCtl, attachMode):
     namer.setTokens(r='ik')
     #use the splineik node to get joints to 'slip' alone the curve.  These are intermediate
     #joints, we're just using their position to get us a point on the nurbs surface so we
     #can use the surface for orientation
-    jntNames = ['%s_pos_jnt_%s' % (nodeName, ascii_lowercase[i]) for i in range(len(jntList))]
+    jntNames = ['%s_pos_jnt_%s' % (nodeName, utils.alphaSuffix(i)) for i in range(len(jntList))]
     splinePosJnts = utils.dupJntList(jntList, jntNames, namer)
     for jnt in splinePosJnts:
         control.setLockTag(jnt, uu=['t', 'r', 's'])
 
     #these are the actual joints that will be oriented and positioned correctly
-    jntNames = ['%s_jnt_%s' % (nodeName,ascii_lowercase[i]) for i in range(len(jntList))]
+    jntNames = ['%s_jnt_%s' % (nodeName,utils.alphaSuffix(i)) for i in range(len(jntList))]
     splineJnts = utils.dupJntList(jntList, jntNames, namer)
     for jnt in splineJnts:
         control.setLockTag(jnt, uu=['t', 'r', 's'])
@@ -412,6 +171,29 @@ def setupIkSplineJnts(jntList, crv, surf, ikNode,
 
     if not MC.objExists(handle):
         raise RuntimeError('%s deleted!' % handle)
+
+    if attachMode == 'fixed':
+        numOriented = len(splineJnts) - 1
+        params = utils.Geometry.closestParams(surf, utils.Geometry.rotatePivots(splineJnts[:numOriented]))
+        #the up points closestPoint mode uses: the v=0 edge at the joint's u
+        minV = utils.Geometry.paramRange(surf)[1][0]
+        names = [namer('%s_splinejnt_fol' % nodeName, alphaSuf=i) for i in range(numOriented)]
+        follicles = _followSurface(getShape(surf), [(u, minV) for u, v in params], names, ikNode)
+        for i, fol in enumerate(follicles):
+            MC.pointConstraint(splinePosJnts[i], splineJnts[i])
+            MC.aimConstraint(splinePosJnts[i+1], splineJnts[i],
+                             aimVector=[0,1,0],
+                             upVector=[1,0,0],
+                             worldUpType='object',
+                             worldUpObject=fol)
+            utils.fixJointConstraints(splineJnts[i])
+        MC.pointConstraint(splinePosJnts[-1], splineJnts[-1])
+        if tipCtl:
+            MC.orientConstraint(tipCtl, splineJnts[-1])
+            utils.fixJointConstraints(splineJnts[-1])
+        MC.setAttr("%s.v" % splinePosJnts[0], 0)
+        return (splineJnts, splinePosJnts, follicles, handle)
+
     xforms = []
     ups = []
 
@@ -464,9 +246,12 @@ def aimXforms(xforms, upXforms, posiNodes, ikNode):
 
 
 
-def setupSpineIkNode(ctlList, jntList, surf=None, crv=None, nodeName='beings_splineik', namer=None):
+def setupSpineIkNode(ctlList, jntList, surf=None, crv=None, nodeName='beings_splineik', namer=None,
+                     attachMode='closestPoint'):
     """
     Create an ik spline system using controls in the ctlList that will drive jnts in jntList
+    @param attachMode='closestPoint': how non-stretch joints follow the surface;
+    see setupIkSplineJnts
     """
     if not namer:
         namer = utils.Namer('char', 'cn', 'spine')
@@ -482,7 +267,7 @@ def setupSpineIkNode(ctlList, jntList, surf=None, crv=None, nodeName='beings_spl
     MC.parent(MC.listRelatives(crv, parent=1)[0], ikNode)
 
     namer.setTokens(r='ik')
-    names = ['stretch_%s' % ascii_lowercase[i] for i in range(len(jntList))]
+    names = ['stretch_%s' % utils.alphaSuffix(i) for i in range(len(jntList))]
     stretchJnts = utils.dupJntList(jntList, names, namer)
 
     #rebuild the curve so that we get more even parameterization for 'even stretch'
@@ -499,12 +284,13 @@ def setupSpineIkNode(ctlList, jntList, surf=None, crv=None, nodeName='beings_spl
     #for each joint, get the param at the rebuilt curve.  Use this position to get
     #the closest point on the surface, then get the u and v values at that surface
     #point.
+    evenStretchParams = utils.Geometry.closestParams(evenStretchCrv, utils.Geometry.rotatePivots(stretchJnts))
     for i, jnt in enumerate(stretchJnts):
-        suff = ascii_lowercase[i]
+        suff = utils.alphaSuffix(i)
         #get point on rebuild curve near each jnt
         poci = MC.createNode('pointOnCurveInfo', n='%s_%s_evenstretch_poci' % (ikNode, suff))
         MC.connectAttr("%s.worldSpace[0]" % evenStretchCrv, '%s.ic' % poci)
-        MC.setAttr('%s.pr' % poci, closestParamOnCurve(jnt, evenStretchCrv))
+        MC.setAttr('%s.pr' % poci, evenStretchParams[i])
 
         #get closest point on surface
         cps = MC.createNode("closestPointOnSurface", n='%s_%s_evenstretch_cps' % (ikNode, suff))
@@ -515,16 +301,17 @@ def setupSpineIkNode(ctlList, jntList, surf=None, crv=None, nodeName='beings_spl
 
     MC.addAttr(ikNode, ln='evenStretchAmt', min=0, max=1, k=1)
 
+    surfParams = utils.Geometry.closestParams(surf, utils.Geometry.rotatePivots(stretchJnts))
     for i, jnt in enumerate(stretchJnts):
 
         #create a point on surface info node at each point
-        suff = ascii_lowercase[i]
+        suff = utils.alphaSuffix(i)
         posi = MC.createNode('pointOnSurfaceInfo', n='%s_%s_posi' % (ikNode, suff))
         posiUp = MC.createNode('pointOnSurfaceInfo', n='%s_%s_up_posi' % (ikNode, suff))
         MC.connectAttr('%s.worldSpace[0]' % surf, '%s.is' % posi)
         MC.connectAttr('%s.worldSpace[0]' % surf, '%s.is' % posiUp)
 
-        u, v = closestParamOnSurface(jnt, surf)
+        u, v = surfParams[i]
 
         for node in [posi, posiUp]:
             blender = MC.createNode("blendColors", name='%s_%s_evenstretch_blc' % (ikNode, suff))
@@ -559,8 +346,8 @@ def setupSpineIkNode(ctlList, jntList, surf=None, crv=None, nodeName='beings_spl
     MC.addAttr(ikNode, ln='inputScaleAmt', dv=1, k=1)
 
     for i in range(len(stretchJnts)-1):
-        suff = ascii_lowercase[i]
-        nextSuff = ascii_lowercase[i+1]
+        suff = utils.alphaSuffix(i)
+        nextSuff = utils.alphaSuffix(i+1)
 
         dst = MC.createNode('distanceBetween', n='%s_%s_to_%s_dist' % \
                       (ikNode,suff, nextSuff))
@@ -612,7 +399,8 @@ def setupSpineIkNode(ctlList, jntList, surf=None, crv=None, nodeName='beings_spl
     nsJnts, nsPosJnts, esUps, ikHandle = setupIkSplineJnts(jntList, crv, surf, ikNode,
                          namer = namer,
                          nodeName='%s_ns' % nodeName,
-                         tipCtl = ctlList[-1])
+                         tipCtl = ctlList[-1],
+                         attachMode=attachMode)
 
     MC.addAttr(ikNode, ln='stretchAmt', min=0, max=1, dv=0, k=1)
     utils.blendJointChains(nsJnts, stretchJnts, jntList, '%s.stretchAmt' % ikNode, namer)
@@ -624,78 +412,13 @@ def setupSpineIkNode(ctlList, jntList, surf=None, crv=None, nodeName='beings_spl
     return ikNode, ikHandle
 
 
-def bindNodesToSurface(nodes, surface, skipTipOrient=False):
-    """Bind a node to the closest point on a surface
-    @param node: the dag node to bind
-    @param surface: the surface to bind to
-    @param skipTipOrient: do not constrain orientation of the last node"""
-    surface = str(surface)
-
-    xforms = []
-    xformUps = []
-    cposes = []
-    for node in nodes:
-        node = str(node)
-
-
-        u, v = closestParamOnSurface(node, surface)
-        cpos = MC.createNode('pointOnSurfaceInfo', name='%s_surfacebind' % node)
-        cposUp = MC.createNode('pointOnSurfaceInfo', name='%s_surfacebind_up' % node)
-        cposes.append(cpos)
-        MC.setAttr("%s.u" % cpos, u)
-        MC.setAttr("%s.v" % cpos, v)
-
-        MC.setAttr("%s.u" % cposUp, u)
-        MC.setAttr("%s.v" % cposUp, v-.1)
-
-        MC.connectAttr("%s.worldSpace[0]" % surface, "%s.inputSurface" % cpos)
-        MC.connectAttr("%s.worldSpace[0]" % surface, "%s.inputSurface" % cposUp)
-        worldSpaceXform = MC.createNode('transform', n='%s_surfacebind_dnt' % node)
-        worldSpaceXformUp = MC.createNode('transform', n='%s_surfacebind_up_dnt' % node)
-        xforms.append(worldSpaceXform)
-        xformUps.append(worldSpaceXformUp)
-
-        MC.connectAttr("%s.p" % cpos, "%s.t" % worldSpaceXform)
-        MC.connectAttr("%s.p" % cposUp, "%s.t" % worldSpaceXformUp)
-
-
-
-    for i in range(len(nodes)):
-        if i == len(nodes)-1:
-            this = xforms[i]
-            if skipTipOrient:
-                MC.pointConstraint(this, nodes[i])
-                return
-
-
-            tgt = xformUps[i]
-            up = xformUps[i-1]
-            aimVec = [1,0,0]
-            upVec = [0,-1,0]
-        else:
-            this = xforms[i]
-            tgt = xforms[i+1]
-            up = xformUps[i]
-            aimVec = [0,1,0]
-            upVec = [1,0,0]
-
-
-        MC.aimConstraint(tgt, this,
-                         upVector=upVec,
-                         aimVector=aimVec,
-                         worldUpType='object',
-                         worldUpObject=up)
-
-        MC.parentConstraint(this, nodes[i])
-        #utils.fixJointConstraints(nodes[i])
-
-
 class Spine(core.Widget):
     def __init__(self):
         super(Spine, self).__init__('spine')
 
         self.options.addOpt('numJnts', 6, min=2, optType=int)
         self.options.addOpt('numIkCtls', 4, min=2, optType=int)
+        self.options.addOpt('splineAttach', 'closestPoint', presets=SPLINE_ATTACH_MODES)
 
         self.options.subscribe('optChanged', self.__optionChanged)
 
@@ -706,11 +429,11 @@ class Spine(core.Widget):
         if bndJnts:
             toks = ['pelvis']
             for i in range(self.options.getValue('numJnts')):
-                toks.append('%s' % ascii_lowercase[i])
+                toks.append('%s' % utils.alphaSuffix(i))
 
         if ikCtls:
             for i in range(self.options.getValue('numIkCtls')):
-                toks.append('ctl_%s' % ascii_lowercase[i])
+                toks.append('ctl_%s' % utils.alphaSuffix(i))
 
         return toks
 
@@ -881,7 +604,8 @@ class Spine(core.Widget):
         bindControlsToShape(ikCtls, srf,  doubleEndPoints=doubleEndPoints)
 
         ikNode, ikHandle = setupSpineIkNode(ikCtls, ikJnts, nodeName='splinik', namer=namer,
-                         crv=crv, surf=srf)
+                         crv=crv, surf=srf,
+                         attachMode=self.options.getValue('splineAttach'))
 
         self._otherNodes['ikHandle'] = ikHandle
 